@@ -1,5 +1,5 @@
-from flask import Flask, render_template, request, redirect, url_for, session, send_from_directory, jsonify, make_response, flash
-from functools import wraps
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, make_response, flash, Response, stream_with_context, g
+from functools import lru_cache, wraps
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from datetime import timedelta, datetime
@@ -15,14 +15,38 @@ import requests
 import json
 import certifi # For SSL certificates in some database connections
 import math
+import base64
+import heapq
+import itertools
+import time
+import re
+import html
+import click
+from collections import namedtuple
 
 
 # --- Database Imports ---
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import and_, cast, event, func, inspect, literal, null, or_, select, union_all
 from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import IntegrityError
 import pymysql # For MySQL connection
 
+from log_config import configure_logging
+from query_profiler import QueryProfiler
+from metrics import Metrics
+from cache import TTLCache
+from thumbnails import ThumbnailPipeline
+from image_proxy import ImageProxy
+import assets as static_assets
+from compression import Compression
+import streaming
+from streaming import Lazy, coalesce, render_page, streamed_response
+from json_provider import FastJSONProvider
+from session_store import ServerSessions
+from background import ActivityRecorder, BatchQueue, PeriodicTask
+from search_index import NgramIndex
+
 
 # --- Load Environment Variables ---
 load_dotenv()
@@ -30,6 +54,7 @@ pymysql.install_as_MySQLdb()
 
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
 
 # -------------------------------------- Configuration ---------------------------------------------------------------------
@@ -40,14 +65,28 @@ app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
 app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'True').lower() in ('true', '1', 't')
 app.config['MAIL_USE_SSL'] = os.getenv('MAIL_USE_SSL', 'False').lower() in ('true', '1', 't')
 app.config['PER_PAGE'] = 120
+# Page size for the keyset-paginated admin lists (requests, messages, pending users).
+app.config['ADMIN_LIST_PAGE_SIZE'] = 50
+app.config['ADMIN_LIST_MAX_PAGE_SIZE'] = 200
 
 # ==================================== Define OTP expiration time (e.g., 15 minutes)===============================================
 app.config['OTP_EXPIRATION_MINUTES'] = 15
+# Seconds the admin dashboard counters are cached per worker.
+app.config['STATS_CACHE_TTL'] = int(os.getenv('STATS_CACHE_TTL', 10))
+
+# ==================================== Logging ===============================================
+# Fraction of per-redirect INFO lines from download_content() that are kept.
+app.config['DOWNLOAD_LOG_SAMPLE_RATE'] = float(os.getenv('DOWNLOAD_LOG_SAMPLE_RATE', 0.1))
+log_handler = configure_logging(app)
+
 mail = Mail(app)
 app.secret_key = os.getenv('SECRET_KEY')
 app.permanent_session_lifetime = timedelta(days=7)
 UPLOAD_FOLDER = os.path.join('static', 'uploads')
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Set to an internal nginx location (e.g. /_uploads/) to let the proxy stream uploads.
+app.config['UPLOADS_ACCEL_REDIRECT'] = os.getenv('UPLOADS_ACCEL_REDIRECT') or None
+app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 csrf = CSRFProtect(app)
 
@@ -57,6 +96,14 @@ csrf = CSRFProtect(app)
 app.config['TMDB_API_KEY'] = os.getenv('TMDB_API_KEY')
 app.config['TMDB_BASE_IMAGE_URL'] = "https://image.tmdb.org/t/p/w500"
 app.config['TMDB_BACKDROP_IMAGE_URL'] = "https://image.tmdb.org/t/p/w1280"
+# TMDB images are served through /img/tmdb/ and cached on local disk; see image_proxy.py.
+app.config['IMAGE_PROXY_ENABLED'] = os.getenv('IMAGE_PROXY_ENABLED', 'true').lower() == 'true'
+app.config['TMDB_IMAGE_ORIGIN'] = os.getenv('TMDB_IMAGE_ORIGIN', 'https://image.tmdb.org')
+# Width of the poster on the movie/series pages; grids use the smaller proxy default.
+app.config['DETAIL_POSTER_WIDTH'] = int(os.getenv('DETAIL_POSTER_WIDTH', 500))
+if os.getenv('IMAGE_CACHE_DIR'):
+    app.config['IMAGE_CACHE_DIR'] = os.getenv('IMAGE_CACHE_DIR')
+app.config['IMAGE_CACHE_MAX_BYTES'] = int(os.getenv('IMAGE_CACHE_MAX_MB', 512)) * 1024 * 1024
 
 ADMIN_USERNAME = os.getenv('ADMIN_USERNAME')
 ADMIN_PASSWORD_HASH = generate_password_hash(os.getenv('ADMIN_PASSWORD'))
@@ -71,6 +118,10 @@ except Exception as e:
     print(f"Warning: Could not find certifi CA bundle: {e}. SSL connection might fail if required by DB. Setting ssl_args to empty dict.")
     ssl_args = {}
 
+# ssl_ca is a PyMySQL connect argument; other drivers (e.g. SQLite for local benchmarks) reject it.
+if not (app.config['SQLALCHEMY_DATABASE_URI'] or '').startswith('mysql'):
+    ssl_args = {}
+
 db = SQLAlchemy(
     app,
     engine_options={
@@ -80,6 +131,40 @@ db = SQLAlchemy(
 )
 
 migrate = Migrate(app, db)
+query_profiler = QueryProfiler(app)
+metrics = Metrics(app)
+
+
+def _db_pool_stats():
+    """Reports connection pool usage for the metrics endpoint (QueuePool only)."""
+    pool = db.engine.pool
+    stats = {}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    return stats
+
+metrics.register_gauge('db_pool_connections', 'Database connection pool state.', _db_pool_stats, label_name='state')
+metrics.register_gauge('log_queue_depth', 'Log records waiting for the background writer.', lambda: log_handler.queue.qsize())
+metrics.register_gauge('log_records_dropped', 'Log records dropped because the queue was full.', lambda: log_handler.dropped)
+stats_cache = TTLCache(ttl=app.config['STATS_CACHE_TTL'], name='dashboard_stats', metrics=metrics)
+thumbnails = ThumbnailPipeline(app, metrics=metrics)
+image_proxy = ImageProxy(app, metrics=metrics)
+# The proxy 404s widths outside IMAGE_PROXY_WIDTHS, so the detail poster's width must be one of them.
+app.config['IMAGE_PROXY_WIDTHS'] = tuple(sorted({*app.config['IMAGE_PROXY_WIDTHS'], app.config['DETAIL_POSTER_WIDTH']}))
+asset_bundle = static_assets.Assets(app)
+# Set COMPRESS_ENABLED=false when a front proxy already compresses responses.
+app.config['COMPRESS_ENABLED'] = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', 500))
+compression = Compression(app, metrics=metrics)
+# Send index/dashboard HTML as it renders instead of after every query has run.
+app.config['STREAM_TEMPLATES'] = os.getenv('STREAM_TEMPLATES', 'true').lower() == 'true'
+streaming.init_app(app)
+# Sessions live server-side and the cookie carries only a signed id; see session_store.py.
+# SESSION_BACKEND is database (default), redis (with SESSION_REDIS_URL), memory or cookie.
+app.config['SESSION_BACKEND'] = os.getenv('SESSION_BACKEND', 'database')
+app.config['SESSION_REDIS_URL'] = os.getenv('SESSION_REDIS_URL') or None
+server_sessions = ServerSessions(app, db, metrics=metrics)
 # --- Helper Functions ---
 class MyBaseForm(FlaskForm):
     pass
@@ -122,18 +207,55 @@ def nocache(view):
     return no_cache_impl
 
 def get_display_thumbnail(item):
-    """Determines the best thumbnail URL for display."""
+    """Determines the best grid-sized thumbnail URL, preferring a resized JPEG variant of uploads."""
     if item.poster_url:
-        return item.poster_url
+        return image_proxy.url_for_tmdb(item.poster_url, 320, external=True)
+    elif item.thumbnail:
+        filename = thumbnails.default_variant(item.thumbnail) or item.thumbnail
+        return url_for('uploaded_file', filename=filename, _external=True)
+    else:
+        return url_for('static', filename='default_poster.jpg', _external=True)
+
+def get_display_poster(item):
+    """Poster URL for the detail pages: the original upload, or the TMDB poster at DETAIL_POSTER_WIDTH."""
+    if item.poster_url:
+        return image_proxy.url_for_tmdb(item.poster_url, app.config['DETAIL_POSTER_WIDTH'], external=True)
     elif item.thumbnail:
         return url_for('uploaded_file', filename=item.thumbnail, _external=True)
     else:
         return url_for('static', filename='default_poster.jpg', _external=True)
 
+def get_display_sources(item):
+    """Returns [(mime_type, srcset), ...] for uploaded thumbnails that have resized variants."""
+    if item.poster_url or not item.thumbnail:
+        return []
+    return thumbnails.sources(item.thumbnail, lambda name: url_for('uploaded_file', filename=name))
+
+def remove_unused_uploads(filenames):
+    """Deletes uploaded thumbnails (and their variants) that no movie or series references any more."""
+    filenames = {name for name in filenames if name}
+    if not filenames:
+        return
+    used = {name for (name,) in db.session.query(Movie.thumbnail).filter(Movie.thumbnail.in_(filenames))}
+    used |= {name for (name,) in db.session.query(Series.thumbnail).filter(Series.thumbnail.in_(filenames))}
+    for filename in filenames - used:
+        try:
+            thumbnails.delete(filename)
+        except OSError as e:
+            app.logger.error("Error deleting thumbnail file %s: %s", filename, e)
+
+def remove_upload_if_unused(filename):
+    remove_unused_uploads([filename])
+
+# Bulk deletes hand their thumbnails to this queue instead of unlinking files in the request.
+app.config['UPLOAD_CLEANUP_INTERVAL'] = int(os.getenv('UPLOAD_CLEANUP_INTERVAL', 5))
+upload_cleanup = BatchQueue('upload-cleanup', remove_unused_uploads, interval=app.config['UPLOAD_CLEANUP_INTERVAL'], app=app)
+metrics.register_gauge('upload_cleanup_pending', 'Uploaded files queued for background cleanup.', lambda: len(upload_cleanup))
+
 def get_display_backdrop(item):
     """Determines the best backdrop URL for display."""
     if hasattr(item, 'backdrop_url') and item.backdrop_url:
-        return item.backdrop_url
+        return image_proxy.url_for_tmdb(item.backdrop_url, 1280, external=True)
     return get_display_thumbnail(item)
 
 def send_otp_email(recipient_email, otp):
@@ -143,9 +265,7 @@ def send_otp_email(recipient_email, otp):
         msg = Message('Your OTP for FlixHD' , sender=app.config['MAIL_USERNAME'], recipients=[recipient_email], html=html_content)
         mail.send(msg)
     except Exception as e:
-        print(f"---!!! FAILED TO SEND EMAIL: {e} !!!---")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("Failed to send OTP email to %s", recipient_email)
         raise RuntimeError(f"Email service is currently unavailable: {e}")
 
 def get_tmdb_movie_director(crew_data):
@@ -181,17 +301,12 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, nullable=False, default=True)
     last_login_at = db.Column(db.DateTime, nullable=True)
     login_count = db.Column(db.Integer, nullable=False, default=0)
+    # Lower-cased copies kept in sync by ORM events; indexed for case-insensitive exact lookups.
+    username_lower = db.Column(db.String(80), nullable=True, index=True)
+    email_lower = db.Column(db.String(120), nullable=True, index=True)
 
     def to_dict(self, include_sensitive=False):
-        user_dict = {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'role': self.role,
-            'is_active': self.is_active,
-            'last_login_at': self.last_login_at.isoformat() if self.last_login_at else None,
-            'login_count': self.login_count
-        }
+        user_dict = serialize_user_row(row_of(self, USER_ROW_COLUMNS))
         if include_sensitive:
             user_dict['security_question'] = self.security_question
         return user_dict
@@ -204,17 +319,20 @@ class PendingUser(db.Model):
     security_question = db.Column(db.String(256), nullable=False)
     security_answer = db.Column(db.String(256), nullable=False)
     otp = db.Column(db.String(6), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
 
-    # NEW: to_dict method for JSON serialization
     def to_dict(self):
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'otp': self.otp,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+        return serialize_pending_user_row(row_of(self, PENDING_USER_ROW_COLUMNS))
+
+class EmbedProvider(db.Model):
+    """A player host: URL templates with an ``{id}`` placeholder for movies and episodes."""
+    __tablename__ = 'embed_provider'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    movie_template = db.Column(db.String(255), nullable=False)
+    episode_template = db.Column(db.String(255), nullable=True)
+    # Bumped on every template change; part of the rendered-embed cache key.
+    version = db.Column(db.Integer, nullable=False, default=1)
 
 class Movie(db.Model):
     __tablename__ = 'movie'
@@ -222,7 +340,10 @@ class Movie(db.Model):
     tmdb_id = db.Column(db.String(20), nullable=True, index=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
-    embed_code = db.Column(db.Text, nullable=False)
+    # Hand-written embed HTML; NULL when the movie is played through an EmbedProvider.
+    embed_code = db.Column(db.Text, nullable=True)
+    embed_provider_id = db.Column(db.Integer, db.ForeignKey('embed_provider.id'), nullable=True)
+    embed_external_id = db.Column(db.String(64), nullable=True)
     poster_url = db.Column(db.String(255), nullable=True)
     backdrop_url = db.Column(db.String(255), nullable=True)
     thumbnail = db.Column(db.String(255), nullable=True)
@@ -238,36 +359,12 @@ class Movie(db.Model):
     def genre_list(self):
         return [g.strip() for g in self.genre.split(',')] if self.genre else []
 
+    @property
+    def embed_html(self):
+        return render_embed(self.embed_provider_id, self.embed_external_id, 'movie', self.embed_code)
+
     def to_dict(self):
-        cast_list = []
-        cast_display_string = ""
-        if self.cast:
-            try:
-                cast_data = json.loads(self.cast)
-                cast_list = cast_data
-                cast_display_string = ", ".join([actor.get('name', '') for actor in cast_data])
-            except (json.JSONDecodeError, TypeError):
-                cast_list = []
-                cast_display_string = self.cast
-
-        return {
-            "id": self.id,
-            "tmdb_id": self.tmdb_id,
-            "title": self.title,
-            "description": self.description,
-            "embed_code": self.embed_code,
-            "poster_url": self.poster_url,
-            "backdrop_url": self.backdrop_url,
-            "thumbnail": self.thumbnail,
-            "release_date": self.release_date,
-            "director": self.director,
-            "genre": self.genre,
-            "cast": cast_list,
-            "cast_display_string": cast_display_string,
-            "created_at": self.created_at.isoformat(),
-            "content_type": self.content_type,
-            "display_thumbnail": get_display_thumbnail(self),
-        }
+        return serialize_movie_row(row_of(self, MOVIE_ROW_COLUMNS))
 
 class Series(db.Model):
     __tablename__ = 'series'
@@ -294,37 +391,7 @@ class Series(db.Model):
         return [g.strip() for g in self.genre.split(',')] if self.genre else []
 
     def to_dict(self):
-        cast_list = []
-        cast_display_string = ""
-        if self.cast:
-            try:
-                cast_data = json.loads(self.cast)
-                cast_list = cast_data
-                cast_display_string = ", ".join([actor.get('name', '') for actor in cast_data])
-            except (json.JSONDecodeError, TypeError):
-                cast_list = []
-                cast_display_string = self.cast
-
-        return {
-            "id": self.id,
-            "tmdb_id": self.tmdb_id,
-            "title": self.title,
-            "description": self.description,
-            "poster_url": self.poster_url,
-            "backdrop_url": self.backdrop_url,
-            "thumbnail": self.thumbnail,
-            "release_date": self.release_date,
-            "director": self.director,
-            "genre": self.genre,
-            "cast": cast_list,
-            "cast_display_string": cast_display_string,
-            "created_at": self.created_at.isoformat(),
-            "content_type": self.content_type,
-            "display_thumbnail": get_display_thumbnail(self),
-             "download_url": self.download_url,
-            "backdrop_display": get_display_backdrop(self),
-            "last_updated_at": self.last_updated_at.isoformat() if self.last_updated_at else None, # <-- You can also add this to_dict for debugging/API if needed
-        }
+        return serialize_series_row(row_of(self, SERIES_ROW_COLUMNS))
 
 class Season(db.Model):
     __tablename__ = 'season'
@@ -338,46 +405,553 @@ class Episode(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     number = db.Column(db.Integer, nullable=False)
     title = db.Column(db.String(200), nullable=True)
-    embed_code = db.Column(db.Text, nullable=False)
+    embed_code = db.Column(db.Text, nullable=True)
+    embed_provider_id = db.Column(db.Integer, db.ForeignKey('embed_provider.id'), nullable=True)
+    embed_external_id = db.Column(db.String(64), nullable=True)
     season_id = db.Column(db.Integer, db.ForeignKey('season.id'), nullable=False)
+
+    @property
+    def embed_html(self):
+        return render_embed(self.embed_provider_id, self.embed_external_id, 'episode', self.embed_code)
     
 class MovieRequest(db.Model):
+    __table_args__ = (db.Index('ix_movie_request_status_date', 'status', 'date'),)
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     link = db.Column(db.String(255), nullable=True)
     notes = db.Column(db.Text, nullable=True)
     status = db.Column(db.String(20), nullable=False, default='Pending')
-    date = db.Column(db.DateTime, default=datetime.utcnow)
+    date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
 
     def to_dict(self):
-        return {
-            "id": self.id,
-            "title": self.title,
-            "link": self.link,
-            "notes": self.notes,
-            "status": self.status,
-            "date": self.date.strftime('%b %d, %Y')
-        }
+        return serialize_request_row(row_of(self, REQUEST_ROW_COLUMNS))
 
 class ContactMessage(db.Model):
+    __table_args__ = (db.Index('ix_contact_message_status_date', 'status', 'date'),)
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), nullable=False)
     subject = db.Column(db.String(200), nullable=True)
     message = db.Column(db.Text, nullable=False)
-    date = db.Column(db.DateTime, default=datetime.utcnow)
+    date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
     status = db.Column(db.String(20), nullable=False, default='New') # 'New', 'Read', 'Archived'
 
     def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "email": self.email,
-            "subject": self.subject,
-            "message": self.message,
-            "date": self.date.strftime('%b %d, %Y %H:%M'),
-            "status": self.status
-        }
+        return serialize_message_row(row_of(self, MESSAGE_ROW_COLUMNS))
+
+class ChangeLog(db.Model):
+    """One row per insert, update or delete of a dashboard-visible row; the id is the change feed version."""
+    __tablename__ = 'change_log'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    row_id = db.Column(db.String(36), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+# --- Embed Providers ---
+# Movies and episodes store a provider id plus their id on that provider; the iframe
+# is rendered from the provider's URL template when a page asks for embed_html.
+# Editing a provider's template (flask embed-provider) moves every row that uses it
+# with no row writes. Hand-written embeds that match no provider stay in embed_code.
+app.config['EMBED_IFRAME_TEMPLATE'] = ('<iframe style="border:1px #FFFFFF none" src="{src}" title="iFrame" width="100%" '
+                                       'height="600px" scrolling="no" frameborder="no" allow="fullscreen"></iframe>')
+app.config['DEFAULT_EMBED_PROVIDER'] = {
+    'name': 'videasy',
+    'movie_template': 'https://player.videasy.net/movie/{id}',
+    'episode_template': 'https://player.videasy.net/tv/{id}',
+}
+embed_providers_cache = TTLCache(ttl=int(os.getenv('EMBED_PROVIDER_CACHE_TTL', 60)), name='embed_providers', metrics=metrics)
+
+_IFRAME_SRC = re.compile(r'<iframe\b[^>]*?\bsrc\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+
+def embed_providers():
+    """{id: row} of every provider, cached per worker for EMBED_PROVIDER_CACHE_TTL seconds."""
+    def load():
+        return {row.id: row for row in db.session.query(
+            EmbedProvider.id, EmbedProvider.name, EmbedProvider.movie_template,
+            EmbedProvider.episode_template, EmbedProvider.version)}
+    return embed_providers_cache.get_or_set('all', load)
+
+def _provider_template(provider, kind):
+    return provider.movie_template if kind == 'movie' else provider.episode_template
+
+@lru_cache(maxsize=4096)
+def _render_embed(provider_id, version, template, external_id):
+    src = template.replace('{id}', external_id)
+    return app.config['EMBED_IFRAME_TEMPLATE'].replace('{src}', html.escape(src, quote=True))
+
+def render_embed(provider_id, external_id, kind, embed_code=None):
+    """Iframe HTML for a movie or episode (``kind``): from its provider when it has one, else its stored embed_code."""
+    if provider_id is not None and external_id:
+        provider = embed_providers().get(provider_id)
+        template = _provider_template(provider, kind) if provider else None
+        if template:
+            return _render_embed(provider_id, provider.version, template, external_id)
+    return embed_code
+
+def match_embed(code, kind):
+    """(provider_id, external_id) when ``code`` (iframe HTML or a bare URL) fits a provider's template, else None."""
+    code = (code or '').strip()
+    found = _IFRAME_SRC.search(code)
+    src = html.unescape(found.group(1) if found else code)
+    for provider in embed_providers().values():
+        template = _provider_template(provider, kind)
+        if not template or '{id}' not in template:
+            continue
+        prefix, suffix = template.split('{id}', 1)
+        if src.startswith(prefix) and src.endswith(suffix) and len(src) > len(prefix) + len(suffix):
+            external_id = src[len(prefix):len(src) - len(suffix)]
+            if len(external_id) <= 64 and not any(ch in external_id for ch in '"\'<> '):
+                return provider.id, external_id
+    return None
+
+def assign_embed(item, code, kind):
+    """Stores ``code`` on a Movie or Episode as a provider reference when it matches one, else as custom HTML."""
+    matched = match_embed(code, kind)
+    if matched:
+        item.embed_provider_id, item.embed_external_id = matched
+        item.embed_code = None
+    else:
+        item.embed_provider_id = item.embed_external_id = None
+        item.embed_code = code
+
+def embed_provider_id(name):
+    """Id of the provider called ``name``, or None."""
+    return db.session.query(EmbedProvider.id).filter_by(name=name).scalar()
+
+def get_or_create_embed_provider(name, movie_template, episode_template=None):
+    """
+    Id of the provider ``name``, creating it with these templates (and committing)
+    when it is missing. An existing provider is never modified: its templates are
+    changed only through ``flask embed-provider``.
+    """
+    provider_id = embed_provider_id(name)
+    if provider_id is None:
+        provider = EmbedProvider(name=name, movie_template=movie_template, episode_template=episode_template, version=1)
+        db.session.add(provider)
+        db.session.commit()
+        embed_providers_cache.invalidate()
+        provider_id = provider.id
+    return provider_id
+
+def ensure_default_embed_provider():
+    return get_or_create_embed_provider(**app.config['DEFAULT_EMBED_PROVIDER'])
+
+def set_embed_provider_templates(name, movie_template=None, episode_template=None):
+    """Creates or updates (bumping its version) the provider ``name`` and commits. Returns its id."""
+    provider = EmbedProvider.query.filter_by(name=name).first()
+    if provider is None:
+        if not movie_template:
+            raise ValueError(f'New embed provider {name!r} needs a movie template.')
+        provider = EmbedProvider(name=name, movie_template=movie_template, episode_template=episode_template, version=1)
+        db.session.add(provider)
+    else:
+        changed = False
+        for field, value in (('movie_template', movie_template), ('episode_template', episode_template)):
+            if value is not None and getattr(provider, field) != value:
+                setattr(provider, field, value)
+                changed = True
+        if changed:
+            provider.version += 1
+    db.session.commit()
+    embed_providers_cache.invalidate()
+    return provider.id
+
+
+# --- User Lookup Columns and Search Index ---
+# username_lower/email_lower back exact case-insensitive lookups; user_search_ngram
+# backs the admin substring search. Every writer fills both (ORM events here, Core
+# inserts in migrate_data.py). Users from before the columns existed have NULLs and
+# no postings until `flask backfill-user-search` has run; until then lookups and
+# searches fall back to LOWER() over the original columns.
+user_search = NgramIndex(db.metadata, 'user_search_ngram')
+# Seconds between re-checks for unfilled lookup columns; once filled they stay filled.
+app.config['USER_LOOKUP_CHECK_INTERVAL'] = 60
+user_lookup_state = TTLCache(ttl=app.config['USER_LOOKUP_CHECK_INTERVAL'], name='user_lookup_state', metrics=metrics)
+
+@event.listens_for(User, 'before_insert')
+@event.listens_for(User, 'before_update')
+def _set_user_lookup_columns(mapper, connection, target):
+    target.username_lower = target.username.lower() if target.username else None
+    target.email_lower = target.email.lower() if target.email else None
+
+@event.listens_for(User, 'after_insert')
+def _index_new_user(mapper, connection, target):
+    user_search.replace(connection, target.id, target.username, target.email)
+
+@event.listens_for(User, 'after_update')
+def _reindex_user(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.username.history.has_changes() or state.attrs.email.history.has_changes():
+        user_search.replace(connection, target.id, target.username, target.email)
+
+@event.listens_for(User, 'after_delete')
+def _unindex_user(mapper, connection, target):
+    user_search.remove(connection, target.id)
+
+def escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def user_lookup_ready():
+    """True once no user is waiting for the backfill of its lookup columns and search postings."""
+    ready = user_lookup_state.get('ready')
+    if ready is None:
+        unfilled = db.session.query(User.id).filter(
+            or_(User.username_lower.is_(None), User.email_lower.is_(None))).first()
+        ready = unfilled is None
+        # Every writer fills the columns, so once they are all filled the answer never changes.
+        user_lookup_state.set('ready', ready, ttl=float('inf') if ready else None)
+    return ready
+
+def user_lookup_columns():
+    """(username, email) expressions for case-insensitive comparisons: the indexed lookup columns when filled."""
+    if user_lookup_ready():
+        return User.username_lower, User.email_lower
+    return func.lower(User.username), func.lower(User.email)
+
+def search_users(query, term):
+    """
+    Narrows ``query`` (over User) to users whose username or email contains
+    ``term``. Returns the query and the id column to order and page it by,
+    which is the search index's when it can drive the search.
+    """
+    term = term.lower()
+    like = f"%{escape_like(term)}%"
+    username, email = user_lookup_columns()
+    query = query.filter(username.like(like, escape='\\') | email.like(like, escape='\\'))
+    if username is User.username_lower:
+        key = user_search.search_key(db.session.connection(), term)
+        if key is not None:
+            return user_search.join(query, User.id, key)
+    return query, User.id
+
+
+# --- Login Activity ---
+# Seconds between batched writes of buffered login counts.
+app.config['ACTIVITY_FLUSH_INTERVAL'] = int(os.getenv('ACTIVITY_FLUSH_INTERVAL', 10))
+activity = ActivityRecorder(app, db, User.__table__, metrics=metrics)
+
+
+# --- Pending User Expiry ---
+# Expired registrations are purged in the background rather than by the auth views.
+app.config['PENDING_SWEEP_INTERVAL'] = int(os.getenv('PENDING_SWEEP_INTERVAL', 60))
+app.config['PENDING_SWEEP_BATCH_SIZE'] = 500
+
+def pending_expiration_cutoff():
+    return datetime.utcnow() - timedelta(minutes=app.config['OTP_EXPIRATION_MINUTES'])
+
+def pending_is_expired(pending_user):
+    return pending_user.created_at is not None and pending_user.created_at < pending_expiration_cutoff()
+
+def sweep_expired_pending_users():
+    """Deletes expired PendingUser rows in batches (ids picked via the created_at index). Returns the count."""
+    cutoff = pending_expiration_cutoff()
+    batch_size = app.config['PENDING_SWEEP_BATCH_SIZE']
+    deleted = 0
+    while True:
+        ids = db.session.execute(
+            select(PendingUser.id).where(PendingUser.created_at < cutoff).order_by(PendingUser.created_at).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        PendingUser.query.filter(PendingUser.id.in_(ids)).delete(synchronize_session=False)
+        log_changes('pending_users', ids)
+        _mark_stats_dirty()
+        db.session.commit()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            break
+    if deleted:
+        app.logger.info("Swept %d expired pending users", deleted)
+    return deleted
+
+pending_sweeper = PeriodicTask('pending-user-sweep', app.config['PENDING_SWEEP_INTERVAL'], sweep_expired_pending_users, app=app)
+
+@app.before_request
+def _start_pending_sweeper():
+    pending_sweeper.ensure_started()
+
+def registration_conflicts(username, email):
+    """One UNION ALL over User and PendingUser: a (kind, id, created_at) row per account holding the email or username."""
+    no_timestamp = cast(null(), db.DateTime)
+    return union_all(
+        select(literal('user_email').label('kind'), User.id, no_timestamp.label('created_at')).where(User.email == email),
+        select(literal('user_username'), User.id, no_timestamp).where(User.username == username),
+        select(literal('pending_email'), PendingUser.id, PendingUser.created_at).where(PendingUser.email == email),
+        select(literal('pending_username'), PendingUser.id, PendingUser.created_at).where(PendingUser.username == username),
+    )
+
+
+# --- Row Serializers for the Admin APIs ---
+# List endpoints select exactly these columns and build their JSON dicts straight
+# from the row tuples, skipping ORM object construction and identity-map work.
+# The models' to_dict() methods feed the same functions, so both stay in sync.
+def row_of(obj, columns):
+    """The tuple a ``select(*columns)`` row would hold, read from an ORM object."""
+    return tuple(getattr(obj, column.key) for column in columns)
+
+def _cast_fields(cast):
+    """Parses the stored cast JSON into (list, "Name, Name" display string)."""
+    if not cast:
+        return [], ""
+    try:
+        cast_data = json.loads(cast)
+        return cast_data, ", ".join([actor.get('name', '') for actor in cast_data])
+    except (json.JSONDecodeError, TypeError):
+        return [], cast
+
+class _Artwork:
+    """Just the fields get_display_thumbnail()/get_display_backdrop() read."""
+    __slots__ = ('poster_url', 'backdrop_url', 'thumbnail')
+
+    def __init__(self, poster_url, backdrop_url, thumbnail):
+        self.poster_url = poster_url
+        self.backdrop_url = backdrop_url
+        self.thumbnail = thumbnail
+
+MOVIE_ROW_COLUMNS = (Movie.id, Movie.tmdb_id, Movie.title, Movie.description, Movie.embed_code, Movie.embed_provider_id,
+                     Movie.embed_external_id, Movie.poster_url, Movie.backdrop_url, Movie.thumbnail, Movie.release_date,
+                     Movie.director, Movie.genre, Movie.cast, Movie.created_at, Movie.content_type)
+
+def serialize_movie_row(row):
+    (id_, tmdb_id, title, description, embed_code, embed_provider_id, embed_external_id, poster_url, backdrop_url,
+     thumbnail, release_date, director, genre, cast, created_at, content_type) = row
+    cast_list, cast_display_string = _cast_fields(cast)
+    return {
+        "id": id_,
+        "tmdb_id": tmdb_id,
+        "title": title,
+        "description": description,
+        "embed_code": render_embed(embed_provider_id, embed_external_id, 'movie', embed_code),
+        "embed_provider_id": embed_provider_id,
+        "embed_external_id": embed_external_id,
+        "poster_url": poster_url,
+        "backdrop_url": backdrop_url,
+        "thumbnail": thumbnail,
+        "release_date": release_date,
+        "director": director,
+        "genre": genre,
+        "cast": cast_list,
+        "cast_display_string": cast_display_string,
+        "created_at": created_at.isoformat(),
+        "content_type": content_type,
+        "display_thumbnail": get_display_thumbnail(_Artwork(poster_url, backdrop_url, thumbnail)),
+    }
+
+SERIES_ROW_COLUMNS = (Series.id, Series.tmdb_id, Series.title, Series.description, Series.poster_url,
+                      Series.backdrop_url, Series.thumbnail, Series.release_date, Series.director, Series.genre,
+                      Series.cast, Series.created_at, Series.content_type, Series.download_url, Series.last_updated_at)
+
+def serialize_series_row(row):
+    (id_, tmdb_id, title, description, poster_url, backdrop_url, thumbnail, release_date, director,
+     genre, cast, created_at, content_type, download_url, last_updated_at) = row
+    cast_list, cast_display_string = _cast_fields(cast)
+    artwork = _Artwork(poster_url, backdrop_url, thumbnail)
+    return {
+        "id": id_,
+        "tmdb_id": tmdb_id,
+        "title": title,
+        "description": description,
+        "poster_url": poster_url,
+        "backdrop_url": backdrop_url,
+        "thumbnail": thumbnail,
+        "release_date": release_date,
+        "director": director,
+        "genre": genre,
+        "cast": cast_list,
+        "cast_display_string": cast_display_string,
+        "created_at": created_at.isoformat(),
+        "content_type": content_type,
+        "display_thumbnail": get_display_thumbnail(artwork),
+        "download_url": download_url,
+        "backdrop_display": get_display_backdrop(artwork),
+        "last_updated_at": last_updated_at.isoformat() if last_updated_at else None,
+    }
+
+USER_ROW_COLUMNS = (User.id, User.username, User.email, User.role, User.is_active, User.last_login_at, User.login_count)
+
+def serialize_user_row(row):
+    id_, username, email, role, is_active, last_login_at, login_count = row
+    return {
+        'id': id_,
+        'username': username,
+        'email': email,
+        'role': role,
+        'is_active': is_active,
+        'last_login_at': last_login_at.isoformat() if last_login_at else None,
+        'login_count': login_count
+    }
+
+PENDING_USER_ROW_COLUMNS = (PendingUser.id, PendingUser.username, PendingUser.email, PendingUser.otp, PendingUser.created_at)
+
+def serialize_pending_user_row(row):
+    id_, username, email, otp, created_at = row
+    return {
+        'id': id_,
+        'username': username,
+        'email': email,
+        'otp': otp,
+        'created_at': created_at.isoformat() if created_at else None
+    }
+
+REQUEST_ROW_COLUMNS = (MovieRequest.id, MovieRequest.title, MovieRequest.link, MovieRequest.notes,
+                       MovieRequest.status, MovieRequest.date)
+
+def serialize_request_row(row):
+    id_, title, link, notes, status, date = row
+    return {
+        "id": id_,
+        "title": title,
+        "link": link,
+        "notes": notes,
+        "status": status,
+        "date": date.strftime('%b %d, %Y')
+    }
+
+MESSAGE_ROW_COLUMNS = (ContactMessage.id, ContactMessage.name, ContactMessage.email, ContactMessage.subject,
+                       ContactMessage.message, ContactMessage.date, ContactMessage.status)
+
+def serialize_message_row(row):
+    id_, name, email, subject, message, date, status = row
+    return {
+        "id": id_,
+        "name": name,
+        "email": email,
+        "subject": subject,
+        "message": message,
+        "date": date.strftime('%b %d, %Y %H:%M'),
+        "status": status
+    }
+
+
+# --- List Query Shapes ---
+# Grids, shelves and related lists only show a poster, the title, a date and the
+# genres. Their queries load just these columns, so the large Text columns
+# (description, embed_code, cast, download_url) never leave the database for them.
+CARD_COLUMNS = {
+    Movie: (Movie.id, Movie.title, Movie.poster_url, Movie.backdrop_url, Movie.thumbnail, Movie.release_date,
+            Movie.genre, Movie.created_at, Movie.content_type),
+    Series: (Series.id, Series.title, Series.poster_url, Series.backdrop_url, Series.thumbnail, Series.release_date,
+             Series.genre, Series.created_at, Series.content_type, Series.last_updated_at),
+}
+
+# Newest-first ordering used by the shelves: series bubble up when an episode is added.
+CARD_SORT = {Movie: Movie.created_at, Series: Series.last_updated_at}
+
+def card_select(model):
+    """``select()`` of the card columns plus a ``sort_at`` timestamp, for building Card view models."""
+    return select(*CARD_COLUMNS[model], CARD_SORT[model].label('sort_at'))
+
+def catalog_select(model):
+    """``card_select()`` limited to the columns Movie and Series share, so the two line up in a UNION ALL."""
+    return select(*(getattr(model, column.key) for column in CARD_COLUMNS[Movie]), CARD_SORT[model].label('sort_at'))
+
+# Catalog pages are read off the cursor in batches of this many rows (a
+# server-side cursor on MySQL) instead of being buffered whole by the driver.
+CATALOG_YIELD_PER = 60
+
+def serialize_card_row(row):
+    """Dashboard grid entry, from a card-column row or an ORM object."""
+    return {
+        "id": row.id,
+        "title": row.title,
+        "content_type": row.content_type,
+        "release_date": row.release_date,
+        "genre": row.genre,
+        "created_at": row.created_at.isoformat(),
+        "display_thumbnail": get_display_thumbnail(row),
+    }
+
+
+# --- Catalog View Models ---
+# Templates render these immutable tuples instead of ORM instances with display
+# attributes bolted on, so a page holds no identity-map entries while it renders.
+Card = namedtuple('Card', 'id title content_type release_date sort_at thumbnail_display thumbnail_sources')
+FeaturedCard = namedtuple('FeaturedCard', 'id title content_type release_date description backdrop_display')
+
+def card_from_row(row):
+    return Card(row.id, row.title, row.content_type, row.release_date, row.sort_at,
+                get_display_thumbnail(row), get_display_sources(row))
+
+def cards(statement):
+    """Runs a ``card_select()`` statement and returns its rows as Cards."""
+    return [card_from_row(row) for row in db.session.execute(statement)]
+
+def featured_from_row(row):
+    """Hero view model; its description is the one heavy column index() reads."""
+    model = Series if row.content_type == 'series' else Movie
+    description = db.session.execute(select(model.description).where(model.id == row.id)).scalar()
+    return FeaturedCard(row.id, row.title, row.content_type, row.release_date, description,
+                        get_display_backdrop(row))
+
+
+# --- Dashboard stats cache invalidation ---
+# Any committed insert/update/delete of a counted model drops the cached /api/stats
+# payload in this worker; other workers pick the change up when their TTL expires.
+def _counted_models():
+    return (Movie, Series, MovieRequest, User, PendingUser, ContactMessage)
+
+@event.listens_for(db.session, 'after_flush')
+def _flag_stats_dirty(session, flush_context):
+    counted = _counted_models()
+    if any(isinstance(obj, counted) for obj in (*session.new, *session.deleted, *session.dirty)):
+        session.info['stats_dirty'] = True
+
+def _mark_stats_dirty():
+    """For query-level updates and deletes, which bypass the after_flush check."""
+    db.session.info['stats_dirty'] = True
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_stats_cache(session):
+    if session.info.pop('stats_dirty', False):
+        stats_cache.invalidate()
+
+@event.listens_for(db.session, 'after_rollback')
+def _clear_stats_flag(session):
+    session.info.pop('stats_dirty', None)
+
+
+# --- Change Log ---
+# Every flushed insert/update/delete of a counted model appends (kind, row_id) to
+# change_log in the same transaction. Query-level bulk statements bypass the flush,
+# so their callers use log_changes() themselves.
+CHANGE_KINDS = {Movie: 'movies', Series: 'series', User: 'users', PendingUser: 'pending_users',
+                MovieRequest: 'requests', ContactMessage: 'messages'}
+
+def _change_rows(kind, row_ids):
+    now = datetime.utcnow()
+    return [{'kind': kind, 'row_id': str(row_id), 'created_at': now} for row_id in row_ids]
+
+def log_changes(kind, row_ids):
+    rows = _change_rows(kind, row_ids)
+    if rows:
+        db.session.execute(ChangeLog.__table__.insert(), rows)
+
+@event.listens_for(db.session, 'after_flush')
+def _log_flushed_changes(session, flush_context):
+    rows = []
+    for obj in (*session.new, *session.deleted, *session.dirty):
+        kind = CHANGE_KINDS.get(type(obj))
+        if kind and (obj in session.new or obj in session.deleted or session.is_modified(obj)):
+            rows.extend(_change_rows(kind, [obj.id]))
+    if rows:
+        session.connection().execute(ChangeLog.__table__.insert(), rows)
+
+
+def compute_dashboard_stats():
+    """Collects every dashboard counter in one round trip using scalar subqueries."""
+    def count(model, *criteria):
+        return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+    row = db.session.execute(select(
+        count(Movie).label('totalMovies'),
+        count(Series).label('totalSeries'),
+        count(MovieRequest, MovieRequest.status == 'Pending').label('pendingRequests'),
+        count(User).label('totalUsers'),
+        count(PendingUser).label('pendingUsers'),
+        count(ContactMessage, ContactMessage.status == 'New').label('totalNewMessages'),
+    )).one()
+    return dict(row._mapping)
 
 
 class Pagination:
@@ -404,24 +978,126 @@ class Pagination:
                 last = num
 
 
+# --- Keyset Pagination for Admin Lists ---
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(timestamp, row_id):
+    """
+    Packs the (timestamp, id) of the last row on a page into an opaque cursor.
+    Keyset-paged date columns are NOT NULL; maintenance.py fill-*-dates backfills old rows.
+    """
+    return base64.urlsafe_b64encode(f'{timestamp.isoformat()}|{row_id}'.encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|', 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursor(str(e))
+
+def encode_id_cursor(row_id):
+    """Cursor for lists ordered by id alone."""
+    return base64.urlsafe_b64encode(str(row_id).encode()).decode()
+
+def decode_id_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursor(str(e))
+
+def admin_list_params():
+    """Reads limit/cursor/status from the query string, clamping limit to the configured maximum."""
+    limit = request.args.get('limit', app.config['ADMIN_LIST_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, app.config['ADMIN_LIST_MAX_PAGE_SIZE']))
+    cursor = request.args.get('cursor') or None
+    status = request.args.get('status') or None
+    return limit, cursor, status
+
+def keyset_page(query, date_column, id_column, cursor, limit):
+    """
+    Orders newest first and seeks past ``cursor`` instead of using OFFSET, so every
+    page is one index range scan regardless of how deep the admin has scrolled.
+    Fetches one extra row to tell whether another page exists.
+    """
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.filter(or_(date_column < timestamp, and_(date_column == timestamp, id_column < row_id)))
+    return query.order_by(date_column.desc(), id_column.desc()).limit(limit + 1)
+
+def id_keyset_page(query, id_column, cursor, limit):
+    """Like keyset_page() for lists ordered by id alone, newest (highest id) first."""
+    if cursor:
+        query = query.filter(id_column < decode_id_cursor(cursor))
+    return query.order_by(id_column.desc()).limit(limit + 1)
+
+def estimated_row_count(model, fallback):
+    """
+    Cheap row estimate for ``model``'s table from the database's own statistics
+    (InnoDB's TABLE_ROWS, PostgreSQL's reltuples). Backends without them, or a
+    table that has never been analyzed, use ``fallback()`` instead.
+    """
+    dialect = db.engine.dialect.name
+    table = model.__table__.name
+    try:
+        if dialect == 'mysql':
+            estimate = db.session.execute(db.text(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table'), {'table': table}).scalar()
+        elif dialect == 'postgresql':
+            estimate = db.session.execute(db.text(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)'), {'table': table}).scalar()
+        else:
+            estimate = None
+    except Exception:
+        app.logger.warning("Could not read table statistics for %s", table, exc_info=True)
+        estimate = None
+    return int(estimate) if estimate is not None and estimate >= 0 else fallback()
+
+def stream_json_page(rows, serialize, limit, cursor_of, extra=None):
+    """
+    Streams ``{"items": [...], "has_next": bool, "next_cursor": str|null}`` one row at a
+    time, followed by any ``extra`` top-level keys. ``rows`` must already be executed so
+    database errors surface before streaming.
+    """
+    def generate():
+        yield '{"items":['
+        last = None
+        has_next = False
+        for index, row in enumerate(rows):
+            if index == limit:
+                has_next = True
+                break
+            if index:
+                yield ','
+            yield app.json.dumps(serialize(row))
+            last = row
+        next_cursor = cursor_of(last) if has_next and last is not None else None
+        yield '],"has_next":%s,"next_cursor":%s' % (json.dumps(has_next), json.dumps(next_cursor))
+        for key, value in (extra or {}).items():
+            yield ',%s:%s' % (json.dumps(key), app.json.dumps(value))
+        yield '}'
+    return streamed_response(coalesce(generate(), app.config['STREAM_TEMPLATE_CHUNK']), 'application/json')
+
+
 # --- Context Processors for Navbar Genres ---
+# Lazy, so pages that never show the genre menus don't load every title to build them.
+def _genre_set(model):
+    genres = set()
+    for (genre,) in db.session.query(model.genre).filter(model.genre.isnot(None)):
+        genres.update([g.strip() for g in genre.split(',') if g.strip()])
+    return genres
+
+def _collect_genres(model):
+    return sorted(list(_genre_set(model)))
+
 @app.context_processor
 def inject_movie_genres():
-    all_movies = Movie.query.all()
-    genres = set()
-    for movie in all_movies:
-        if movie.genre:
-            genres.update([g.strip() for g in movie.genre.split(',') if g.strip()])
-    return dict(movie_genres=sorted(list(genres)))
+    return dict(movie_genres=Lazy(lambda: _collect_genres(Movie)))
 
 @app.context_processor
 def inject_series_genres():
-    all_series = Series.query.all()
-    genres = set()
-    for series_item in all_series:
-        if series_item.genre:
-            genres.update([g.strip() for g in series_item.genre.split(',') if g.strip()])
-    return dict(series_genres=sorted(list(genres)))
+    return dict(series_genres=Lazy(lambda: _collect_genres(Series)))
 
 
 # --- Main Application Routes ---
@@ -437,138 +1113,85 @@ def index():
     search_query = request.args.get('search_query', '').strip()
     category = request.args.get('category', 'all').strip()
 
-    # --- Fetching all genres for the filter dropdown (existing logic - NO CHANGE) ---
-    all_movies_for_genres = Movie.query.all()
-    all_series_for_genres = Series.query.all()
-
-    all_genres = set()
-    for item in all_movies_for_genres + all_series_for_genres:
-        if item.genre:
-            genres_list = [g.strip() for g in item.genre.split(',') if g.strip()]
-            all_genres.update(genres_list)
-    sorted_genres = sorted(list(all_genres))
-    # --- End of existing genre fetching ---
-
-    # --- NEW: Fetching Data for Specific Homepage Sections ---
-    new_releases_limit = 30
-
-    # Fetch movies by created_at (as before)
-    new_release_movies = Movie.query.order_by(db.desc(Movie.created_at)).limit(new_releases_limit).all()
-
-    # Fetch series by last_updated_at (THIS IS A CHANGE)
-    # OLD: new_release_series = Series.query.order_by(db.desc(Series.created_at)).limit(new_releases_limit).all()
-    new_release_series = Series.query.order_by(db.desc(Series.last_updated_at)).limit(new_releases_limit).all() # <--- MODIFIED LINE
-
-    new_releases = new_release_movies + new_release_series
-    # Sort the combined list by their respective latest timestamps (THIS IS A CHANGE)
-    # OLD: new_releases.sort(key=lambda x: x.created_at, reverse=True)
-    new_releases.sort(key=lambda x: x.last_updated_at if isinstance(x, Series) else x.created_at, reverse=True) # <--- MODIFIED LINE
-    new_releases = new_releases[:new_releases_limit]
-
-    category_limit = 30
-
-    # --- Horror Content (modify to use last_updated_at for series) ---
-    horror_movies = Movie.query.filter(Movie.genre.like('%Horror%')).order_by(db.desc(Movie.created_at)).limit(category_limit).all()
-    # OLD: horror_series = Series.query.filter(Series.genre.like('%Horror%')).order_by(db.desc(Series.created_at)).limit(category_limit).all()
-    horror_series = Series.query.filter(Series.genre.like('%Horror%')).order_by(db.desc(Series.last_updated_at)).limit(category_limit).all() # <--- MODIFIED LINE
-    horror_content = horror_movies + horror_series
-    # OLD: horror_content.sort(key=lambda x: x.created_at, reverse=True)
-    horror_content.sort(key=lambda x: x.last_updated_at if isinstance(x, Series) else x.created_at, reverse=True) # <--- MODIFIED LINE
-    horror_content = horror_content[:category_limit]
-
-
-    # --- Crime Content (modify to use last_updated_at for series) ---
-    crime_movies = Movie.query.filter(Movie.genre.like('%Crime%')).order_by(db.desc(Movie.created_at)).limit(category_limit).all()
-    # OLD: crime_series = Series.query.filter(Series.genre.like('%Crime%')).order_by(db.desc(Series.created_at)).limit(category_limit).all()
-    crime_series = Series.query.filter(Series.genre.like('%Crime%')).order_by(db.desc(Series.last_updated_at)).limit(category_limit).all() # <--- MODIFIED LINE
-    crime_content = crime_movies + crime_series
-    # OLD: crime_content.sort(key=lambda x: x.created_at, reverse=True)
-    crime_content.sort(key=lambda x: x.last_updated_at if isinstance(x, Series) else x.created_at, reverse=True) # <--- MODIFIED LINE
-    crime_content = crime_content[:category_limit]
-
-
-    # --- Action Content (modify to use last_updated_at for series) ---
-    action_movies = Movie.query.filter(Movie.genre.like('%Action%')).order_by(db.desc(Movie.created_at)).limit(category_limit).all()
-    # OLD: action_series = Series.query.filter(Series.genre.like('%Action%')).order_by(db.desc(Series.created_at)).limit(category_limit).all()
-    action_series = Series.query.filter(Series.genre.like('%Action%')).order_by(db.desc(Series.last_updated_at)).limit(category_limit).all() # <--- MODIFIED LINE
-    action_content = action_movies + action_series
-    # OLD: action_content.sort(key=lambda x: x.created_at, reverse=True)
-    action_content.sort(key=lambda x: x.last_updated_at if isinstance(x, Series) else x.created_at, reverse=True) # <--- MODIFIED LINE
-    action_content = action_content[:category_limit]
-
-
-    # Apply display thumbnail for new sections (NO CHANGE)
-    for item in new_releases:
-        item.thumbnail_display = get_display_thumbnail(item)
-    for item in horror_content:
-        item.thumbnail_display = get_display_thumbnail(item)
-    for item in crime_content:
-        item.thumbnail_display = get_display_thumbnail(item)
-    for item in action_content:
-        item.thumbnail_display = get_display_thumbnail(item)
-
-
-    # --- Existing: Main Paginated Content Logic (for "Trending Now" / Search / Filter) ---
-    movies_query = Movie.query
-    series_query = Series.query
-
-    if category and category != 'all':
-        if category == 'all-movies':
-            series_query = series_query.filter(False) # Exclude series
-        elif category == 'all-series':
-            movies_query = movies_query.filter(False) # Exclude movies
+    # Every section below is a Lazy value: its queries run when the template
+    # reaches it, so with STREAM_TEMPLATES the page head is already sent.
+    def load_genres():
+        return sorted(_genre_set(Movie) | _genre_set(Series))
+
+    def load_shelf(genre=None, limit=30):
+        """Newest movies and series (optionally of one genre), merged by their latest timestamp."""
+        movies = card_select(Movie)
+        series = card_select(Series)
+        if genre:
+            movies = movies.filter(Movie.genre.like(f'%{genre}%'))
+            series = series.filter(Series.genre.like(f'%{genre}%'))
+        items = (cards(movies.order_by(db.desc(Movie.created_at)).limit(limit)) +
+                 cards(series.order_by(db.desc(Series.last_updated_at)).limit(limit)))
+        items.sort(key=lambda card: card.sort_at, reverse=True)
+        return items[:limit]
+
+    # --- Main Paginated Content Logic (for "Trending Now" / Search / Filter) ---
+    # Movies and series are merged, ordered and paged by the database, so a page
+    # reads per_page rows however large the filtered catalog is.
+    def load_catalog():
+        movies_query = catalog_select(Movie)
+        series_query = catalog_select(Series)
+
+        if category and category != 'all':
+            if category == 'all-movies':
+                series_query = series_query.filter(False) # Exclude series
+            elif category == 'all-series':
+                movies_query = movies_query.filter(False) # Exclude movies
+            else:
+                search_genre = f"%{category}%"
+                movies_query = movies_query.filter(Movie.genre.like(search_genre))
+                series_query = series_query.filter(Series.genre.like(search_genre))
+
+        if search_query:
+            search_term = f"%{search_query.lower()}%"
+            movies_query = movies_query.filter(Movie.title.ilike(search_term))
+            series_query = series_query.filter(Series.title.ilike(search_term))
+
+        catalog = union_all(movies_query, series_query).subquery('catalog')
+        return catalog, select(catalog).order_by(catalog.c.sort_at.desc(), catalog.c.id.desc())
+
+    # The very latest item is the hero on the unfiltered first page; it gets its
+    # own LIMIT 1 query so the hero at the top of the page doesn't wait on the grid.
+    show_featured = page == 1 and not search_query and category == 'all'
+
+    def load_featured():
+        if not show_featured:
+            return None
+        row = db.session.execute(load_catalog()[1].limit(1)).first()
+        return featured_from_row(row) if row else None
+
+    def load_main():
+        catalog, ordered = load_catalog()
+        per_page = app.config.get('PER_PAGE', 120)
+        start = (page - 1) * per_page
+        # Ensure the featured item is NOT duplicated in the main paginated list
+        skip = 1 if show_featured else 0
+        rows = db.session.execute(ordered.offset(start + skip).limit(per_page - skip),
+                                  execution_options={'yield_per': CATALOG_YIELD_PER})
+        items = [card_from_row(row) for row in rows]
+        if (items and len(items) < per_page - skip) or (not items and not start):
+            total = start + len(items)  # a short page is the last one, so no COUNT is needed
         else:
-            search_genre = f"%{category}%"
-            movies_query = movies_query.filter(Movie.genre.like(search_genre))
-            series_query = series_query.filter(Series.genre.like(search_genre))
-
-    if search_query:
-        search_term = f"%{search_query.lower()}%"
-        movies_query = movies_query.filter(Movie.title.ilike(search_term))
-        series_query = series_query.filter(Series.title.ilike(search_term))
-
-    # IMPORTANT: Adjust the sorting here for the main paginated content too (THIS IS A CHANGE)
-    all_content_filtered = movies_query.all() + series_query.all()
-    # OLD: all_content_filtered.sort(key=lambda x: x.created_at, reverse=True)
-    all_content_filtered.sort(key=lambda x: x.last_updated_at if hasattr(x, 'last_updated_at') else x.created_at, reverse=True) # <--- MODIFIED LINE
-
-    total = len(all_content_filtered)
-    per_page = app.config.get('PER_PAGE', 120)
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated_items = all_content_filtered[start:end]
-
-    pagination = Pagination(page, per_page, total, paginated_items)
-
-    for item in pagination.items:
-        item.thumbnail_display = get_display_thumbnail(item)
+            total = max(db.session.execute(select(func.count()).select_from(catalog)).scalar() - skip, 0)
+        return Pagination(page, per_page, total, items)
 
-    featured_item = None
-    if page == 1 and not search_query and category == 'all':
-        if paginated_items:
-            featured_item = paginated_items[0] # The very latest item is the featured one
-            featured_item.backdrop_display = get_display_backdrop(featured_item)
-            # Ensure the featured item is NOT duplicated in the main paginated list
-            # Filter out the featured item if it appears in the paginated list
-            paginated_items = [item for item in paginated_items if item.id != featured_item.id]
-            # Re-create pagination object if the list of items changed
-            total_after_featured = total - 1 if featured_item else total
-            pagination = Pagination(page, per_page, total_after_featured, paginated_items)
-
-
-    return render_template(
+    return render_page(
         'index.html',
-        pagination=pagination,
-        featured_item=featured_item,
+        pagination=Lazy(load_main),
+        featured_item=Lazy(load_featured),
         search_query=search_query,
         category=category,
         form=form,
-        genres=sorted_genres,
-        # --- NEW: Pass the content for the new sections to the template ---
-        new_releases=new_releases,
-        horror_content=horror_content,
-        crime_content=crime_content,
-        action_content=action_content
+        genres=Lazy(load_genres),
+        new_releases=Lazy(load_shelf),
+        horror_content=Lazy(lambda: load_shelf('Horror')),
+        crime_content=Lazy(lambda: load_shelf('Crime')),
+        action_content=Lazy(lambda: load_shelf('Action'))
     )
 
 @app.route('/movie/<movie_id>')
@@ -578,7 +1201,7 @@ def movie_detail(movie_id):
         return redirect(url_for('login'))
 
     movie = Movie.query.get_or_404(movie_id)
-    movie.display_poster = get_display_thumbnail(movie)
+    movie.display_poster = get_display_poster(movie)
     movie.backdrop_display = get_display_backdrop(movie)
 
     cast_list = []
@@ -592,14 +1215,11 @@ def movie_detail(movie_id):
     if movie.genre:
         first_genre = movie.genre_list[0] if movie.genre_list else None
         if first_genre:
-            related_movies_query = Movie.query.filter(Movie.genre.like(f'%{first_genre}%'), Movie.id != movie_id).limit(10)
-            related_movies = related_movies_query.all()
+            related_movies_query = card_select(Movie).filter(Movie.genre.like(f'%{first_genre}%'), Movie.id != movie_id).limit(10)
+            related_movies = cards(related_movies_query)
 
     if not related_movies:
-        related_movies = Movie.query.filter(Movie.id != movie_id).order_by(db.desc(Movie.created_at)).limit(5).all()
-
-    for m_related in related_movies:
-        m_related.thumbnail_display = get_display_thumbnail(m_related)
+        related_movies = cards(card_select(Movie).filter(Movie.id != movie_id).order_by(db.desc(Movie.created_at)).limit(5))
 
     return render_template('movie_detail.html', item=movie, cast=cast_list, director=movie.director, related_movies=related_movies)
 
@@ -611,7 +1231,7 @@ def series_detail(series_id):
         return redirect(url_for('login'))
 
     series = Series.query.options(joinedload(Series.seasons).joinedload(Season.episodes)).get_or_404(series_id)
-    series.display_poster = get_display_thumbnail(series)
+    series.display_poster = get_display_poster(series)
     series.backdrop_display = get_display_backdrop(series)
 
     cast_list = []
@@ -625,12 +1245,9 @@ def series_detail(series_id):
     if series.genre:
         first_genre = series.genre_list[0] if series.genre_list else None
         if first_genre:
-            related_series_candidates = Series.query.filter(Series.genre.like(f'%{first_genre}%'), Series.id != series_id).limit(10).all()
+            related_series_candidates = cards(card_select(Series).filter(Series.genre.like(f'%{first_genre}%'), Series.id != series_id).limit(10))
             related_series = random.sample(related_series_candidates, min(len(related_series_candidates), 5))
 
-    for s_related in related_series:
-        s_related.thumbnail_display = get_display_thumbnail(s_related)
-
     return render_template('movie_detail.html', item=series, cast=cast_list, director=series.director, related_movies=related_series)
 
 
@@ -640,7 +1257,6 @@ def series_detail(series_id):
 def register():
     form = MyBaseForm()
     if request.method == 'POST':
-        print("--- DEBUG: REGISTRATION POST received ---")
         username = request.form['username'].strip()
         email = request.form['email'].strip().lower()
         password = request.form['password']
@@ -651,53 +1267,44 @@ def register():
             flash("All fields are required.", 'error')
             return render_template('register.html', form=form, **request.form)
 
-        now = datetime.utcnow()
-        expiration_cutoff = now - timedelta(minutes=app.config['OTP_EXPIRATION_MINUTES'])
-
-        # Clean up expired pending users for the given email/username
-        expired_pending_email = PendingUser.query.filter_by(email=email).filter(PendingUser.created_at < expiration_cutoff).first()
-        if expired_pending_email:
-            db.session.delete(expired_pending_email)
-            db.session.commit()
-            print(f"--- DEBUG: Cleaned up expired pending user by email: {email} ---")
-
-        expired_pending_username = PendingUser.query.filter_by(username=username).filter(PendingUser.created_at < expiration_cutoff).first()
-        if expired_pending_username:
-            db.session.delete(expired_pending_username)
-            db.session.commit()
-            print(f"--- DEBUG: Cleaned up expired pending user by username: {username} ---")
+        # Check for active users or fresh pending users in one query
+        expiration_cutoff = pending_expiration_cutoff()
+        taken = set()
+        expired_pending_ids = set()
+        for kind, row_id, created_at in db.session.execute(registration_conflicts(username, email)):
+            if kind.startswith('pending_') and created_at is not None and created_at < expiration_cutoff:
+                expired_pending_ids.add(row_id)
+            else:
+                taken.add(kind)
 
-        # Check for active users or fresh pending users
-        if User.query.filter_by(email=email).first() or PendingUser.query.filter_by(email=email).first():
-            print(f"--- DEBUG: REGISTRATION FAILED: Email {email} already exists or is currently awaiting verification ---")
+        if taken & {'user_email', 'pending_email'}:
+            app.logger.debug("Registration rejected: email %s already registered or awaiting verification", email)
             flash('This email address is already registered or currently awaiting verification.', 'error')
             return render_template('register.html', form=form, **request.form)
 
-        if User.query.filter_by(username=username).first() or PendingUser.query.filter_by(username=username).first():
-            print(f"--- DEBUG: REGISTRATION FAILED: Username {username} already taken or is currently awaiting verification ---")
+        if taken & {'user_username', 'pending_username'}:
+            app.logger.debug("Registration rejected: username %s already taken or awaiting verification", username)
             flash('This username is already taken or currently awaiting verification.', 'error')
             return render_template('register.html', form=form, **request.form)
 
+        if expired_pending_ids:
+            # The sweeper has not reached these yet; drop them with the insert so the unique constraints hold.
+            PendingUser.query.filter(PendingUser.id.in_(expired_pending_ids)).delete(synchronize_session=False)
+            log_changes('pending_users', expired_pending_ids)
+
         otp = str(random.randint(100000, 999999))
         new_pending_user = PendingUser(username=username, email=email, password=generate_password_hash(password), security_question=security_question, security_answer=security_answer, otp=otp)
         db.session.add(new_pending_user)
 
         try:
-            print(f"--- DEBUG: Attempting to send OTP to {email} ---")
             send_otp_email(email, otp)
-            print("--- DEBUG: OTP Email sent successfully ---")
-
             db.session.commit()
-            print("--- DEBUG: Pending user committed to database ---")
-
             session['pending_email'] = email
-            print("--- DEBUG: Redirecting to verify_email page ---")
+            app.logger.info("Registration pending email verification for %s", email)
             return redirect(url_for('verify_email'))
 
-        except Exception as e:
-            print(f"---!!! DEBUG: AN ERROR OCCURRED IN REGISTRATION: {e} !!!---")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            app.logger.exception("Registration failed for %s", email)
             db.session.rollback()
             flash('An error occurred on the server. Please try again later. (Email service issue likely)', 'error')
 
@@ -720,11 +1327,8 @@ def verify_email():
         session.pop('pending_email', None)
         return redirect(url_for('register'))
 
-    now = datetime.utcnow()
-    expiration_cutoff = now - timedelta(minutes=app.config['OTP_EXPIRATION_MINUTES'])
-    if pending_user.created_at < expiration_cutoff:
-        db.session.delete(pending_user)
-        db.session.commit()
+    # Expired rows are left for the sweeper; they just can't be verified any more.
+    if pending_is_expired(pending_user):
         flash('Your OTP has expired. Please register again to get a new one.', 'error')
         session.pop('pending_email', None)
         return redirect(url_for('register'))
@@ -754,10 +1358,7 @@ def login():
         password = request.form['password']
 
         user = User.query.filter_by(email=email).first()
-        pending_user = PendingUser.query.filter_by(email=email).first()
-
-        now = datetime.utcnow()
-        expiration_cutoff = now - timedelta(minutes=app.config['OTP_EXPIRATION_MINUTES'])
+        pending_user = None if user else PendingUser.query.filter_by(email=email).first()
 
         if user:
             if not user.is_active:
@@ -765,22 +1366,20 @@ def login():
                 return render_template('login.html', form=form, email=email)
 
             if check_password_hash(user.password, password):
+                server_sessions.regenerate(session)
                 session.permanent = True
                 session['user'] = user.username
                 session['user_role'] = user.role
                 session['user_id'] = user.id
-                user.last_login_at = datetime.utcnow()
-                user.login_count = (user.login_count or 0) + 1
-                db.session.commit()
+                # last_login_at/login_count are written in batches off the request path.
+                activity.record_login(user.id)
                 flash('Login successful!', 'success')
                 return redirect(url_for('index'))
             else:
                 flash('Invalid email or password.', 'error')
                 return render_template('login.html', form=form, email=email)
         elif pending_user:
-            if pending_user.created_at < expiration_cutoff:
-                db.session.delete(pending_user)
-                db.session.commit()
+            if pending_is_expired(pending_user):
                 flash('Your previous registration attempt has expired. Please register again.', 'error')
                 return redirect(url_for('register'))
             else:
@@ -803,7 +1402,8 @@ def forgot_password():
     form = MyBaseForm()
     if request.method == 'POST':
         username_input = request.form.get('username', '').strip()
-        user = User.query.filter(User.username.ilike(username_input)).first()
+        username_column, _ = user_lookup_columns()
+        user = User.query.filter(username_column == username_input.lower()).first()
         if 'answer' in request.form:
             answer = request.form.get('answer', '').strip().lower()
             new_password = request.form.get('new_password', '').strip()
@@ -827,7 +1427,7 @@ def forgot_password():
 
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return thumbnails.send_upload(filename)
 
 @app.route('/logout')
 def user_logout():
@@ -844,6 +1444,7 @@ def admin_login():
         submitted_username = request.form['username']
         submitted_password = request.form['password']
         if submitted_username == ADMIN_USERNAME and check_password_hash(ADMIN_PASSWORD_HASH, submitted_password):
+            server_sessions.regenerate(session)
             session['admin'] = True
             admin_user = User.query.filter_by(username=ADMIN_USERNAME).first()
             if admin_user:
@@ -867,7 +1468,16 @@ def admin_logout():
 @admin_required
 def admin_dashboard():
     form = MyBaseForm()
-    return render_template('admin_dashboard.html', form=form)
+    return render_page('admin_dashboard.html', form=form)
+
+@app.route('/admin/metrics')
+@admin_required
+def admin_metrics():
+    """Exposes process metrics in Prometheus text format."""
+    response = make_response(metrics.render())
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 
 # --- Admin Content Management API Routes ---
@@ -878,25 +1488,9 @@ def admin_dashboard():
 def get_stats():
     """Fetches various statistics for the admin dashboard overview."""
     try:
-        movie_count = db.session.query(Movie.id).count()
-        series_count = db.session.query(Series.id).count()
-        pending_requests = db.session.query(MovieRequest.id).filter_by(status='Pending').count()
-        total_users = db.session.query(User.id).count()
-        pending_users = db.session.query(PendingUser.id).count()
-        total_new_messages = db.session.query(ContactMessage.id).filter_by(status='New').count()
-
-        return jsonify({
-            'totalMovies': movie_count,
-            'totalSeries': series_count,
-            'pendingRequests': pending_requests,
-            'totalUsers': total_users,
-            'pendingUsers': pending_users,
-            'totalNewMessages': total_new_messages
-        })
+        return jsonify(stats_cache.get_or_set('dashboard', compute_dashboard_stats))
     except Exception as e:
-        print(f"Error fetching stats: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("Error fetching stats")
         return jsonify({'error': 'Failed to fetch statistics.', 'details': str(e)}), 500
 
 
@@ -908,21 +1502,27 @@ def get_content():
     page = request.args.get('page', 1, type=int)
     per_page = 24
 
-    movies = Movie.query.order_by(Movie.created_at.desc()).all()
-    series = Series.query.order_by(Series.created_at.desc()).all()
-
-    all_content = sorted(movies + series, key=lambda x: x.created_at, reverse=True)
-
-    total = len(all_content)
     start = (page - 1) * per_page
     end = start + per_page
-    paginated_items = all_content[start:end]
+
+    # Only the newest ``end`` rows of each table can land on this page; merge those
+    # instead of loading and sorting the whole catalog.
+    # The grid only needs card columns; the edit modal fetches the full movie from api_get_movie.
+    movie_rows = db.session.execute(select(*CARD_COLUMNS[Movie]).order_by(Movie.created_at.desc()).limit(end)).all()
+    series_rows = db.session.execute(select(*CARD_COLUMNS[Series]).order_by(Series.created_at.desc()).limit(end)).all()
+    merged = heapq.merge(movie_rows, series_rows, key=lambda row: row.created_at, reverse=True)
+    paginated_items = list(itertools.islice(merged, start, end))
+
+    total = db.session.execute(select(
+        select(func.count()).select_from(Movie).scalar_subquery() +
+        select(func.count()).select_from(Series).scalar_subquery()
+    )).scalar()
 
     has_next = end < total
     next_page_number = page + 1 if has_next else None
 
     return jsonify({
-        'items': [item.to_dict() for item in paginated_items],
+        'items': [serialize_card_row(row) for row in paginated_items],
         'has_next': has_next,
         'next_page_number': next_page_number,
         'total_items': total
@@ -960,15 +1560,14 @@ def add_content():
                 db.session.add(new_season)
                 db.session.flush()
                 for episode_data in season_data.get('episodes', []):
-                    new_episode = Episode(number=episode_data.get('number'), title=episode_data.get('title'), embed_code=episode_data.get('embed_code'), season_id=new_season.id)
+                    new_episode = Episode(number=episode_data.get('number'), title=episode_data.get('title'), season_id=new_season.id)
+                    assign_embed(new_episode, episode_data.get('embed_code'), 'episode')
                     db.session.add(new_episode)
             db.session.commit()
             return jsonify({'success': True, 'message': 'Series added successfully!', 'item': new_series.to_dict()})
         except Exception as e:
             db.session.rollback()
-            print(f"Error adding series: {e}")
-            import traceback
-            traceback.print_exc()
+            app.logger.exception("Error adding series")
             return jsonify({'success': False, 'message': f'Database error when adding series: {str(e)}'}), 500
     else:
         movie_title = request.form.get('title')
@@ -991,13 +1590,10 @@ def add_content():
         movie_thumbnail_file = request.files.get('thumbnail')
         if movie_thumbnail_file and allowed_file(movie_thumbnail_file.filename):
             try:
-                filename = secure_filename(movie_thumbnail_file.filename)
-                thumbnail_extension = os.path.splitext(filename)[1]
-                local_thumbnail_filename = str(uuid.uuid4()) + thumbnail_extension
-                thumbnail_path = os.path.join(app.config['UPLOAD_FOLDER'], local_thumbnail_filename)
-                movie_thumbnail_file.save(thumbnail_path)
+                movie_thumbnail_file.filename = secure_filename(movie_thumbnail_file.filename)
+                local_thumbnail_filename = thumbnails.save_upload(movie_thumbnail_file)
             except Exception as e:
-                print(f"Error saving thumbnail file: {e}")
+                app.logger.error("Error saving thumbnail file: %s", e)
                 return jsonify({'success': False, 'message': f'Error saving thumbnail: {e}'}), 500
 
         new_movie = Movie(
@@ -1006,7 +1602,6 @@ def add_content():
             title=movie_title,
             description=request.form.get('description'),
             genre=request.form.get('genres'),
-            embed_code=movie_embed_code,
             poster_url=request.form.get('poster_url') if not local_thumbnail_filename else None,
             backdrop_url=request.form.get('backdrop_url'),
             thumbnail=local_thumbnail_filename,
@@ -1015,15 +1610,14 @@ def add_content():
             release_date=request.form.get('release_date'),
             download_url=movie_download_url,
         )
+        assign_embed(new_movie, movie_embed_code, 'movie')
         db.session.add(new_movie)
         try:
             db.session.commit()
             return jsonify({'success': True, 'message': 'Movie added successfully!', 'item': new_movie.to_dict()})
         except Exception as e:
             db.session.rollback()
-            print(f"Error adding movie: {e}")
-            import traceback
-            traceback.print_exc()
+            app.logger.exception("Error adding movie")
             return jsonify({'success': False, 'message': f'Database error when adding movie: {e}'}), 500
 
 @app.route('/admin/edit/series/<series_id>', methods=['GET', 'POST'])
@@ -1066,9 +1660,10 @@ def edit_series(series_id):
                             if episode:
                                 episode.number = int(episode_data.get('number'))
                                 episode.title = episode_data.get('title')
-                                episode.embed_code = episode_data.get('embed_code')
+                                assign_embed(episode, episode_data.get('embed_code'), 'episode')
                         else:
-                            new_episode = Episode(season_id=current_season.id, number=int(episode_data.get('number')), title=episode_data.get('title'), embed_code=episode_data.get('embed_code'))
+                            new_episode = Episode(season_id=current_season.id, number=int(episode_data.get('number')), title=episode_data.get('title'))
+                            assign_embed(new_episode, episode_data.get('embed_code'), 'episode')
                             db.session.add(new_episode)
                             series.last_updated_at = datetime.utcnow()
             db.session.commit()
@@ -1130,9 +1725,16 @@ def fetch_tmdb_data_route():
         })
         return jsonify(final_data)
     except requests.exceptions.RequestException as e:
-        print(f"TMDB API request failed: {e}")
+        app.logger.error("TMDB API request failed: %s", e)
         return jsonify({'error': f'TMDB API request failed: {e}', 'details': str(e)}), 500
 
+@app.route('/api/movie/<movie_id>', methods=['GET'])
+@admin_required
+def api_get_movie(movie_id):
+    """Returns the full movie record for the dashboard's edit modal."""
+    movie = Movie.query.get_or_404(movie_id)
+    return jsonify(movie.to_dict())
+
 @app.route('/api/movie/<movie_id>', methods=['POST'])
 @admin_required
 def api_edit_movie(movie_id):
@@ -1143,7 +1745,8 @@ def api_edit_movie(movie_id):
     movie.description = form_data.get('description', movie.description)
     movie.release_date = form_data.get('release_date', movie.release_date)
     movie.director = form_data.get('director', movie.director)
-    movie.embed_code = form_data.get('embed_code', movie.embed_code)
+    if 'embed_code' in form_data:
+        assign_embed(movie, form_data['embed_code'], 'movie')
     movie.tmdb_id = form_data.get('tmdb_id', movie.tmdb_id)
     movie.genre = form_data.get('genres', movie.genre)
     movie.download_url = form_data.get('download_url', movie.download_url)
@@ -1153,18 +1756,13 @@ def api_edit_movie(movie_id):
         actors_list = [{'name': name.strip(), 'profile_path': None} for name in cast_text.split(',')]
         movie.cast = json.dumps(actors_list)
 
+    old_thumbnail = None
     new_thumbnail_file = request.files.get('thumbnail')
     if new_thumbnail_file and allowed_file(new_thumbnail_file.filename):
-        if movie.thumbnail and os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], movie.thumbnail)):
-            try:
-                os.remove(os.path.join(app.config['UPLOAD_FOLDER'], movie.thumbnail))
-            except Exception as e:
-                print(f"Warning: Could not delete old thumbnail file {movie.thumbnail}: {e}")
-
-        thumb_ext = os.path.splitext(new_thumbnail_file.filename)[1]
-        new_filename = str(uuid.uuid4()) + thumb_ext
-        new_thumbnail_file.save(os.path.join(app.config['UPLOAD_FOLDER'], new_filename))
-
+        new_thumbnail_file.filename = secure_filename(new_thumbnail_file.filename)
+        new_filename = thumbnails.save_upload(new_thumbnail_file)
+        if movie.thumbnail != new_filename:
+            old_thumbnail = movie.thumbnail
         movie.thumbnail = new_filename
         movie.poster_url = None
     elif 'poster_url' in form_data:
@@ -1172,12 +1770,11 @@ def api_edit_movie(movie_id):
 
     try:
         db.session.commit()
+        remove_upload_if_unused(old_thumbnail)
         return jsonify({'success': True, 'message': 'Movie updated successfully!', 'item': movie.to_dict()})
     except Exception as e:
         db.session.rollback()
-        print(f"Error updating movie: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("Error updating movie")
         return jsonify({'success': False, 'message': f'Failed to update movie: {e}'}), 500
 
 @app.route('/delete/movie/<movie_id>', methods=['DELETE'])
@@ -1185,22 +1782,16 @@ def api_edit_movie(movie_id):
 def delete_movie(movie_id):
     """Deletes a movie and its associated thumbnail file."""
     movie = Movie.query.get_or_404(movie_id)
-
-    if movie.thumbnail:
-        thumbnail_path = os.path.join(app.config['UPLOAD_FOLDER'], movie.thumbnail)
-        if os.path.exists(thumbnail_path):
-            try:
-                os.remove(thumbnail_path)
-            except Exception as e:
-                print(f"Error deleting thumbnail file {thumbnail_path}: {e}")
+    thumbnail = movie.thumbnail
 
     try:
         db.session.delete(movie)
         db.session.commit()
+        remove_upload_if_unused(thumbnail)
         return jsonify({'success': True, 'message': 'Movie deleted successfully!'})
     except Exception as e:
         db.session.rollback()
-        print(f"Error deleting movie: {e}")
+        app.logger.error("Error deleting movie: %s", e)
         return jsonify({'success': False, 'message': f'Failed to delete movie: {e}'}), 500
 
 @app.route('/delete/series/<series_id>', methods=['DELETE'])
@@ -1208,22 +1799,16 @@ def delete_movie(movie_id):
 def delete_series(series_id):
     """Deletes a series and its associated thumbnail file (if any)."""
     series = Series.query.get_or_404(series_id)
-
-    if series.thumbnail:
-        thumbnail_path = os.path.join(app.config['UPLOAD_FOLDER'], series.thumbnail)
-        if os.path.exists(thumbnail_path):
-            try:
-                os.remove(thumbnail_path)
-            except Exception as e:
-                print(f"Error deleting thumbnail file {thumbnail_path}: {e}")
+    thumbnail = series.thumbnail
 
     try:
         db.session.delete(series)
         db.session.commit()
+        remove_upload_if_unused(thumbnail)
         return jsonify({'success': True, 'message': 'Series deleted successfully!'})
     except Exception as e:
         db.session.rollback()
-        print(f"Error deleting series: {e}")
+        app.logger.error("Error deleting series: %s", e)
         return jsonify({'success': False, 'message': f'Failed to delete series: {e}'}), 500
 
 
@@ -1231,34 +1816,37 @@ def delete_series(series_id):
 @app.route('/api/admin/users', methods=['GET'])
 @admin_required
 def admin_get_users():
-    """Fetches paginated list of registered users for admin management."""
-    page = request.args.get('page', 1, type=int)
-    per_page = app.config.get('PER_PAGE', 20)
-    
-    search_query = request.args.get('search', '').strip()
-
-    users_query = User.query
-
-    if search_query:
-        search_term = f"%{search_query}%"
-        users_query = users_query.filter(
-            (User.username.ilike(search_term)) |
-            (User.email.ilike(search_term))
-        )
-
-    users = users_query.paginate(page=page, per_page=per_page, error_out=False)
+    """
+    Fetches a page of registered users for admin management, newest first.
 
-    users_data = [user.to_dict() for user in users.items]
-    return jsonify({
-        'users': users_data,
-        'total_users': users.total,
-        'pages': users.pages,
-        'current_page': users.page,
-        'has_next': users.has_next,
-        'has_prev': users.has_prev,
-        'next_num': users.next_num,
-        'prev_num': users.prev_num
-    })
+    Pages seek on the id instead of counting: the response carries
+    ``total_estimate`` (table statistics or the cached dashboard counter;
+    null for a search that does not fit on one page) rather than an exact
+    COUNT(*) over the filtered set.
+    """
+    try:
+        limit, cursor, _ = admin_list_params()
+        search_query = request.args.get('search', '').strip()
+        users_query, id_column = db.session.query(*USER_ROW_COLUMNS), User.id
+
+        if search_query:
+            users_query, id_column = search_users(users_query, search_query)
+
+        rows = id_keyset_page(users_query, id_column, cursor, limit).all()
+        if not cursor and len(rows) <= limit:
+            total, exact = len(rows), True
+        elif search_query:
+            total, exact = None, False
+        else:
+            total = estimated_row_count(User, lambda: stats_cache.get_or_set('dashboard', compute_dashboard_stats)['totalUsers'])
+            exact = False
+        return stream_json_page(iter(rows), serialize_user_row, limit, lambda user: encode_id_cursor(user.id),
+                                extra={'total_estimate': total, 'total_is_exact': exact})
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor.'}), 400
+    except Exception as e:
+        app.logger.exception("Error fetching users")
+        return jsonify({'error': 'Failed to fetch users.', 'details': str(e)}), 500
 
 
 @app.route('/api/admin/users/<int:user_id>', methods=['GET', 'PUT', 'DELETE'])
@@ -1291,7 +1879,9 @@ def admin_manage_user(user_id):
             else:
                 return jsonify({'success': False, 'message': 'Invalid role specified.'}), 400
 
+        suspended = False
         if 'is_active' in data:
+            suspended = user.is_active and not data['is_active']
             user.is_active = bool(data['is_active'])
 
         if 'password' in data and data['password']:
@@ -1306,16 +1896,16 @@ def admin_manage_user(user_id):
 
         try:
             db.session.commit()
+            if suspended:
+                server_sessions.revoke_user(user.id)
             return jsonify({'success': True, 'message': 'User updated successfully.', 'user': user.to_dict()})
-        except IntegrityError:
+        except IntegrityError as e:
             db.session.rollback()
-            print(f"Integrity error updating user {user_id}: {e}")
+            app.logger.error("Integrity error updating user %s: %s", user_id, e)
             return jsonify({'success': False, 'message': 'Database integrity error (e.g., duplicate username/email).'}), 409
         except Exception as e:
             db.session.rollback()
-            print(f"Error updating user {user_id}: {e}")
-            import traceback
-            traceback.print_exc()
+            app.logger.exception("Error updating user %s", user_id)
             return jsonify({'success': False, 'message': f'Failed to update user: {str(e)}'}), 500
 
     elif request.method == 'DELETE':
@@ -1329,12 +1919,11 @@ def admin_manage_user(user_id):
         try:
             db.session.delete(user)
             db.session.commit()
+            server_sessions.revoke_user(user_id)
             return jsonify({'success': True, 'message': 'User deleted successfully.'})
         except Exception as e:
             db.session.rollback()
-            print(f"Error deleting user {user_id}: {e}")
-            import traceback
-            traceback.print_exc()
+            app.logger.exception("Error deleting user %s", user_id)
             return jsonify({'success': False, 'message': f'Failed to delete user: {str(e)}'}), 500
 
 # --- User Movie Request Routes ---
@@ -1359,7 +1948,7 @@ def request_page():
             return redirect(url_for('request_page'))
         except Exception as e:
             db.session.rollback()
-            print(f"Error submitting movie request: {e}")
+            app.logger.error("Error submitting movie request: %s", e)
             flash(f'Error submitting request: {e}', 'error')
 
     return render_template('request.html', form=form)
@@ -1373,7 +1962,7 @@ def submit_request():
         flash('Your request has been submitted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
-        print(f"Error submitting request (from /request/submit): {e}")
+        app.logger.error("Error submitting request (from /request/submit): %s", e)
         flash(f'Error submitting request: {e}', 'error')
     return redirect(url_for('request_page'))
 
@@ -1381,14 +1970,18 @@ def submit_request():
 @nocache
 @admin_required
 def get_requests():
-    """Fetches all movie requests for the admin panel."""
+    """Fetches a page of movie requests for the admin panel, newest first, optionally filtered by ?status=."""
     try:
-        requests = MovieRequest.query.order_by(MovieRequest.date.desc()).all()
-        return jsonify([req.to_dict() for req in requests])
+        limit, cursor, status = admin_list_params()
+        query = db.session.query(*REQUEST_ROW_COLUMNS)
+        if status:
+            query = query.filter(MovieRequest.status == status)
+        rows = iter(keyset_page(query, MovieRequest.date, MovieRequest.id, cursor, limit))
+        return stream_json_page(rows, serialize_request_row, limit, lambda req: encode_cursor(req.date, req.id))
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor.'}), 400
     except Exception as e:
-        print(f"Error fetching requests: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("Error fetching requests")
         return jsonify({'error': 'Failed to fetch requests.', 'details': str(e)}), 500
 
 @app.route('/request/complete/<int:request_id>', methods=['POST'])
@@ -1401,7 +1994,7 @@ def complete_request(request_id):
         db.session.commit()
         return jsonify({'success': True, 'updated_request': req.to_dict()})
     except Exception as e:
-        print(f"Error completing request {request_id}: {e}")
+        app.logger.error("Error completing request %s: %s", request_id, e)
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Failed to mark request as complete: {str(e)}'}), 500
 
@@ -1415,7 +2008,7 @@ def delete_request(request_id):
         db.session.commit()
         return jsonify({'success': True, 'message': 'Request deleted successfully!'})
     except Exception as e:
-        print(f"Error deleting request {request_id}: {e}")
+        app.logger.error("Error deleting request %s: %s", request_id, e)
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Failed to delete request: {str(e)}'}), 500
 
@@ -1449,9 +2042,7 @@ def contact():
             return redirect(url_for('contact'))
         except Exception as e:
             db.session.rollback()
-            print(f"Error sending contact message: {e}")
-            import traceback
-            traceback.print_exc()
+            app.logger.exception("Error sending contact message")
             flash(f'Error sending message: {e}', 'error')
 
     return render_template('contact.html', form=form)
@@ -1490,7 +2081,7 @@ def download_content(content_type, content_id):
 
     if item.download_url:
         if item.download_url.startswith('http://') or item.download_url.startswith('https://'):
-            print(f"Redirecting to external download URL for {content_type}: {item.download_url}")
+            app.logger.info("Redirecting to external download URL for %s %s", content_type, content_id, extra={'sample_rate': app.config['DOWNLOAD_LOG_SAMPLE_RATE']})
             return redirect(item.download_url)
         else:
             flash(f'Invalid download URL configured for this {content_type}. Please contact support.', 'error')
@@ -1510,14 +2101,18 @@ def download_content(content_type, content_id):
 @app.route('/api/admin/messages', methods=['GET'])
 @admin_required
 def admin_get_messages():
-    """Fetches all contact messages for the admin panel."""
+    """Fetches a page of contact messages for the admin panel, newest first, optionally filtered by ?status=."""
     try:
-        messages = ContactMessage.query.order_by(ContactMessage.date.desc()).all()
-        return jsonify([msg.to_dict() for msg in messages])
+        limit, cursor, status = admin_list_params()
+        query = db.session.query(*MESSAGE_ROW_COLUMNS)
+        if status:
+            query = query.filter(ContactMessage.status == status)
+        rows = iter(keyset_page(query, ContactMessage.date, ContactMessage.id, cursor, limit))
+        return stream_json_page(rows, serialize_message_row, limit, lambda msg: encode_cursor(msg.date, msg.id))
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor.'}), 400
     except Exception as e:
-        print(f"Error fetching messages: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("Error fetching messages")
         return jsonify({'error': 'Failed to fetch messages.', 'details': str(e)}), 500
 
 
@@ -1531,7 +2126,7 @@ def admin_mark_message_read(message_id):
         db.session.commit()
         return jsonify({'success': True, 'updated_message': message.to_dict(), 'message': 'Message marked as read.'})
     except Exception as e:
-        print(f"Error marking message {message_id} as read: {e}")
+        app.logger.error("Error marking message %s as read: %s", message_id, e)
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Failed to mark message as read: {str(e)}'}), 500
 
@@ -1546,7 +2141,7 @@ def admin_delete_message(message_id):
         db.session.commit()
         return jsonify({'success': True, 'message': 'Message deleted successfully!'})
     except Exception as e:
-        print(f"Error deleting message {message_id}: {e}")
+        app.logger.error("Error deleting message %s: %s", message_id, e)
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Failed to delete message: {str(e)}'}), 500
 
@@ -1555,14 +2150,16 @@ def admin_delete_message(message_id):
 @app.route('/api/admin/pending_users', methods=['GET'])
 @admin_required
 def admin_get_pending_users():
-    """Fetches all pending user registrations for the admin panel."""
+    """Fetches a page of pending user registrations for the admin panel, newest first."""
     try:
-        pending_users = PendingUser.query.order_by(PendingUser.created_at.desc()).all()
-        return jsonify([user.to_dict() for user in pending_users])
+        limit, cursor, _ = admin_list_params()
+        query = db.session.query(*PENDING_USER_ROW_COLUMNS)
+        rows = iter(keyset_page(query, PendingUser.created_at, PendingUser.id, cursor, limit))
+        return stream_json_page(rows, serialize_pending_user_row, limit, lambda user: encode_cursor(user.created_at, user.id))
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor.'}), 400
     except Exception as e:
-        print(f"Error fetching pending users: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("Error fetching pending users")
         return jsonify({'error': 'Failed to fetch pending users.', 'details': str(e)}), 500
 
 @app.route('/api/admin/pending_users/approve/<int:pending_user_id>', methods=['POST'])
@@ -1591,16 +2188,14 @@ def admin_approve_pending_user(pending_user_id):
 
     except IntegrityError as e:
         db.session.rollback()
-        print(f"Integrity error approving user {pending_user_id}: {e}")
+        app.logger.error("Integrity error approving user %s: %s", pending_user_id, e)
         # Check for specific duplicate key error if needed, otherwise general message
         if "Duplicate entry" in str(e):
             return jsonify({'success': False, 'message': 'Username or email already exists for an active user. Approval failed.'}), 409
         return jsonify({'success': False, 'message': f'Database integrity error during approval: {str(e)}'}), 409
     except Exception as e:
         db.session.rollback()
-        print(f"Error approving pending user {pending_user_id}: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("Error approving pending user %s", pending_user_id)
         return jsonify({'success': False, 'message': f'Failed to approve user: {str(e)}'}), 500
 
 @app.route('/api/admin/pending_users/delete/<int:pending_user_id>', methods=['DELETE'])
@@ -1614,12 +2209,318 @@ def admin_delete_pending_user(pending_user_id):
         return jsonify({'success': True, 'message': 'Pending user registration deleted.'})
     except Exception as e:
         db.session.rollback()
-        print(f"Error deleting pending user {pending_user_id}: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("Error deleting pending user %s", pending_user_id)
         return jsonify({'success': False, 'message': f'Failed to delete pending user: {str(e)}'}), 500
 
 
+# --- Bulk Admin Operations ---
+# Each action locks the rows it will change (SELECT ... FOR UPDATE) and then runs
+# one set-based UPDATE/DELETE per table on those ids, all in one transaction.
+# Query-level updates and deletes skip the ORM flush events, so actions write the
+# change log and flag the stats cache themselves, and queue work that must wait for
+# the commit (session revocation, upload cleanup) on ``after_commit``.
+app.config['BULK_MAX_IDS'] = int(os.getenv('BULK_MAX_IDS', 1000))
+
+def _matching_ids(model, ids, *criteria):
+    """
+    The ids among ``ids`` of rows that exist and match ``criteria``, locked for the
+    rest of the transaction, so the change log names only the rows the action changes.
+    """
+    return db.session.execute(
+        select(model.id).where(model.id.in_(ids), *criteria).with_for_update()
+    ).scalars().all()
+
+def _bulk_delete_content(ids, after_commit):
+    movie_ids = _matching_ids(Movie, ids)
+    series_ids = _matching_ids(Series, ids)
+    if not movie_ids and not series_ids:
+        return 0
+    thumbs = {name for (name,) in db.session.query(Movie.thumbnail).filter(Movie.id.in_(movie_ids))}
+    thumbs |= {name for (name,) in db.session.query(Series.thumbnail).filter(Series.id.in_(series_ids))}
+    season_ids = select(Season.id).where(Season.series_id.in_(series_ids))
+    Episode.query.filter(Episode.season_id.in_(season_ids)).delete(synchronize_session=False)
+    Season.query.filter(Season.series_id.in_(series_ids)).delete(synchronize_session=False)
+    count = Series.query.filter(Series.id.in_(series_ids)).delete(synchronize_session=False)
+    count += Movie.query.filter(Movie.id.in_(movie_ids)).delete(synchronize_session=False)
+    log_changes('movies', movie_ids)
+    log_changes('series', series_ids)
+    _mark_stats_dirty()
+    after_commit.append(lambda: upload_cleanup.add(thumbs))
+    return count
+
+def _revoke_sessions(user_ids):
+    for user_id in user_ids:
+        server_sessions.revoke_user(user_id)
+
+def _other_users(ids):
+    """``ids`` without the acting admin's own account, which bulk actions never suspend or delete."""
+    return [user_id for user_id in ids if user_id != session.get('user_id')]
+
+def _bulk_set_users_active(active):
+    def action(ids, after_commit):
+        if not active:
+            ids = _other_users(ids)
+        ids = _matching_ids(User, ids, User.is_active != active) if ids else []
+        if not ids:
+            return 0
+        count = User.query.filter(User.id.in_(ids)).update({User.is_active: active}, synchronize_session=False)
+        log_changes('users', ids)
+        if not active:
+            after_commit.append(lambda: _revoke_sessions(ids))
+        return count
+    return action
+
+def _bulk_delete_users(ids, after_commit):
+    ids = _other_users(ids)
+    ids = _matching_ids(User, ids) if ids else []
+    if not ids:
+        return 0
+    emails = select(User.email).where(User.id.in_(ids))
+    pending_ids = db.session.execute(select(PendingUser.id).where(PendingUser.email.in_(emails))).scalars().all()
+    if pending_ids:
+        PendingUser.query.filter(PendingUser.id.in_(pending_ids)).delete(synchronize_session=False)
+        log_changes('pending_users', pending_ids)
+    user_search.remove(db.session.connection(), *ids)
+    count = User.query.filter(User.id.in_(ids)).delete(synchronize_session=False)
+    log_changes('users', ids)
+    _mark_stats_dirty()
+    after_commit.append(lambda: _revoke_sessions(ids))
+    return count
+
+def _bulk_set_status(model, status):
+    def action(ids, after_commit):
+        ids = _matching_ids(model, ids, model.status != status)
+        if not ids:
+            return 0
+        count = model.query.filter(model.id.in_(ids)).update({model.status: status}, synchronize_session=False)
+        log_changes(CHANGE_KINDS[model], ids)
+        _mark_stats_dirty()
+        return count
+    return action
+
+def _bulk_delete(model):
+    def action(ids, after_commit):
+        ids = _matching_ids(model, ids)
+        if not ids:
+            return 0
+        count = model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+        log_changes(CHANGE_KINDS[model], ids)
+        _mark_stats_dirty()
+        return count
+    return action
+
+def _bulk_approve_pending_users(ids, after_commit):
+    """
+    Approves pending users whose username and email are still free. Users go
+    through the ORM (one batched INSERT per flush) so their lookup columns and
+    search postings are written; the pending rows go in one DELETE.
+    """
+    pending = PendingUser.query.filter(PendingUser.id.in_(ids)).all()
+    usernames = {p.username.lower() for p in pending}
+    emails = {p.email.lower() for p in pending}
+    username_column, email_column = user_lookup_columns()
+    taken = db.session.query(username_column, email_column).filter(
+        or_(username_column.in_(usernames), email_column.in_(emails))).all()
+    taken_usernames = {username for username, _ in taken}
+    taken_emails = {email for _, email in taken}
+
+    approved = []
+    for p in pending:
+        if p.username.lower() in taken_usernames or p.email.lower() in taken_emails:
+            continue
+        taken_usernames.add(p.username.lower())
+        taken_emails.add(p.email.lower())
+        approved.append(p.id)
+        db.session.add(User(
+            username=p.username, email=p.email, password=p.password,
+            security_question=p.security_question, security_answer=p.security_answer,
+            role='user', is_active=True, last_login_at=datetime.utcnow(), login_count=0,
+        ))
+    if approved:
+        db.session.flush()
+        PendingUser.query.filter(PendingUser.id.in_(approved)).delete(synchronize_session=False)
+        log_changes('pending_users', approved)
+        _mark_stats_dirty()
+    return len(approved)
+
+# kind -> (id type, {action: function(ids, after_commit) -> affected rows})
+BULK_ACTIONS = {
+    'content': (str, {'delete': _bulk_delete_content}),
+    'users': (int, {
+        'activate': _bulk_set_users_active(True),
+        'suspend': _bulk_set_users_active(False),
+        'delete': _bulk_delete_users,
+    }),
+    'pending_users': (int, {'approve': _bulk_approve_pending_users, 'delete': _bulk_delete(PendingUser)}),
+    'requests': (int, {'complete': _bulk_set_status(MovieRequest, 'Completed'), 'delete': _bulk_delete(MovieRequest)}),
+    'messages': (int, {'mark_read': _bulk_set_status(ContactMessage, 'Read'), 'delete': _bulk_delete(ContactMessage)}),
+}
+
+@app.route('/api/admin/bulk/<kind>', methods=['POST'])
+@admin_required
+def admin_bulk_action(kind):
+    """
+    Applies one action to many rows: ``{"action": "delete", "ids": [...]}``.
+    Responds with how many rows the action changed; ids that no longer exist
+    (or, for approvals, clash with an existing user) are skipped.
+    """
+    if kind not in BULK_ACTIONS:
+        return jsonify({'success': False, 'message': f'Unknown bulk target "{kind}".'}), 404
+    id_type, actions = BULK_ACTIONS[kind]
+    data = request.get_json(silent=True) or {}
+    action = actions.get(data.get('action'))
+    if action is None:
+        return jsonify({'success': False, 'message': f'Unsupported action. Choose one of: {", ".join(sorted(actions))}.'}), 400
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids:
+        return jsonify({'success': False, 'message': 'Provide a non-empty list of ids.'}), 400
+    if len(ids) > app.config['BULK_MAX_IDS']:
+        return jsonify({'success': False, 'message': f'At most {app.config["BULK_MAX_IDS"]} ids per request.'}), 400
+    try:
+        ids = sorted({id_type(item) for item in ids})
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Invalid id in list.'}), 400
+
+    after_commit = []
+    try:
+        affected = action(ids, after_commit)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.exception("Bulk %s on %s failed", data.get('action'), kind)
+        return jsonify({'success': False, 'message': f'Bulk action failed: {str(e)}'}), 500
+    for callback in after_commit:
+        try:
+            callback()
+        except Exception:
+            app.logger.exception("Post-commit step of bulk %s on %s failed", data.get('action'), kind)
+    return jsonify({'success': True, 'affected': affected, 'requested': len(ids),
+                    'message': f'{affected} of {len(ids)} items updated.'})
+
+
+# --- Admin Change Feed ---
+# The dashboard polls /api/admin/changes?since=<version> (or listens on the optional
+# SSE stream) instead of re-pulling whole lists. Entries only name rows, so answers
+# are built from the rows' current state: an id that still exists comes back as an
+# upsert, one that does not as a delete. That makes replaying entries harmless, so
+# each read re-scans CHANGE_FEED_OVERLAP versions below ``since`` to catch
+# transactions that took an id earlier but committed after the client's last read.
+app.config['CHANGE_FEED_LIMIT'] = 500
+app.config['CHANGE_FEED_OVERLAP'] = 100
+app.config['CHANGE_FEED_POLL_INTERVAL'] = int(os.getenv('CHANGE_FEED_POLL_INTERVAL', 15))
+app.config['CHANGE_LOG_RETENTION_HOURS'] = int(os.getenv('CHANGE_LOG_RETENTION_HOURS', 24))
+# The stream holds a worker per open dashboard, so it is opt-in (threaded or async workers only).
+app.config['CHANGE_STREAM_ENABLED'] = os.getenv('CHANGE_STREAM_ENABLED', 'false').lower() == 'true'
+app.config['CHANGE_STREAM_MAX_SECONDS'] = 300
+
+# kind -> (model, row columns, serializer) for the lists the feed sends rows for.
+FEED_ROWS = {
+    'users': (User, USER_ROW_COLUMNS, serialize_user_row),
+    'pending_users': (PendingUser, PENDING_USER_ROW_COLUMNS, serialize_pending_user_row),
+    'requests': (MovieRequest, REQUEST_ROW_COLUMNS, serialize_request_row),
+    'messages': (ContactMessage, MESSAGE_ROW_COLUMNS, serialize_message_row),
+}
+
+def change_feed(since):
+    """
+    Changes after version ``since`` as ``{"version", "reset", "changes", "stats"}``.
+    ``reset`` tells the client to reload its lists: the log was pruned past
+    ``since``, ``since`` is ahead of the log, or there are more than
+    CHANGE_FEED_LIMIT entries to replay. ``stats`` is sent only when something changed.
+    """
+    oldest, newest = db.session.execute(select(func.min(ChangeLog.id), func.max(ChangeLog.id))).one()
+    newest = newest or 0
+    feed = {'version': newest, 'reset': False, 'changes': {}, 'stats': None}
+    if since is None or since == newest:
+        return feed
+    limit = app.config['CHANGE_FEED_LIMIT']
+    if since > newest or (oldest is not None and since < oldest - 1) or newest - since > limit:
+        feed['reset'] = True
+        feed['stats'] = stats_cache.get_or_set('dashboard', compute_dashboard_stats)
+        return feed
+
+    entries = db.session.query(ChangeLog.kind, ChangeLog.row_id).filter(
+        ChangeLog.id > max(since - app.config['CHANGE_FEED_OVERLAP'], 0), ChangeLog.id <= newest).all()
+    touched = {}
+    for kind, row_id in entries:
+        if kind in FEED_ROWS:
+            touched.setdefault(kind, set()).add(int(row_id))
+    for kind, ids in touched.items():
+        model, columns, serialize = FEED_ROWS[kind]
+        rows = db.session.query(*columns).filter(model.id.in_(ids)).all()
+        feed['changes'][kind] = {
+            'upserts': [serialize(row) for row in rows],
+            'deletes': sorted(ids - {row.id for row in rows}),
+        }
+    feed['stats'] = stats_cache.get_or_set('dashboard', compute_dashboard_stats)
+    return feed
+
+def prune_change_log():
+    """Drops entries older than CHANGE_LOG_RETENTION_HOURS, always keeping the newest so the version survives."""
+    cutoff = datetime.utcnow() - timedelta(hours=app.config['CHANGE_LOG_RETENTION_HOURS'])
+    newest = db.session.query(func.max(ChangeLog.id)).scalar()
+    if newest is None:
+        return 0
+    pruned = ChangeLog.query.filter(ChangeLog.created_at < cutoff, ChangeLog.id < newest).delete(synchronize_session=False)
+    db.session.commit()
+    if pruned:
+        app.logger.info("Pruned %d change log entries", pruned)
+    return pruned
+
+change_log_pruner = PeriodicTask('change-log-prune', 3600, prune_change_log, app=app)
+
+@app.before_request
+def _start_change_log_pruner():
+    change_log_pruner.ensure_started()
+
+@app.route('/api/admin/changes', methods=['GET'])
+@admin_required
+def admin_changes():
+    """Incremental dashboard refresh: rows changed since ``?since=<version>`` (omit it to get the current version)."""
+    since = request.args.get('since', type=int)
+    try:
+        return jsonify(change_feed(since))
+    except Exception as e:
+        app.logger.exception("Error reading change feed")
+        return jsonify({'error': 'Failed to read changes.', 'details': str(e)}), 500
+
+@app.route('/api/admin/changes/stream', methods=['GET'])
+@admin_required
+def admin_changes_stream():
+    """
+    Server-Sent Events version of the change feed: one ``changes`` event per new
+    batch of versions. The stream ends after CHANGE_STREAM_MAX_SECONDS and the
+    browser reconnects with Last-Event-ID, so no worker is held indefinitely.
+    """
+    if not app.config['CHANGE_STREAM_ENABLED']:
+        return jsonify({'error': 'Change stream is disabled.'}), 404
+    since = request.headers.get('Last-Event-ID', type=int)
+    if since is None:
+        since = request.args.get('since', type=int)
+
+    def events():
+        # The repeated polls are not one request's N+1; keep them out of the query profiler.
+        g.pop('_query_stats', None)
+        version = since
+        deadline = time.monotonic() + app.config['CHANGE_STREAM_MAX_SECONDS']
+        yield 'retry: 3000\n\n'
+        while time.monotonic() < deadline:
+            feed = change_feed(version)
+            # Release the connection between polls; the stream may stay open for minutes.
+            db.session.remove()
+            if version is None or feed['version'] != version or feed['reset']:
+                version = feed['version']
+                yield f"id: {version}\nevent: changes\ndata: {app.json.dumps(feed)}\n\n"
+            else:
+                yield ': keepalive\n\n'
+            time.sleep(2)
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # ... (existing imports and other routes)
 
 @app.errorhandler(404)
@@ -1629,6 +2530,80 @@ def page_not_found(e):
     """
     return render_template('404.html'), 404
 
+# --- CLI Commands ---
+@app.cli.command('generate-thumbnails')
+def generate_thumbnails_command():
+    """Generates resized variants for every uploaded thumbnail that is missing them."""
+    if not thumbnails.enabled:
+        print("Pillow is not installed or no thumbnail formats are configured; nothing to do.")
+        return
+    filenames = {name for (name,) in db.session.query(Movie.thumbnail).filter(Movie.thumbnail.isnot(None))}
+    filenames |= {name for (name,) in db.session.query(Series.thumbnail).filter(Series.thumbnail.isnot(None))}
+    generated = 0
+    for filename in sorted(filenames):
+        if not os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], filename)):
+            app.logger.warning("Skipping missing upload %s", filename)
+            continue
+        thumbnails.generate_variants(filename)
+        generated += 1
+    print(f"Generated variants for {generated} uploads.")
+
+@app.cli.command('purge-pending-users')
+def purge_pending_users_command():
+    """Deletes expired pending registrations now instead of waiting for the background sweeper."""
+    print(f"Deleted {sweep_expired_pending_users()} expired pending users.")
+
+@app.cli.command('backfill-user-search')
+@click.option('--batch-size', default=1000, show_default=True, help='Users per transaction.')
+def backfill_user_search_command(batch_size):
+    """Fills username_lower/email_lower and rebuilds the search postings, one id range per transaction."""
+    last_id, indexed = 0, 0
+    while True:
+        rows = db.session.execute(
+            select(User.id, User.username, User.email).where(User.id > last_id).order_by(User.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+        User.query.filter(User.id.in_(ids)).update(
+            {User.username_lower: func.lower(User.username), User.email_lower: func.lower(User.email)},
+            synchronize_session=False)
+        user_search.remove(db.session.connection(), *ids)
+        postings = [posting for row in rows for posting in user_search.rows_for(row.id, row.username, row.email)]
+        if postings:
+            db.session.execute(user_search.table.insert(), postings)
+        db.session.commit()
+        last_id = ids[-1]
+        indexed += len(rows)
+    user_lookup_state.invalidate()
+    print(f"Indexed {indexed} users.")
+
+@app.cli.command('embed-provider')
+@click.argument('name', required=False)
+@click.option('--movie-template', help='Player URL for movies, with {id} for the movie\'s id on this provider.')
+@click.option('--episode-template', help='Player URL for episodes, with {id} for the episode\'s id on this provider.')
+def embed_provider_command(name, movie_template, episode_template):
+    """Lists embed providers, or creates/updates NAME. Rows using a provider follow its new templates at once."""
+    if name:
+        try:
+            set_embed_provider_templates(name, movie_template, episode_template)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+    movie_counts = dict(db.session.query(Movie.embed_provider_id, func.count()).group_by(Movie.embed_provider_id).all())
+    episode_counts = dict(db.session.query(Episode.embed_provider_id, func.count()).group_by(Episode.embed_provider_id).all())
+    for provider in EmbedProvider.query.order_by(EmbedProvider.name):
+        print(f"{provider.name} (v{provider.version}): {movie_counts.get(provider.id, 0)} movies, "
+              f"{episode_counts.get(provider.id, 0)} episodes")
+        print(f"  movie:   {provider.movie_template}")
+        print(f"  episode: {provider.episode_template or '-'}")
+    print(f"Custom embed HTML: {movie_counts.get(None, 0)} movies, {episode_counts.get(None, 0)} episodes")
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Minifies, fingerprints and precompresses static/css and static/js into static/dist."""
+    manifest = static_assets.build(app.static_folder)
+    print(f"Built {len(manifest)} assets into {os.path.join(app.static_folder, static_assets.DIST_DIR)}.")
+
 # ... (rest of your app.py)
 
 
@@ -1642,6 +2617,7 @@ if __name__ == '__main__':
             print("Creating database tables if they don't exist...")
             try:
                 db.create_all()
+                ensure_default_embed_provider()
                 print("Database tables checked and created if necessary.")
             except Exception as e:
                 print(f"\nFATAL ERROR: Could not connect to database or create tables: {e}")
@@ -0,0 +1,183 @@
+"""
+Fingerprinted static assets.
+
+``build()`` (run as ``flask build-assets``) minifies every file under
+static/css and static/js, writes it to static/dist under a content-hashed
+name with ``.gz`` (and ``.br`` when the brotli package is installed) siblings,
+and records the mapping in static/dist/manifest.json. Templates reference
+assets with ``asset_url('css/style2.css')``: it returns the fingerprinted URL
+when the manifest knows the file and falls back to the plain static URL
+otherwise, so a checkout that was never built still works.
+
+Fingerprinted files never change, so ``/static/dist/`` serves them with a
+year-long ``immutable`` Cache-Control, picking the precompressed variant the
+client accepts.
+
+rcssmin and rjsmin are optional; without them CSS gets a conservative
+comment/whitespace pass and JS is only fingerprinted and compressed.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:  # pragma: no cover - optional dependency
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # pragma: no cover - optional dependency
+    rjsmin = None
+
+SOURCE_DIRS = ('css', 'js')
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Skip precompressing files that would barely shrink; the raw file is served instead.
+MIN_COMPRESS_BYTES = 512
+
+
+def minify_css(text):
+    if rcssmin is not None:
+        return rcssmin.cssmin(text)
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    if rjsmin is not None:
+        return rjsmin.jsmin(text)
+    return text
+
+
+_MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def build(static_folder, log=print):
+    """Builds static/dist and its manifest. Returns the manifest dict."""
+    dist = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(dist, exist_ok=True)
+    manifest = {}
+    for source_dir in SOURCE_DIRS:
+        root = os.path.join(static_folder, source_dir)
+        if not os.path.isdir(root):
+            continue
+        for dirpath, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                stem, ext = os.path.splitext(filename)
+                minifier = _MINIFIERS.get(ext)
+                if minifier is None:
+                    continue
+                source = os.path.join(dirpath, filename)
+                logical = os.path.relpath(source, static_folder).replace(os.sep, '/')
+                with open(source, encoding='utf-8') as f:
+                    original = f.read()
+                data = minifier(original).encode('utf-8')
+                digest = hashlib.sha256(data).hexdigest()[:12]
+                hashed = f'{os.path.dirname(logical)}/{stem}.{digest}{ext}'.lstrip('/')
+                target = os.path.join(dist, hashed)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                _write(target, data)
+                sizes = [len(original.encode('utf-8')), len(data)]
+                if len(data) >= MIN_COMPRESS_BYTES:
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                    _write(target + '.gz', compressed)
+                    sizes.append(len(compressed))
+                    if brotli is not None:
+                        compressed = brotli.compress(data, quality=11)
+                        _write(target + '.br', compressed)
+                        sizes.append(len(compressed))
+                manifest[logical] = hashed
+                log(f"{logical} -> {hashed} ({' / '.join(str(s) for s in sizes)} bytes)")
+    _write(os.path.join(dist, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def _write(path, data):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class Assets:
+    """
+    Flask extension providing the ``asset_url`` template global and the
+    ``/static/dist/`` route. In debug mode the manifest is re-read whenever it
+    changes on disk.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._manifest = {}
+        self._manifest_mtime = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.add_url_rule(f'{app.static_url_path}/{DIST_DIR}/<path:filename>', 'dist_asset', self.serve)
+        app.add_template_global(self.asset_url, 'asset_url')
+        app.extensions['assets'] = self
+        self._load_manifest()
+
+    @property
+    def dist_folder(self):
+        return os.path.join(self.app.static_folder, DIST_DIR)
+
+    def _load_manifest(self):
+        path = os.path.join(self.dist_folder, MANIFEST)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            self._manifest, self._manifest_mtime = {}, None
+            return
+        if mtime != self._manifest_mtime:
+            with open(path, encoding='utf-8') as f:
+                self._manifest = json.load(f)
+            self._manifest_mtime = mtime
+
+    def asset_url(self, filename):
+        """URL for a file under static/: fingerprinted when built, plain otherwise."""
+        if self.app.debug:
+            self._load_manifest()
+        hashed = self._manifest.get(filename)
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('dist_asset', filename=hashed)
+
+    def serve(self, filename):
+        encoding = None
+        accepted = request.accept_encodings
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if accepted[candidate] and os.path.isfile(os.path.join(self.dist_folder, filename + suffix)):
+                encoding = candidate
+                break
+        if encoding is None:
+            response = send_from_directory(self.dist_folder, filename, conditional=True, max_age=IMMUTABLE_MAX_AGE)
+        else:
+            suffix = '.br' if encoding == 'br' else '.gz'
+            response = send_from_directory(self.dist_folder, filename + suffix, conditional=True,
+                                           max_age=IMMUTABLE_MAX_AGE)
+            response.headers['Content-Encoding'] = encoding
+            response.mimetype = _mimetype(filename)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+def _mimetype(filename):
+    return 'text/css' if filename.endswith('.css') else 'text/javascript'
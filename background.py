@@ -0,0 +1,175 @@
+"""
+Background work for the FlixHD Flask app.
+
+``PeriodicTask`` runs a function every few seconds on a daemon thread. It is
+started lazily by whatever first needs it and remembers the pid it started
+in, so a gunicorn worker forked from a master that imported the app starts
+its own thread instead of assuming the (non-existent) inherited one runs.
+A final run happens at interpreter exit so buffered work is not lost on a
+graceful shutdown.
+
+``BatchQueue`` hands items collected by request handlers to a function in
+batches on such a task, for side work (deleting files, say) that should not
+hold up the response.
+
+``ActivityRecorder`` uses one to batch login bookkeeping: ``record_login()``
+only bumps an in-memory counter, and the task writes one aggregated UPDATE
+per user (login_count += n, last_login_at = latest) per interval.
+"""
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime
+
+from sqlalchemy import bindparam, case, func, update
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    def __init__(self, name, interval, func, app=None):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.app = app
+        self._pid = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._pid == os.getpid()
+
+    def ensure_started(self):
+        """Starts the thread in this process if it is not already running here."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stop = threading.Event()
+            threading.Thread(target=self._loop, name=f'periodic-{self.name}', daemon=True).start()
+            atexit.register(self.run_once)
+            self._pid = os.getpid()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def run_once(self):
+        """Runs the function now (inside an app context when there is an app); errors are logged, not raised."""
+        with self._run_lock:
+            try:
+                if self.app is not None:
+                    with self.app.app_context():
+                        self.func()
+                else:
+                    self.func()
+            except Exception:
+                (self.app.logger if self.app is not None else logger).exception('Periodic task %s failed', self.name)
+
+
+class BatchQueue:
+    """
+    Deduplicating queue drained by a ``PeriodicTask``: ``add()`` returns at
+    once and ``func`` later receives everything added since the last run as
+    one set. Items are requeued if ``func`` raises.
+    """
+
+    def __init__(self, name, func, interval=5, app=None):
+        self.func = func
+        self.task = PeriodicTask(name, interval, self.drain, app=app)
+        self._items = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def add(self, items):
+        with self._lock:
+            self._items.update(items)
+        self.task.ensure_started()
+
+    def drain(self):
+        with self._lock:
+            items, self._items = self._items, set()
+        if not items:
+            return 0
+        try:
+            self.func(items)
+        except Exception:
+            with self._lock:
+                self._items.update(items)
+            raise
+        return len(items)
+
+
+class ActivityRecorder:
+    """
+    Buffers per-user login counts and flushes them to ``user_table`` every
+    ACTIVITY_FLUSH_INTERVAL seconds (default 10). The admin users list can
+    therefore lag real logins by up to one interval.
+    """
+
+    def __init__(self, app=None, db=None, user_table=None, metrics=None):
+        self.db = db
+        self.user_table = user_table
+        self.metrics = metrics
+        self.task = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ACTIVITY_FLUSH_INTERVAL', 10)
+        self.task = PeriodicTask('activity-flush', app.config['ACTIVITY_FLUSH_INTERVAL'], self.flush, app=app)
+        app.extensions['activity'] = self
+        if self.metrics is not None:
+            self.metrics.register_gauge('activity_events_pending', 'Login events buffered for the next flush.',
+                                        lambda: self.pending_events)
+
+    @property
+    def pending_events(self):
+        with self._lock:
+            return sum(count for count, _ in self._pending.values())
+
+    def record_login(self, user_id, at=None):
+        at = at or datetime.utcnow()
+        with self._lock:
+            count, latest = self._pending.get(user_id, (0, at))
+            self._pending[user_id] = (count + 1, max(latest, at))
+        self.task.ensure_started()
+
+    def flush(self):
+        """Writes the buffered counts in one executemany UPDATE; requeues them if that fails."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        t = self.user_table
+        statement = update(t).where(t.c.id == bindparam('b_id')).values(
+            login_count=func.coalesce(t.c.login_count, 0) + bindparam('b_count'),
+            last_login_at=case(
+                (t.c.last_login_at.is_(None), bindparam('b_at')),
+                (t.c.last_login_at < bindparam('b_at'), bindparam('b_at')),
+                else_=t.c.last_login_at,
+            ),
+        )
+        try:
+            with self.db.engine.begin() as conn:
+                conn.execute(statement, [{'b_id': user_id, 'b_count': count, 'b_at': at}
+                                         for user_id, (count, at) in pending.items()])
+        except Exception:
+            with self._lock:
+                for user_id, (count, at) in pending.items():
+                    current_count, current_at = self._pending.get(user_id, (0, at))
+                    self._pending[user_id] = (current_count + count, max(current_at, at))
+            raise
+        return len(pending)
@@ -0,0 +1,176 @@
+"""
+Latency and query-count benchmark for the catalog routes.
+
+Seeds a synthetic catalog (see seed.py), then drives index(), movie_detail,
+series_detail, /api/content and /api/stats, first serially through the Flask
+test client and optionally through a concurrent HTTP load generator against a
+local threaded server. Results (p50/p95/p99 latency and queries per request,
+taken from the query profiler's Server-Timing header) can be saved as a
+baseline and later runs compared against it.
+
+Examples:
+    python -m benchmarks.bench_catalog --size small --save-baseline
+    python -m benchmarks.bench_catalog --size small --compare
+    python -m benchmarks.bench_catalog --size medium --http --concurrency 16 --requests 2000
+    BENCH_DATABASE_URL=mysql://user:pw@localhost/flixhd_bench python -m benchmarks.bench_catalog --size large
+"""
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import common, seed
+
+
+def catalog_routes(ids):
+    routes = {
+        'index': '/',
+        'index_page_2': '/?page=2',
+        'index_search': '/?search_query=00042',
+        'api_content': '/api/content?page=1',
+        'api_stats': '/api/stats',
+    }
+    if ids.get('movie_id'):
+        routes['movie_detail'] = f"/movie/{ids['movie_id']}"
+    if ids.get('series_id'):
+        routes['series_detail'] = f"/series/{ids['series_id']}"
+    return routes
+
+
+def run_test_client(flask_app, routes, iterations, warmup):
+    client = common.logged_in_client(flask_app)
+    results = {}
+    for name, path in routes.items():
+        for _ in range(warmup):
+            client.get(path)
+        latencies, queries, sizes = [], [], []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            response = client.get(path)
+            body = response.get_data()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f'{path} returned {response.status_code}')
+            queries.append(common.queries_from_headers(response.headers)[0])
+            sizes.append(len(body))
+        results[name] = common.summarize(latencies, queries, {'bytes': max(sizes)})
+    return results
+
+
+def _serve(flask_app):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, flask_app, threaded=True, request_handler=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def _session_cookie(flask_app):
+    client = common.logged_in_client(flask_app)
+    cookie = client.get_cookie(flask_app.config.get('SESSION_COOKIE_NAME', 'session'))
+    return {cookie.key: cookie.value} if cookie else {}
+
+
+def run_http_load(flask_app, routes, total_requests, concurrency, base_url=None, cookies=None):
+    """Fires ``total_requests`` per route from ``concurrency`` threads and reports latency under load."""
+    import requests
+
+    server = None
+    if base_url is None:
+        server = _serve(flask_app)
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        cookies = _session_cookie(flask_app)
+
+    local = threading.local()
+
+    def one_request(path):
+        sess = getattr(local, 'session', None)
+        if sess is None:
+            sess = local.session = requests.Session()
+            sess.cookies.update(cookies or {})
+        start = time.perf_counter()
+        response = sess.get(base_url + path, allow_redirects=False)
+        elapsed = time.perf_counter() - start
+        return elapsed, response.status_code, common.queries_from_headers(response.headers)[0]
+
+    results = {}
+    try:
+        for name, path in routes.items():
+            wall_start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                samples = list(pool.map(one_request, [path] * total_requests))
+            wall = time.perf_counter() - wall_start
+            errors = sum(1 for _, status, _ in samples if status != 200)
+            results[f'http_{name}'] = common.summarize(
+                [s[0] for s in samples], [s[2] for s in samples],
+                {'rps': round(total_requests / wall, 1), 'errors': errors},
+            )
+    finally:
+        if server is not None:
+            server.shutdown()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', choices=sorted(seed.SIZES), default='small')
+    parser.add_argument('--movies', type=int, help='override the movie count for --size')
+    parser.add_argument('--series', type=int, help='override the series count for --size')
+    parser.add_argument('--seasons', type=int, default=8, help='seasons per series')
+    parser.add_argument('--episodes', type=int, default=12, help='episodes per season')
+    parser.add_argument('--reseed', action='store_true', help='reseed even if the catalog size already matches')
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--http', action='store_true', help='also run the concurrent HTTP load generator')
+    parser.add_argument('--url', help='load-test an already running server instead of a local one')
+    parser.add_argument('--cookie', help='session cookie value to send with --url')
+    parser.add_argument('--requests', type=int, default=500, help='HTTP requests per route')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--baseline', help='baseline name (default: catalog-<size>)')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true', help='exit non-zero on regressions against the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95 slowdown as a fraction')
+    args = parser.parse_args(argv)
+
+    app_module = common.load_app()
+    movies = args.movies if args.movies is not None else seed.SIZES[args.size]['movies']
+    series = args.series if args.series is not None else seed.SIZES[args.size]['series']
+
+    if args.reseed or not seed.catalog_matches(app_module, movies, series):
+        start = time.perf_counter()
+        seed.seed_catalog(app_module, movies, series, args.seasons, args.episodes)
+        print(f'Seeded {movies} movies / {series} series in {time.perf_counter() - start:.1f}s')
+    ids = seed.sample_ids(app_module)
+
+    routes = catalog_routes(ids)
+    results = run_test_client(app_module.app, routes, args.iterations, args.warmup)
+    if args.http or args.url:
+        cookies = {app_module.app.config.get('SESSION_COOKIE_NAME', 'session'): args.cookie} if args.cookie else None
+        results.update(run_http_load(app_module.app, routes, args.requests, args.concurrency, args.url, cookies))
+
+    common.print_table(results)
+
+    baseline_name = args.baseline or f'catalog-{args.size}'
+    if args.save_baseline:
+        common.save_baseline(baseline_name, results)
+        print(f'Baseline saved to {common.baseline_path(baseline_name)}')
+    if args.compare:
+        baseline = common.load_baseline(baseline_name)
+        if baseline is None:
+            print(f'No baseline named {baseline_name}; run with --save-baseline first.')
+            return 2
+        regressions = common.compare_to_baseline(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+CPU cost versus bytes saved for response compression.
+
+Captures real response bodies (index page, /api/content, a streamed admin
+list and a static stylesheet) from a seeded catalog, then for every available
+encoding and a range of levels reports compression time, output size, ratio
+and how many microseconds each saved kilobyte costs. A second table measures
+the middleware end to end: uncompressed, compressed and served from the
+compressed-body cache.
+
+Examples:
+    python -m benchmarks.bench_compression --size small
+    python -m benchmarks.bench_compression --levels gzip=1,6,9 br=1,4,11 zstd=1,3,10
+"""
+import argparse
+import sys
+import time
+
+from benchmarks import common, seed
+
+DEFAULT_LEVELS = {'gzip': (1, 6, 9), 'br': (1, 4, 6, 11), 'zstd': (1, 3, 10)}
+
+
+def capture_bodies(flask_app):
+    client = common.logged_in_client(flask_app)
+    routes = {
+        'index': '/',
+        'api_content': '/api/content?page=1',
+        'api_requests': '/api/requests?limit=200',
+        'style2_css': '/static/css/style2.css',
+    }
+    bodies = {}
+    for name, path in routes.items():
+        response = client.get(path, headers={'Accept-Encoding': 'identity'})
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} returned {response.status_code}')
+        bodies[name] = response.get_data()
+    return routes, bodies
+
+
+def time_call(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return common.percentile(samples, 50), result
+
+
+def bench_codecs(bodies, levels, iterations):
+    from compression import available_encodings, compress
+
+    results = {}
+    for encoding in available_encodings():
+        for level in levels.get(encoding, ()):
+            for name, body in bodies.items():
+                elapsed, out = time_call(lambda: compress(body, encoding, level), iterations)
+                saved_kb = max(len(body) - len(out), 1) / 1024
+                results[f'{name}:{encoding}-{level}'] = {
+                    'in_bytes': len(body),
+                    'out_bytes': len(out),
+                    'ratio': round(len(body) / len(out), 2),
+                    'ms': round(elapsed * 1000, 3),
+                    'MB_per_s': round(len(body) / elapsed / 1e6, 1),
+                    'us_per_saved_kb': round(elapsed * 1e6 / saved_kb, 2),
+                }
+    return results
+
+
+def bench_middleware(flask_app, routes, iterations):
+    """End-to-end latency through the test client with and without compression and the compressed-body cache."""
+    client = common.logged_in_client(flask_app)
+    middleware = flask_app.extensions['compression'].middleware
+    results = {}
+    for name, path in routes.items():
+        for label, accept in (('identity', 'identity'), ('gzip', 'gzip'), ('best', 'br, zstd, gzip')):
+            latencies, size = [], 0
+            for _ in range(iterations):
+                start = time.perf_counter()
+                response = client.get(path, headers={'Accept-Encoding': accept})
+                size = len(response.get_data())
+                latencies.append(time.perf_counter() - start)
+            results[f'{name}:{label}'] = common.summarize(latencies, extra={
+                'bytes': size, 'encoding': response.headers.get('Content-Encoding', '-')})
+    results['compressed_cache'] = {'runs': 0, 'bytes': middleware.cache.size}
+    return results
+
+
+def parse_levels(values):
+    if not values:
+        return DEFAULT_LEVELS
+    levels = {}
+    for value in values:
+        encoding, _, numbers = value.partition('=')
+        levels[encoding] = tuple(int(n) for n in numbers.split(',') if n)
+    return levels
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', choices=sorted(seed.SIZES), default='small')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--levels', nargs='*', help='encoding=level,level,... (default: a spread per encoding)')
+    args = parser.parse_args(argv)
+
+    app_module = common.load_app()
+    sizes = seed.SIZES[args.size]
+    if not seed.catalog_matches(app_module, sizes['movies'], sizes['series']):
+        seed.seed_catalog(app_module, sizes['movies'], sizes['series'])
+    if app_module.compression.middleware is None:
+        print('COMPRESS_ENABLED is false; nothing to measure.')
+        return 2
+
+    routes, bodies = capture_bodies(app_module.app)
+    print('Codec cost (median of %d runs)' % args.iterations)
+    common.print_table(bench_codecs(bodies, parse_levels(args.levels), args.iterations))
+    print()
+    print('Through the middleware')
+    common.print_table(bench_middleware(app_module.app, routes, args.iterations))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
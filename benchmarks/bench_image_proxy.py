@@ -0,0 +1,129 @@
+"""
+Benchmark for the TMDB image proxy against a local stub origin.
+
+Starts a tiny HTTP server that answers ``/t/p/<size>/<name>.jpg`` with a
+generated JPEG (counting every request), points TMDB_IMAGE_ORIGIN at it and a
+temporary IMAGE_CACHE_DIR, then measures:
+
+* cold misses (origin fetch + resize + store) and warm hits,
+* single-flight: N concurrent requests for one uncached image must cost one
+  origin fetch,
+* eviction: filling past IMAGE_CACHE_MAX_BYTES keeps the cache under the bound.
+
+Examples:
+    python -m benchmarks.bench_image_proxy
+    python -m benchmarks.bench_image_proxy --images 200 --concurrency 32 --origin-delay 0.05
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks import common
+
+
+class StubOrigin:
+    """Threaded HTTP server imitating image.tmdb.org's /t/p/<size>/<file> layout."""
+
+    def __init__(self, delay=0.0, source_width=1280):
+        self.delay = delay
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._image = _jpeg(source_width)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.hits += 1
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if not self.path.startswith('/t/p/') or 'missing' in self.path:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg')
+                self.send_header('Content-Length', str(len(stub._image)))
+                self.end_headers()
+                self.wfile.write(stub._image)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_port}'
+
+    def close(self):
+        self.server.shutdown()
+
+
+def _jpeg(width):
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.effect_noise((width, width * 3 // 2), 64).convert('RGB').save(buf, 'JPEG', quality=85)
+    return buf.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=50, help='distinct images for the miss/hit runs')
+    parser.add_argument('--width', type=int, default=320)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--origin-delay', type=float, default=0.02, help='seconds the stub waits per response')
+    parser.add_argument('--cache-mb', type=float, default=2.0, help='cache bound for the eviction check')
+    args = parser.parse_args(argv)
+
+    origin = StubOrigin(delay=args.origin_delay)
+    cache_dir = tempfile.mkdtemp(prefix='flixhd_image_cache_')
+    os.environ['TMDB_IMAGE_ORIGIN'] = origin.url
+    os.environ['IMAGE_CACHE_DIR'] = cache_dir
+    app_module = common.load_app()
+    flask_app = app_module.app
+    proxy = app_module.image_proxy
+    client = flask_app.test_client()
+
+    def get(name):
+        start = time.perf_counter()
+        response = client.get(f'/img/tmdb/{args.width}/{name}.jpg')
+        response.get_data()
+        if response.status_code != 200:
+            raise RuntimeError(f'{name} returned {response.status_code}')
+        return time.perf_counter() - start
+
+    results = {}
+    names = [f'bench{i}' for i in range(args.images)]
+    results['cold_miss'] = common.summarize([get(n) for n in names], extra={'origin_fetches': origin.hits})
+    before = origin.hits
+    results['warm_hit'] = common.summarize([get(n) for n in names], extra={'origin_fetches': origin.hits - before})
+
+    before = origin.hits
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        latencies = list(pool.map(lambda _: get('stampede'), range(args.concurrency)))
+    results['concurrent_miss'] = common.summarize(latencies, extra={'origin_fetches': origin.hits - before})
+
+    proxy.cache.max_bytes = int(args.cache_mb * 1024 * 1024)
+    for i in range(args.images * 4):
+        get(f'fill{i}')
+    on_disk = sum(os.path.getsize(os.path.join(cache_dir, f)) for f in os.listdir(cache_dir))
+    results['eviction'] = {'runs': args.images * 4, 'bound_bytes': proxy.cache.max_bytes,
+                           'tracked_bytes': proxy.cache.total_bytes, 'on_disk_bytes': on_disk}
+
+    origin.close()
+    common.print_table(results)
+    ok = results['concurrent_miss']['origin_fetches'] == 1 and on_disk <= proxy.cache.max_bytes
+    if not ok:
+        print('FAILED: expected one origin fetch for the concurrent misses and a bounded cache')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
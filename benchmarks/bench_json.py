@@ -0,0 +1,101 @@
+"""
+Serialization cost of the JSON list endpoints.
+
+Loads ``--rows`` movies (1,000 by default) two ways: as ORM objects turned
+into dicts with ``Movie.to_dict()``, and as projected row tuples passed
+through ``serialize_movie_row()``, the path /api/content and the admin lists
+now take. Each payload is then encoded with the stdlib ``json`` module and
+with orjson (when installed) through the app's JSON provider. For every
+combination the table reports the median time and, from tracemalloc, the peak
+and retained bytes per payload. (orjson writes non-ASCII text as UTF-8 rather
+than ``\\u`` escapes, so its payloads are a little smaller.)
+
+Examples:
+    python -m benchmarks.bench_json
+    python -m benchmarks.bench_json --size small --rows 1000 --iterations 30
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks import common, seed
+
+
+def build_orm(app_module, rows):
+    movies = app_module.Movie.query.order_by(app_module.Movie.created_at.desc()).limit(rows).all()
+    return [movie.to_dict() for movie in movies]
+
+
+def build_rows(app_module, rows):
+    query = app_module.select(*app_module.MOVIE_ROW_COLUMNS).order_by(app_module.Movie.created_at.desc()).limit(rows)
+    return [app_module.serialize_movie_row(row) for row in app_module.db.session.execute(query)]
+
+
+def measure(func, iterations):
+    """Median wall time over ``iterations`` runs, then one traced run for allocations."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        allocated = sum(stat.size for stat in tracemalloc.take_snapshot().statistics('filename'))
+    finally:
+        tracemalloc.stop()
+    return {
+        'median_ms': round(common.percentile(samples, 50) * 1000, 2),
+        'peak_kb': round(peak / 1024, 1),
+        'retained_kb': round(allocated / 1024, 1),
+    }
+
+
+def run(app_module, rows, iterations):
+    flask_app = app_module.app
+    provider = flask_app.json
+    stdlib = DefaultJSONProvider(flask_app)
+    encoders = {'json': lambda payload: stdlib.dumps(payload).encode('utf-8')}
+    if provider.backend == 'orjson':
+        encoders['orjson'] = provider.dumps_bytes
+    builders = {'orm_to_dict': build_orm, 'row_tuples': build_rows}
+
+    results = {}
+    with flask_app.test_request_context():
+        for build_name, build in builders.items():
+            app_module.db.session.expunge_all()
+            results[f'{build_name}:build'] = measure(lambda: build(app_module, rows), iterations)
+            payload = {'items': build(app_module, rows)}
+            for encoder_name, encode in encoders.items():
+                size = len(encode(payload))
+                results[f'{build_name}:encode:{encoder_name}'] = dict(
+                    measure(lambda: encode(payload), iterations), bytes=size)
+                results[f'{build_name}:end_to_end:{encoder_name}'] = measure(
+                    lambda: encode({'items': build(app_module, rows)}), iterations)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', choices=sorted(seed.SIZES), default='small')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    app_module = common.load_app()
+    sizes = seed.SIZES[args.size]
+    if not seed.catalog_matches(app_module, sizes['movies'], sizes['series']):
+        seed.seed_catalog(app_module, sizes['movies'], sizes['series'])
+
+    print(f'{args.rows} movie rows, JSON provider backend: {app_module.app.json.backend}')
+    common.print_table(run(app_module, args.rows, args.iterations))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+What column projection saves on the list views.
+
+Loads the newest ``--rows`` movies as whole ORM rows, as ORM rows limited to
+the card columns with ``load_only()``, and as ``card_select()`` rows,
+reporting median load time, tracemalloc peak and the bytes of column data
+pulled from the database per page. A second table times turning a page into
+render-ready items: ORM instances with display attributes set on them (how
+index() used to work) against the ``Card`` view models templates get now,
+including the garbage collections triggered along the way. A third compares
+the JSON the dashboard grid receives: full ``to_dict()`` entries against the
+card entries /api/content returns.
+
+Examples:
+    python -m benchmarks.bench_projection
+    python -m benchmarks.bench_projection --size medium --rows 120 --iterations 30
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from sqlalchemy.orm import load_only
+
+from benchmarks import common, seed
+
+
+def column_bytes(items, columns):
+    """Sum of the loaded values' lengths: a rough proxy for bytes read off the wire."""
+    total = 0
+    for item in items:
+        state = item.__dict__ if hasattr(item, '__dict__') else item._mapping
+        for column in columns:
+            value = state.get(column.key)
+            if value is not None:
+                total += len(value) if isinstance(value, (str, bytes)) else 8
+    return total
+
+
+def measure(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    gc.collect()
+    collections = sum(stat['collections'] for stat in gc.get_stats())
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'median_ms': round(common.percentile(samples, 50) * 1000, 2),
+        'peak_kb': round(peak / 1024, 1),
+        'gc_runs': sum(stat['collections'] for stat in gc.get_stats()) - collections,
+    }
+
+
+def orm_page(app_module, query):
+    """The old index() shape: ORM instances with display attributes assigned for the template."""
+    items = query.all()
+    for item in items:
+        item.thumbnail_display = app_module.get_display_thumbnail(item)
+        item.thumbnail_sources = app_module.get_display_sources(item)
+    return items
+
+
+def run(app_module, rows, iterations):
+    Movie, db = app_module.Movie, app_module.db
+    all_columns = tuple(Movie.__table__.columns)
+    newest = Movie.created_at.desc()
+    card_only = load_only(*app_module.CARD_COLUMNS[Movie])
+    shapes = {
+        'full_rows': lambda: Movie.query.order_by(newest).limit(rows).all(),
+        'load_only_cards': lambda: Movie.query.options(card_only).order_by(newest).limit(rows).all(),
+        'card_select': lambda: db.session.execute(app_module.card_select(Movie).order_by(newest).limit(rows)).all(),
+    }
+    pages = {
+        'orm_mutation': lambda: orm_page(app_module, Movie.query.options(card_only).order_by(newest).limit(rows)),
+        'card_view_models': lambda: app_module.cards(app_module.card_select(Movie).order_by(newest).limit(rows)),
+    }
+    load_results, page_results, payload_results = {}, {}, {}
+    with app_module.app.test_request_context():
+        for name, shape in shapes.items():
+            def load():
+                db.session.expunge_all()
+                return shape()
+
+            result = measure(load, iterations)
+            result['column_kb'] = round(column_bytes(load(), all_columns) / 1024, 1)
+            load_results[name] = result
+
+        for name, build in pages.items():
+            def page():
+                db.session.expunge_all()
+                return build()
+
+            page_results[name] = measure(page, iterations)
+
+        db.session.expunge_all()
+        movies = Movie.query.order_by(Movie.created_at.desc()).limit(rows).all()
+        encode = app_module.app.json.dumps_bytes
+        for name, serialize in (('to_dict', Movie.to_dict), ('card', app_module.serialize_card_row)):
+            payload = encode({'items': [serialize(movie) for movie in movies]})
+            payload_results[name] = {'bytes': len(payload), 'bytes_per_item': len(payload) // max(len(movies), 1)}
+    return load_results, page_results, payload_results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', choices=sorted(seed.SIZES), default='small')
+    parser.add_argument('--rows', type=int, default=120, help='rows per page (index() shows PER_PAGE=120)')
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    app_module = common.load_app()
+    sizes = seed.SIZES[args.size]
+    if not seed.catalog_matches(app_module, sizes['movies'], sizes['series']):
+        seed.seed_catalog(app_module, sizes['movies'], sizes['series'])
+
+    load_results, page_results, payload_results = run(app_module, args.rows, args.iterations)
+    print(f'Loading {args.rows} movies (median of {args.iterations} runs)')
+    common.print_table(load_results)
+    print()
+    print('Render-ready page items')
+    common.print_table(page_results)
+    print()
+    print('Dashboard grid payload')
+    common.print_table(payload_results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
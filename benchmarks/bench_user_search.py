@@ -0,0 +1,86 @@
+"""
+User lookup and admin search at scale.
+
+Fills the users table with ``--users`` synthetic accounts (their lookup
+columns and n-gram postings included), then times, inside one app context:
+
+* the forgot-password lookup: ``username ILIKE :name`` against the indexed
+  ``username_lower = :name``;
+* the admin search for a page of 20: ``ILIKE '%term%'`` on username and email
+  against app.search_users() (the n-gram index driving ``LIKE`` on the
+  lower-cased columns), for a rare, a moderately common, a very common and a
+  missing term.
+
+Examples:
+    python -m benchmarks.bench_user_search
+    python -m benchmarks.bench_user_search --users 1000000 --iterations 50
+"""
+import argparse
+import sys
+import time
+
+from benchmarks import common, seed
+
+PAGE = 20
+
+
+def timed(func, iterations):
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = func()
+        latencies.append(time.perf_counter() - start)
+    return latencies, result
+
+
+def run(app_module, users, iterations):
+    User, db = app_module.User, app_module.db
+    name = f'USER{users // 2}'
+    terms = {
+        'rare': f'r{users // 3}',
+        'moderate': str(users // 7)[:3],
+        'common': 'example',
+        'missing': 'zzqq',
+    }
+
+    def old_search(term):
+        like = f'%{term}%'
+        return db.session.query(User.id).filter(User.username.ilike(like) | User.email.ilike(like)).limit(PAGE).all()
+
+    def new_search(term):
+        query, id_column = app_module.search_users(db.session.query(User.id), term)
+        return query.order_by(id_column.desc()).limit(PAGE).all()
+
+    results = {}
+    with app_module.app.app_context():
+        cases = {
+            'lookup:ilike': lambda: User.query.filter(User.username.ilike(name)).first(),
+            'lookup:username_lower': lambda: User.query.filter(User.username_lower == name.lower()).first(),
+        }
+        for label, term in terms.items():
+            cases[f'search_{label}:ilike'] = lambda term=term: old_search(term)
+            cases[f'search_{label}:ngram'] = lambda term=term: new_search(term)
+        for case, func in cases.items():
+            func()  # warm up
+            latencies, result = timed(func, iterations)
+            rows = len(result) if isinstance(result, list) else int(result is not None)
+            results[case] = common.summarize(latencies, extra={'rows': rows})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--iterations', type=int, default=30)
+    args = parser.parse_args(argv)
+
+    app_module = common.load_app()
+    if seed.user_count(app_module) != args.users:
+        print(f'Seeding {args.users} users...')
+        seed.seed_users(app_module, args.users)
+    common.print_table(run(app_module, args.users, args.iterations))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
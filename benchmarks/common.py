@@ -0,0 +1,126 @@
+"""
+Shared helpers for the FlixHD benchmark scripts.
+
+``load_app()`` must be called before anything imports ``app``: it fills in the
+environment variables app.py reads at import time so the benchmarks can run
+against a throwaway SQLite file without a .env.
+"""
+import json
+import os
+import re
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'baselines')
+DEFAULT_DB_URL = 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'flixhd_bench.db')
+
+_SERVER_TIMING_QUERIES = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+def load_app(db_url=None):
+    """Imports and returns the app module configured for benchmarking."""
+    os.environ['DATABASE_URL'] = db_url or os.environ.get('BENCH_DATABASE_URL', DEFAULT_DB_URL)
+    os.environ.setdefault('ADMIN_USERNAME', 'bench-admin')
+    os.environ.setdefault('ADMIN_PASSWORD', 'bench-admin')
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    # Streamed pages run their queries after the Server-Timing header is sent,
+    # which would hide them from the per-request query counts.
+    os.environ.setdefault('STREAM_TEMPLATES', 'false')
+    # Keep session lookups out of the per-route query counts.
+    os.environ.setdefault('SESSION_BACKEND', 'memory')
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    os.chdir(REPO_ROOT)
+
+    import app as app_module
+    app_module.app.config['WTF_CSRF_ENABLED'] = False
+    return app_module
+
+
+def logged_in_client(flask_app, admin=True):
+    """Returns a Flask test client whose session is logged in as a user (and admin)."""
+    client = flask_app.test_client()
+    with client.session_transaction() as sess:
+        sess['user'] = 'bench-user'
+        sess['user_role'] = 'user'
+        sess['admin'] = admin
+    return client
+
+
+def queries_from_headers(headers):
+    """Extracts (query_count, db_ms) from the profiler's Server-Timing header."""
+    match = _SERVER_TIMING_QUERIES.search(headers.get('Server-Timing') or '')
+    if match:
+        return int(match.group(2)), float(match.group(1))
+    return None, None
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies_s, query_counts=(), extra=None):
+    """Builds the per-route result dict stored in baselines (latencies in ms)."""
+    ordered = sorted(latencies_s)
+    result = {
+        'runs': len(ordered),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+    }
+    counts = [q for q in query_counts if q is not None]
+    if counts:
+        result['queries_per_request'] = round(sum(counts) / len(counts), 2)
+    if extra:
+        result.update(extra)
+    return result
+
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f'{name}.json')
+
+
+def save_baseline(name, results):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(baseline_path(name), 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def load_baseline(name):
+    path = baseline_path(name)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Returns a list of human-readable regressions: p95 latency more than
+    ``tolerance`` (a fraction) above baseline, or any increase in queries per request.
+    """
+    regressions = []
+    for route, current in results.items():
+        previous = baseline.get(route)
+        if not previous:
+            continue
+        if 'p95_ms' in previous and current.get('p95_ms', 0) > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {current['p95_ms']}ms > baseline {previous['p95_ms']}ms (+{tolerance:.0%} allowed)")
+        if 'queries_per_request' in previous and current.get('queries_per_request', 0) > previous['queries_per_request']:
+            regressions.append(f"{route}: {current['queries_per_request']} queries/request > baseline {previous['queries_per_request']}")
+    return regressions
+
+
+def print_table(results):
+    columns = sorted({key for r in results.values() for key in r})
+    width = max([len(route) for route in results] + [5])
+    print(f"{'route':<{width}}  " + '  '.join(f'{c:>{max(len(c), 10)}}' for c in columns))
+    for route, r in results.items():
+        print(f'{route:<{width}}  ' + '  '.join(f"{r.get(c, ''):>{max(len(c), 10)}}" for c in columns))
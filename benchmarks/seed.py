@@ -0,0 +1,193 @@
+"""
+Synthetic catalog generator for the benchmarks.
+
+Rows are generated deterministically from ``seed`` and written with bulk
+``INSERT`` statements in chunks, so a 100k-movie catalog seeds in seconds on
+SQLite and works the same way against MySQL.
+"""
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import inspect
+
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama',
+          'Family', 'Fantasy', 'History', 'Horror', 'Music', 'Mystery', 'Romance',
+          'Science Fiction', 'Thriller', 'War', 'Western']
+
+SIZES = {
+    'small': {'movies': 1_000, 'series': 100},
+    'medium': {'movies': 10_000, 'series': 1_000},
+    'large': {'movies': 100_000, 'series': 5_000},
+}
+
+CHUNK = 2_000
+
+
+def _cast(rng):
+    return json.dumps([{'name': f'Actor {rng.randint(1, 50_000)}', 'profile_path': f'/p{rng.randint(1, 99999)}.jpg'} for _ in range(10)])
+
+
+def _common_fields(rng, index, created_at, prefix):
+    return {
+        'id': str(uuid.UUID(int=rng.getrandbits(128))),
+        'tmdb_id': str(100_000 + index),
+        'title': f'{prefix} {index:06d}',
+        'description': ' '.join(f'lorem{rng.randint(0, 999)}' for _ in range(60)),
+        'poster_url': f'https://image.tmdb.org/t/p/w500/{prefix.lower()}{index}.jpg',
+        'backdrop_url': f'https://image.tmdb.org/t/p/w1280/{prefix.lower()}{index}b.jpg',
+        'release_date': f'{rng.randint(1970, 2025)}-01-01',
+        'director': f'Director {rng.randint(1, 5000)}',
+        'genre': ', '.join(rng.sample(GENRES, rng.randint(1, 3))),
+        'cast': _cast(rng),
+        'download_url': f'https://downloads.example.com/{index}',
+        'created_at': created_at,
+    }
+
+
+def _insert_chunks(db, model, rows):
+    for start in range(0, len(rows), CHUNK):
+        db.session.execute(model.__table__.insert(), rows[start:start + CHUNK])
+
+
+def seed_catalog(app_module, movies, series, seasons_per_series=8, episodes_per_season=12, seed=1234):
+    """Drops and recreates all tables, then fills them with a synthetic catalog."""
+    db = app_module.db
+    rng = random.Random(seed)
+    now = datetime(2025, 1, 1)
+
+    with app_module.app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        movie_rows = []
+        for i in range(movies):
+            row = _common_fields(rng, i, now - timedelta(minutes=i), 'Movie')
+            row.update({
+                'embed_code': f'<iframe src="https://player.videasy.net/movie/{row["tmdb_id"]}" width="100%" height="600px" allow="fullscreen"></iframe>',
+                'content_type': 'movie',
+            })
+            movie_rows.append(row)
+        _insert_chunks(db, app_module.Movie, movie_rows)
+
+        series_rows, season_rows, episode_rows = [], [], []
+        season_id = 0
+        for i in range(series):
+            created = now - timedelta(minutes=i * 7)
+            row = _common_fields(rng, i, created, 'Series')
+            row.update({'content_type': 'series', 'last_updated_at': created})
+            series_rows.append(row)
+            for s in range(seasons_per_series):
+                season_id += 1
+                season_rows.append({'id': season_id, 'title': f'Season {s + 1}', 'series_id': row['id']})
+                for e in range(episodes_per_season):
+                    episode_rows.append({
+                        'number': e + 1,
+                        'title': f'Episode {e + 1}',
+                        'embed_code': f'<iframe src="https://player.videasy.net/tv/{row["tmdb_id"]}/{s + 1}/{e + 1}"></iframe>',
+                        'season_id': season_id,
+                    })
+        _insert_chunks(db, app_module.Series, series_rows)
+        _insert_chunks(db, app_module.Season, season_rows)
+        _insert_chunks(db, app_module.Episode, episode_rows)
+
+        request_rows = [{'title': f'Request {i}', 'link': None, 'notes': 'please add',
+                         'status': 'Pending' if i % 3 else 'Completed', 'date': now - timedelta(hours=i)}
+                        for i in range(max(100, movies // 10))]
+        _insert_chunks(db, app_module.MovieRequest, request_rows)
+
+        message_rows = [{'name': f'User {i}', 'email': f'user{i}@example.com', 'subject': 'Hello',
+                         'message': 'Message body ' * 20, 'status': 'New' if i % 2 else 'Read',
+                         'date': now - timedelta(hours=i)}
+                        for i in range(max(100, movies // 10))]
+        _insert_chunks(db, app_module.ContactMessage, message_rows)
+
+        _insert_users(app_module, max(100, movies // 10))
+
+        db.session.commit()
+        return {
+            'movie_id': movie_rows[len(movie_rows) // 2]['id'] if movie_rows else None,
+            'series_id': series_rows[len(series_rows) // 2]['id'] if series_rows else None,
+        }
+
+
+def _user_row(index):
+    username, email = f'user{index}', f'user{index}@example.com'
+    return {'id': index + 1, 'username': username, 'email': email, 'username_lower': username,
+            'email_lower': email, 'password': 'x', 'security_question': 'q', 'security_answer': 'a',
+            'role': 'user', 'is_active': True, 'login_count': 0}
+
+
+def _insert_users(app_module, count):
+    """Bulk-inserts ``count`` users with their lookup columns and search-index postings filled in."""
+    db, user_search = app_module.db, app_module.user_search
+    for start in range(0, count, CHUNK):
+        rows = [_user_row(i) for i in range(start, min(start + CHUNK, count))]
+        db.session.execute(app_module.User.__table__.insert(), rows)
+        postings = [p for row in rows for p in user_search.rows_for(row['id'], row['username'], row['email'])]
+        db.session.execute(user_search.table.insert(), postings)
+
+
+def seed_users(app_module, count):
+    """Replaces the users (and their search index) with ``count`` synthetic ones."""
+    db = app_module.db
+    tables = [app_module.User.__table__, app_module.user_search.table]
+    with app_module.app.app_context():
+        # Recreated rather than emptied so an older bench database picks up new columns.
+        db.metadata.drop_all(bind=db.engine, tables=tables)
+        db.metadata.create_all(bind=db.engine, tables=tables)
+        _insert_users(app_module, count)
+        db.session.commit()
+
+
+def schema_matches(app_module, tables=None):
+    """
+    True when every table in the app's metadata (or just ``tables``) exists in
+    the configured database with exactly the model's columns. A bench database
+    left over from before a schema change fails this and gets reseeded.
+    """
+    db = app_module.db
+    with app_module.app.app_context():
+        inspector = inspect(db.engine)
+        existing = set(inspector.get_table_names())
+        for table in tables or db.metadata.sorted_tables:
+            if table.name not in existing:
+                return False
+            if {column['name'] for column in inspector.get_columns(table.name)} != set(table.columns.keys()):
+                return False
+    return True
+
+
+def user_count(app_module):
+    """Number of users in the bench database, or 0 when the user tables need recreating."""
+    if not schema_matches(app_module, [app_module.User.__table__, app_module.user_search.table]):
+        return 0
+    with app_module.app.app_context():
+        try:
+            return app_module.db.session.query(app_module.User.id).count()
+        except Exception:
+            app_module.db.session.rollback()
+            return 0
+
+
+def catalog_matches(app_module, movies, series):
+    """True when the configured database already holds a catalog of this size under the current schema."""
+    db = app_module.db
+    if not schema_matches(app_module):
+        return False
+    with app_module.app.app_context():
+        try:
+            return (db.session.query(app_module.Movie.id).count() == movies and
+                    db.session.query(app_module.Series.id).count() == series)
+        except Exception:
+            db.session.rollback()
+            return False
+
+
+def sample_ids(app_module):
+    """Returns a movie id and series id from an existing catalog."""
+    with app_module.app.app_context():
+        movie = app_module.db.session.query(app_module.Movie.id).order_by(app_module.Movie.id).first()
+        series = app_module.db.session.query(app_module.Series.id).order_by(app_module.Series.id).first()
+        return {'movie_id': movie[0] if movie else None, 'series_id': series[0] if series else None}
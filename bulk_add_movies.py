@@ -4,17 +4,20 @@ import json
 import sys
 
 # This allows the script to import from your main app file
-from app import app, db, Movie, Series 
+from app import app, db, Movie, Series, get_or_create_embed_provider
 
 # --- CONFIGURATION ---
-# The base URL for the iframe. The TMDB ID will be added to the end.
+# The embed provider new movies are attached to. The base URL (the TMDB ID is
+# added to the end) is only used if the provider does not exist yet; change an
+# existing provider's URL with `flask embed-provider`.
+IFRAME_PROVIDER = "videasy"
 IFRAME_BASE_URL = "https://player.videasy.net/movie/"
 
 # --- MAIN SCRIPT LOGIC ---
 def bulk_add_movies():
     """
     This script fetches movie data from TMDB for a list of IDs,
-    constructs an iframe embed code, and saves them to the database.
+    points them at the iframe provider, and saves them to the database.
     """
     
     # /// --- EDIT THIS LIST --- ///
@@ -47,6 +50,8 @@ def bulk_add_movies():
         existing_movie_ids = {movie.tmdb_id for movie in Movie.query.with_entities(Movie.tmdb_id).all()}
         existing_series_ids = {series.tmdb_id for series in Series.query.with_entities(Series.tmdb_id).all()}
         all_existing_ids = existing_movie_ids.union(existing_series_ids)
+        # Movies store only the provider and their id on it; the iframe is rendered from the provider's URL template.
+        provider_id = get_or_create_embed_provider(IFRAME_PROVIDER, IFRAME_BASE_URL + '{id}')
 
         for tmdb_id in TMDB_IDS_TO_ADD:
             print(f"\nProcessing TMDB ID: {tmdb_id}...")
@@ -64,9 +69,6 @@ def bulk_add_movies():
                 response.raise_for_status() # Raise an error for bad responses (4xx or 5xx)
                 data = response.json()
                 
-                # Construct the iframe embed code
-                embed_code = f'<iframe style="border:1px #FFFFFF none" src="{IFRAME_BASE_URL}{tmdb_id}" title="iFrame" width="100%" height="600px" scrolling="no" frameborder="no" allow="fullscreen"></iframe>'
-
                 # Extract cast info
                 cast_data = data.get('credits', {}).get('cast', [])
                 actors_list = []
@@ -82,7 +84,8 @@ def bulk_add_movies():
                     tmdb_id=str(data.get('id')),
                     title=data.get('title'),
                     description=data.get('overview'),
-                    embed_code=embed_code,
+                    embed_provider_id=provider_id,
+                    embed_external_id=tmdb_id,
                     poster_url=f"https://image.tmdb.org/t/p/w500{data.get('poster_path')}" if data.get('poster_path') else None,
                     release_date=data.get('release_date'),
                     director=next((member['name'] for member in data.get('credits', {}).get('crew', []) if member.get('job') == 'Director'), None),
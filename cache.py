@@ -0,0 +1,72 @@
+"""
+Small in-process caches for the FlixHD Flask app.
+
+Each gunicorn worker keeps its own copy, so these are meant for short TTLs on
+values where a few seconds of staleness across workers is acceptable.
+"""
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Thread-safe key/value cache whose entries expire ``ttl`` seconds after they
+    were stored. Hits and misses are reported to ``metrics`` (a metrics.Metrics
+    instance) under ``name`` when one is given.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, ttl, name='default', metrics=None, max_entries=1024):
+        self.ttl = ttl
+        self.name = name
+        self.metrics = metrics
+        self.max_entries = max_entries
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._data[key]
+                entry = None
+        if entry is None:
+            if self.metrics is not None:
+                self.metrics.cache_miss(self.name)
+            return default
+        if self.metrics is not None:
+            self.metrics.cache_hit(self.name)
+        return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if len(self._data) >= self.max_entries and key not in self._data:
+                self._evict_expired()
+                if len(self._data) >= self.max_entries:
+                    # Drop the entry closest to expiry to make room.
+                    del self._data[min(self._data, key=lambda k: self._data[k][0])]
+            self._data[key] = (expires, value)
+
+    def get_or_set(self, key, factory, ttl=None):
+        """Returns the cached value for ``key``, computing and storing it with ``factory()`` on a miss."""
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, key=None):
+        """Drops one key, or everything when ``key`` is None."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for k in [k for k, (expires, _) in self._data.items() if expires <= now]:
+            del self._data[k]
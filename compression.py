@@ -0,0 +1,366 @@
+"""
+Response compression for the FlixHD Flask app.
+
+``Compression(app)`` wraps ``app.wsgi_app`` in ``CompressionMiddleware``, which
+negotiates brotli, zstd or gzip from Accept-Encoding (brotli and zstd only
+when the ``brotli`` / ``zstandard`` packages are installed) and:
+
+* compresses buffered bodies in one shot once they reach COMPRESS_MIN_SIZE,
+* compresses streamed bodies (no Content-Length, e.g. ``stream_with_context``)
+  incrementally, flushing the compressor after every chunk the application
+  yields so streamed pages still arrive progressively (applications should
+  therefore yield reasonably sized chunks, see streaming.coalesce),
+* keeps the compressed bytes of cacheable responses (those with an ETag or a
+  public max-age) in a bounded LRU, so repeat hits skip the compressor.
+
+Responses that already have a Content-Encoding, partial content, event
+streams, images and other non-text types pass through untouched.
+"""
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+from werkzeug.datastructures import Headers, ResponseCacheControl
+from werkzeug.http import parse_accept_header, parse_cache_control_header
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ('text/html', 'text/css', 'text/plain', 'text/javascript', 'text/xml',
+                      'application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+SKIPPED_STATUSES = (204, 206, 304)
+
+
+def available_encodings():
+    encodings = []
+    if brotli is not None:
+        encodings.append('br')
+    if zstandard is not None:
+        encodings.append('zstd')
+    encodings.append('gzip')
+    return tuple(encodings)
+
+
+# --- Encoders ---
+
+class _GzipEncoder:
+    def __init__(self, level):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self, level):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._obj.process(data)
+
+    def flush(self):
+        return self._obj.flush()
+
+    def finish(self):
+        return self._obj.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self, level):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._obj.flush()
+
+
+_ENCODERS = {'gzip': _GzipEncoder, 'br': _BrotliEncoder, 'zstd': _ZstdEncoder}
+
+
+def compress(data, encoding, level):
+    """One-shot compression of ``data``."""
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f'unsupported encoding {encoding!r}')
+
+
+class _CompressedCache:
+    """LRU of compressed bodies bounded by total bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._data[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._size -= len(evicted)
+
+    @property
+    def size(self):
+        return self._size
+
+
+# --- Middleware ---
+
+class CompressionMiddleware:
+    def __init__(self, wsgi_app, encodings=None, levels=None, min_size=500, cache_max_bytes=32 * 1024 * 1024, metrics=None):
+        self.wsgi_app = wsgi_app
+        supported = available_encodings()
+        self.encodings = tuple(e for e in (encodings or supported) if e in supported)
+        self.levels = {'gzip': 6, 'br': 4, 'zstd': 3}
+        self.levels.update(levels or {})
+        self.min_size = min_size
+        self.cache = _CompressedCache(cache_max_bytes)
+        self.metrics = metrics
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def choose_encoding(self, accept_encoding):
+        if not accept_encoding:
+            return None
+        accepted = parse_accept_header(accept_encoding)
+        best, best_quality = None, 0
+        # Server preference order breaks ties between equally weighted encodings.
+        for encoding in self.encodings:
+            quality = accepted[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def __call__(self, environ, start_response):
+        encoding = self.choose_encoding(environ.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.wsgi_app(environ, self._vary_only(start_response))
+
+        captured = {}
+        written = []
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = headers
+            captured['exc_info'] = exc_info
+            return written.append
+
+        app_iter = self.wsgi_app(environ, capture_start_response)
+        status, headers = captured['status'], Headers(captured['headers'])
+
+        if not self._should_compress(status, headers):
+            start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+            return _chain(written, app_iter)
+
+        self._add_vary(headers)
+        content_length = headers.get('Content-Length', type=int)
+        if content_length is None:
+            return self._stream(encoding, status, headers, written, app_iter, start_response, captured['exc_info'])
+
+        try:
+            body = b''.join(written) + b''.join(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+        if len(body) < self.min_size:
+            start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+            return [body]
+
+        compressed = self._compress_cached(body, encoding, headers)
+        self.bytes_in += len(body)
+        self.bytes_out += len(compressed)
+        self._set_encoding_headers(headers, encoding)
+        headers['Content-Length'] = str(len(compressed))
+        start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+        return [compressed]
+
+    def _vary_only(self, start_response):
+        """Uncompressed responses that *could* have been compressed still need Vary for shared caches."""
+        def wrapped(status, headers, exc_info=None):
+            headers = Headers(headers)
+            if self._should_compress(status, headers):
+                self._add_vary(headers)
+            return start_response(status, headers.to_wsgi_list(), exc_info)
+        return wrapped
+
+    def _should_compress(self, status, headers):
+        if int(status.split(' ', 1)[0]) in SKIPPED_STATUSES or 'Content-Encoding' in headers:
+            return False
+        content_type = (headers.get('Content-Type') or '').split(';', 1)[0].strip().lower()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return False
+        if 'no-transform' in (headers.get('Cache-Control') or ''):
+            return False
+        return True
+
+    @staticmethod
+    def _add_vary(headers):
+        vary = headers.get('Vary')
+        if not vary:
+            headers['Vary'] = 'Accept-Encoding'
+        elif 'accept-encoding' not in vary.lower() and vary != '*':
+            headers['Vary'] = f'{vary}, Accept-Encoding'
+
+    @staticmethod
+    def _set_encoding_headers(headers, encoding):
+        headers['Content-Encoding'] = encoding
+        etag = headers.get('ETag')
+        # The compressed body is a different byte sequence, so a strong ETag must
+        # become weak; werkzeug compares If-None-Match weakly, so 304s still work.
+        if etag and not etag.startswith('W/'):
+            headers['ETag'] = 'W/' + etag
+        headers.remove('Accept-Ranges')
+
+    def _compress_cached(self, body, encoding, headers):
+        level = self.levels[encoding]
+        cacheable = 'ETag' in headers
+        if not cacheable:
+            cache_control = parse_cache_control_header(headers.get('Cache-Control'), cls=ResponseCacheControl)
+            cacheable = bool(cache_control.public and cache_control.max_age)
+        if not cacheable:
+            return compress(body, encoding, level)
+
+        # Hashing is ~20x cheaper than compressing, and keying on the body means
+        # identical responses share an entry whatever produced them.
+        key = (encoding, level, hashlib.sha1(body).digest())
+        compressed = self.cache.get(key)
+        if compressed is not None:
+            if self.metrics is not None:
+                self.metrics.cache_hit('compressed_responses')
+            return compressed
+        if self.metrics is not None:
+            self.metrics.cache_miss('compressed_responses')
+        compressed = compress(body, encoding, level)
+        self.cache.set(key, compressed)
+        return compressed
+
+    def _stream(self, encoding, status, headers, written, app_iter, start_response, exc_info):
+        self._set_encoding_headers(headers, encoding)
+        start_response(status, headers.to_wsgi_list(), exc_info)
+        encoder = _ENCODERS[encoding](self.levels[encoding])
+        middleware = self
+
+        def generate():
+            try:
+                for chunk in _chain(written, app_iter):
+                    if not chunk:
+                        continue
+                    middleware.bytes_in += len(chunk)
+                    # PEP 3333: middleware must not hold back data the application
+                    # has yielded, so every chunk is flushed through the encoder.
+                    out = encoder.compress(chunk) + encoder.flush()
+                    middleware.bytes_out += len(out)
+                    yield out
+                out = encoder.finish()
+                middleware.bytes_out += len(out)
+                yield out
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+
+        return generate()
+
+
+def _chain(first, rest):
+    if not first:
+        return rest
+    return _Chained(first, rest)
+
+
+class _Chained:
+    """Iterable yielding data passed to the legacy ``write()`` callable before the app iterable, preserving close()."""
+
+    def __init__(self, first, rest):
+        self._first = first
+        self._rest = rest
+
+    def __iter__(self):
+        yield from self._first
+        yield from self._rest
+
+    def close(self):
+        if hasattr(self._rest, 'close'):
+            self._rest.close()
+
+
+class Compression:
+    """
+    Flask extension installing CompressionMiddleware.
+
+    Configuration keys:
+        COMPRESS_ENABLED        -- install the middleware at all (default True)
+        COMPRESS_ALGORITHMS     -- preference order (default br, zstd, gzip; missing libraries are skipped)
+        COMPRESS_LEVELS         -- {encoding: level} (default gzip 6, br 4, zstd 3)
+        COMPRESS_MIN_SIZE       -- smallest buffered body worth compressing (default 500 bytes)
+        COMPRESS_CACHE_MAX_BYTES -- size of the compressed-body cache (default 32 MiB)
+    """
+
+    def __init__(self, app=None, metrics=None):
+        self.metrics = metrics
+        self.middleware = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_ALGORITHMS', ('br', 'zstd', 'gzip'))
+        app.config.setdefault('COMPRESS_LEVELS', {})
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+        app.extensions['compression'] = self
+        if not app.config['COMPRESS_ENABLED']:
+            return
+        self.middleware = CompressionMiddleware(
+            app.wsgi_app,
+            encodings=app.config['COMPRESS_ALGORITHMS'],
+            levels=app.config['COMPRESS_LEVELS'],
+            min_size=app.config['COMPRESS_MIN_SIZE'],
+            cache_max_bytes=app.config['COMPRESS_CACHE_MAX_BYTES'],
+            metrics=self.metrics,
+        )
+        app.wsgi_app = self.middleware
+        if self.metrics is not None:
+            middleware = self.middleware
+            self.metrics.register_gauge('compression_bytes', 'Response bytes before and after compression.',
+                                        lambda: {'in': middleware.bytes_in, 'out': middleware.bytes_out},
+                                        label_name='direction')
+            self.metrics.register_gauge('compression_cache_bytes', 'Bytes held in the compressed-response cache.',
+                                        lambda: middleware.cache.size)
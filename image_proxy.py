@@ -0,0 +1,321 @@
+"""
+Local mirror for TMDB poster/backdrop images.
+
+``/img/tmdb/<width>/<path>`` fetches the image from ``TMDB_IMAGE_ORIGIN`` on
+the first request, resizes it to ``width`` and keeps it in a size-bounded
+on-disk LRU cache, so browsers never talk to image.tmdb.org and a TMDB outage
+only affects images that were never viewed. All workers share the cache
+directory and its size bound. Concurrent misses for the same image inside
+one worker share a single origin fetch.
+
+Point ``TMDB_IMAGE_ORIGIN`` at a local stub server to exercise it offline (see
+benchmarks/bench_image_proxy.py).
+"""
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+
+import requests
+from flask import abort, send_file, url_for
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+from cache import TTLCache
+
+# Sizes TMDB serves; we fetch the smallest one at least as wide as requested.
+TMDB_SIZES = (92, 154, 185, 342, 500, 780, 1280)
+_TMDB_URL = re.compile(r'^https?://image\.tmdb\.org/t/p/(?:w\d+|original)/([A-Za-z0-9_-]+\.(?:jpg|jpeg|png|webp))$')
+_IMAGE_PATH = re.compile(r'^[A-Za-z0-9_-]+\.(jpg|jpeg|png|webp)$')
+_MIME_TYPES = {'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp'}
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class OriginError(Exception):
+    """The origin could not provide the image (network error, non-200, too large)."""
+
+
+class DiskLRU:
+    """
+    Directory of cached files bounded by total size, shared by every worker
+    that points at it. The directory itself is the only state: a file is a
+    hit in any worker as soon as one of them has written it, reads bump the
+    file's mtime, and eviction scans the directory (st_size, st_mtime) and
+    removes the least recently used files until the total is back under
+    ``low_water`` of the bound.
+
+    Each worker scans when its own estimate (the last scanned total plus what
+    it has written since) passes ``max_bytes``, and at least every
+    ``scan_interval`` seconds while it is writing, so the directory can only
+    overshoot by what the other workers wrote since their last scan.
+    """
+
+    def __init__(self, directory, max_bytes, scan_interval=60, low_water=0.9):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.scan_interval = scan_interval
+        self.low_water = low_water
+        self._scanned_total = 0
+        self._written = 0
+        self._last_scan = float('-inf')
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.evict()
+
+    @property
+    def total_bytes(self):
+        """Bytes in the directory as of the last scan, plus what this worker has written since."""
+        return self._scanned_total + self._written
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def get(self, name):
+        """Path of a cached file, marking it most recently used, or None."""
+        path = self.path(name)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, name, data):
+        path = self.path(name)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._written += len(data)
+            due = (self.total_bytes > self.max_bytes
+                   or time.monotonic() - self._last_scan >= self.scan_interval)
+        if due:
+            self.evict(keep=name)
+        return path
+
+    def _scan(self):
+        found = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        found.append((stat.st_mtime, entry.name, stat.st_size))
+                except FileNotFoundError:
+                    pass  # removed by another worker mid-scan
+        return found
+
+    def evict(self, keep=None):
+        """Rescans the directory and, when it is over the bound, removes the least recently used files."""
+        if not self._scan_lock.acquire(blocking=False):
+            return  # another thread of this worker is already scanning
+        try:
+            found = self._scan()
+            total = sum(size for _, _, size in found)
+            if total > self.max_bytes:
+                target = self.max_bytes * self.low_water
+                for _, name, size in sorted(found):
+                    if total <= target:
+                        break
+                    if name == keep:
+                        continue
+                    try:
+                        os.remove(self.path(name))
+                    except FileNotFoundError:
+                        pass  # evicted by another worker
+                    total -= size
+            with self._lock:
+                self._scanned_total = total
+                self._written = 0
+                self._last_scan = time.monotonic()
+        finally:
+            self._scan_lock.release()
+
+
+class _Flight:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ImageProxy:
+    """
+    Flask extension registering the ``tmdb_image`` route and the
+    ``tmdb_image`` template filter.
+
+    Configuration keys:
+        IMAGE_PROXY_ENABLED       -- rewrite TMDB URLs to the proxy (default True)
+        TMDB_IMAGE_ORIGIN         -- origin to fetch from (default https://image.tmdb.org)
+        IMAGE_CACHE_DIR           -- cache directory (default <instance>/image_cache)
+        IMAGE_CACHE_MAX_BYTES     -- cache size bound, shared by all workers (default 512 MiB)
+        IMAGE_CACHE_SCAN_INTERVAL -- seconds between directory scans while writing (default 60)
+        IMAGE_PROXY_WIDTHS        -- widths clients may request (bounds the key space)
+        IMAGE_PROXY_TIMEOUT       -- origin timeout in seconds (default 10)
+        IMAGE_PROXY_MAX_FETCH_BYTES -- largest origin response accepted (default 10 MiB)
+    """
+
+    def __init__(self, app=None, metrics=None):
+        self.app = None
+        self.metrics = metrics
+        self.cache = None
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._origin_missing = TTLCache(ttl=300, name='tmdb_image_origin_missing')
+        self._http = requests.Session()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('IMAGE_PROXY_ENABLED', True)
+        app.config.setdefault('TMDB_IMAGE_ORIGIN', 'https://image.tmdb.org')
+        app.config.setdefault('IMAGE_CACHE_DIR', os.path.join(app.instance_path, 'image_cache'))
+        app.config.setdefault('IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+        app.config.setdefault('IMAGE_CACHE_SCAN_INTERVAL', 60)
+        app.config.setdefault('IMAGE_PROXY_WIDTHS', (92, 185, 320, 500, 780, 1280))
+        app.config.setdefault('IMAGE_PROXY_TIMEOUT', 10)
+        app.config.setdefault('IMAGE_PROXY_MAX_FETCH_BYTES', 10 * 1024 * 1024)
+        self.app = app
+        self.cache = DiskLRU(app.config['IMAGE_CACHE_DIR'], app.config['IMAGE_CACHE_MAX_BYTES'],
+                             scan_interval=app.config['IMAGE_CACHE_SCAN_INTERVAL'])
+        app.add_url_rule('/img/tmdb/<int:width>/<image_path>', 'tmdb_image', self.serve)
+        app.add_template_filter(self.url_for_tmdb, 'tmdb_image')
+        app.extensions['image_proxy'] = self
+        if self.metrics is not None:
+            self.metrics.register_gauge('image_cache_bytes', 'Bytes held in the TMDB image cache.',
+                                        lambda: self.cache.total_bytes)
+
+    # --- URL rewriting ---
+
+    def url_for_tmdb(self, url, width=320, external=False):
+        """Rewrites an image.tmdb.org URL to the proxy; any other URL is returned unchanged."""
+        if not url or not self.app.config['IMAGE_PROXY_ENABLED']:
+            return url
+        match = _TMDB_URL.match(url)
+        if not match:
+            return url
+        return url_for('tmdb_image', width=width, image_path=match.group(1), _external=external)
+
+    # --- Serving ---
+
+    def serve(self, width, image_path):
+        match = _IMAGE_PATH.match(image_path)
+        if not match or width not in self.app.config['IMAGE_PROXY_WIDTHS']:
+            abort(404)
+        key = hashlib.sha1(f'{width}/{image_path}'.encode()).hexdigest()
+        name = f'{key}.{match.group(1)}'
+
+        path = self.cache.get(name)
+        if path is not None:
+            self._count('hit')
+        else:
+            self._count('miss')
+            if self._origin_missing.get(name):
+                abort(404)
+            try:
+                path = self._single_flight(name, lambda: self._fetch_and_store(name, width, image_path))
+            except OriginError as e:
+                self.app.logger.warning("TMDB image fetch failed for %s: %s", image_path, e)
+                abort(502)
+            if path is None:
+                abort(404)
+
+        response = send_file(path, mimetype=_MIME_TYPES[match.group(1)], conditional=True,
+                             etag=key, max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    def _count(self, outcome):
+        if self.metrics is None:
+            return
+        if outcome == 'hit':
+            self.metrics.cache_hit('tmdb_image_proxy')
+        else:
+            self.metrics.cache_miss('tmdb_image_proxy')
+
+    def _single_flight(self, key, work):
+        """Runs ``work()`` once per key at a time; concurrent callers wait for and share its result."""
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        if not leader:
+            if not flight.event.wait(self.app.config['IMAGE_PROXY_TIMEOUT'] * 2):
+                raise OriginError('timed out waiting for a concurrent fetch')
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = work()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    def _fetch_and_store(self, name, width, image_path):
+        """Downloads, resizes and caches one image. Returns its path, or None if the origin has no such image."""
+        # Another request may have filled the cache while we waited for the lock.
+        path = self.cache.get(name)
+        if path is not None:
+            return path
+        data = self._fetch(width, image_path)
+        if data is None:
+            self._origin_missing.set(name, True)
+            return None
+        return self.cache.put(name, _resize(data, width))
+
+    def _fetch(self, width, image_path):
+        size = next((f'w{s}' for s in TMDB_SIZES if s >= width), 'original')
+        url = f"{self.app.config['TMDB_IMAGE_ORIGIN'].rstrip('/')}/t/p/{size}/{image_path}"
+        limit = self.app.config['IMAGE_PROXY_MAX_FETCH_BYTES']
+        try:
+            with self._http.get(url, timeout=self.app.config['IMAGE_PROXY_TIMEOUT'], stream=True) as response:
+                if response.status_code == 404:
+                    return None
+                if response.status_code != 200:
+                    raise OriginError(f'{url} returned {response.status_code}')
+                chunks, received = [], 0
+                for chunk in response.iter_content(64 * 1024):
+                    received += len(chunk)
+                    if received > limit:
+                        raise OriginError(f'{url} is larger than {limit} bytes')
+                    chunks.append(chunk)
+                return b''.join(chunks)
+        except requests.RequestException as e:
+            raise OriginError(str(e)) from e
+
+
+def _resize(data, width):
+    """Downscales encoded image bytes to ``width`` (keeping the format); returns the input when that isn't possible."""
+    if Image is None:
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if img.width <= width:
+                return data
+            fmt = img.format
+            height = max(1, round(img.height * width / img.width))
+            resized = img.resize((width, height), Image.LANCZOS)
+            if fmt == 'JPEG' and resized.mode not in ('RGB', 'L'):
+                resized = resized.convert('RGB')
+            out = io.BytesIO()
+            resized.save(out, format=fmt, quality=85)
+            return out.getvalue()
+    except (OSError, ValueError):
+        return data
@@ -0,0 +1,66 @@
+"""
+JSON provider for the FlixHD Flask app.
+
+``FastJSONProvider`` plugs into ``app.json`` (so ``jsonify``, ``request.get_json``
+and ``app.json.dumps`` all use it) and encodes with orjson when it is
+installed, falling back to Flask's stdlib-based provider otherwise and for
+anything orjson cannot represent (integers beyond 64 bits, custom ``cls``
+arguments, indents other than 2).
+
+Output stays compatible with the default provider: datetimes, dates, UUIDs,
+dataclasses and ``__html__`` objects are still converted by Flask's
+``default`` hook, so API payloads don't change shape. The one visible
+difference is that orjson emits non-ASCII text as UTF-8 instead of ``\\u``
+escapes, which JSON parsers treat identically.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# Options the orjson path can honour; anything else goes to the stdlib.
+_ORJSON_KWARGS = {'indent', 'sort_keys', 'default'}
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    @property
+    def backend(self):
+        return 'orjson' if orjson is not None else 'json'
+
+    def _orjson_options(self, kwargs):
+        if orjson is None or not set(kwargs) <= _ORJSON_KWARGS or kwargs.get('indent') not in (None, 2):
+            return None
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if kwargs.get('indent') == 2:
+            option |= orjson.OPT_INDENT_2
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps_bytes(self, obj, **kwargs):
+        """Like ``dumps`` but returns UTF-8 bytes, skipping a decode when orjson is available."""
+        option = self._orjson_options(kwargs)
+        if option is not None:
+            try:
+                return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option)
+            except TypeError:
+                pass  # e.g. a >64-bit int; let the stdlib produce the result (or the real error)
+        return super().dumps(obj, **kwargs).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, **kwargs).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers see the usual error.
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        dump_args = {}
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            dump_args['indent'] = 2
+        return self._app.response_class(self.dumps_bytes(obj, **dump_args), mimetype=self.mimetype)
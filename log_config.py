@@ -0,0 +1,146 @@
+"""
+Logging setup for the FlixHD Flask app.
+
+Request threads only put records on an in-memory queue; a background
+``QueueListener`` thread formats them as JSON and writes them to stdout. This
+keeps synchronous, unbuffered stdout writes (which gunicorn workers would
+otherwise block on) off the request path. DEBUG/INFO records can be sampled,
+and a full queue drops records instead of blocking the caller.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+# Attributes present on every LogRecord; anything else came in through ``extra=``.
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'sample_rate'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line, including ``extra`` fields."""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exc'] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps every WARNING and above; DEBUG/INFO records are kept with probability
+    ``record.sample_rate`` (set via ``extra=``) or the filter's default rate.
+    """
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = getattr(record, 'sample_rate', self.rate)
+        return rate >= 1.0 or random.random() < rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that drops records when the queue is full and restarts its
+    listener after a fork (e.g. gunicorn ``--preload``), where the parent's
+    listener thread does not survive.
+    """
+
+    def __init__(self, log_queue, listener_factory):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._listener_factory = listener_factory
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._listener = self._listener_factory()
+                self._listener.start()
+                self._pid = os.getpid()
+
+    def stop(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._pid = None
+
+    def prepare(self, record):
+        # Resolve the message and traceback in the caller's thread so the record
+        # is safe to hand over, but leave JSON encoding to the listener thread.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self.ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(app):
+    """
+    Routes ``app.logger`` through a queue-backed JSON handler.
+
+    Configuration keys (all overridable through environment variables):
+        LOG_LEVEL        -- minimum level (default INFO)
+        LOG_FORMAT       -- 'json' or 'text' (default json)
+        LOG_SAMPLE_RATE  -- fraction of DEBUG/INFO records kept (default 1.0)
+        LOG_QUEUE_SIZE   -- records buffered before new ones are dropped (default 10000)
+    """
+    app.config.setdefault('LOG_LEVEL', os.getenv('LOG_LEVEL', 'INFO').upper())
+    app.config.setdefault('LOG_FORMAT', os.getenv('LOG_FORMAT', 'json'))
+    app.config.setdefault('LOG_SAMPLE_RATE', float(os.getenv('LOG_SAMPLE_RATE', 1.0)))
+    app.config.setdefault('LOG_QUEUE_SIZE', int(os.getenv('LOG_QUEUE_SIZE', 10000)))
+
+    if app.config['LOG_FORMAT'] == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    log_queue = queue.Queue(maxsize=app.config['LOG_QUEUE_SIZE'])
+
+    def make_listener():
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(formatter)
+        return logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=False)
+
+    handler = NonBlockingQueueHandler(log_queue, make_listener)
+    handler.addFilter(SamplingFilter(app.config['LOG_SAMPLE_RATE']))
+    handler.ensure_listener()
+    atexit.register(handler.stop)
+
+    app.logger.handlers.clear()
+    app.logger.addHandler(handler)
+    app.logger.setLevel(app.config['LOG_LEVEL'])
+    app.logger.propagate = False
+    return handler
@@ -0,0 +1,292 @@
+"""
+Set-based maintenance commands for the FlixHD database.
+
+A command describes one UPDATE: the table, a WHERE clause and the new column
+values as SQL expressions. The runner applies it on the server, in
+primary-key ranges of ``--batch-size`` rows with a commit after each, so no
+statement holds row locks over the whole table and an interrupted run can
+simply be started again. Rows already fixed no longer match the WHERE
+clause, so re-runs are no-ops.
+
+Fixes that SQL cannot express (parsing HTML, say) subclass
+RowMaintenanceCommand instead: each range's rows are read, transformed in
+Python and written back with one executemany UPDATE keyed on the primary key.
+
+``--dry-run`` only counts the matching rows and prints a few of them with
+their old and new values.
+
+Usage:
+    python maintenance.py --list
+    python maintenance.py fix-imdb-embeds --dry-run
+    python maintenance.py fix-imdb-embeds --batch-size 500 --pause 0.1
+    python maintenance.py convert-movie-embeds
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import DateTime, bindparam, func, literal, null, select
+
+from app import (app, db, ContactMessage, Episode, Movie, MovieRequest, PendingUser, embed_provider_id, ensure_default_embed_provider,
+                 get_or_create_embed_provider, match_embed)
+
+COMMANDS = {}
+
+
+def register(command_class):
+    COMMANDS[command_class.name] = command_class
+    return command_class
+
+
+class MaintenanceCommand:
+    name = None
+    help = ''
+    table = None
+
+    @property
+    def primary_key(self):
+        return self.table.primary_key.columns.values()[0]
+
+    def criteria(self):
+        """SQL expression selecting the rows to fix."""
+        raise NotImplementedError
+
+    def values(self):
+        """{column name: SQL expression} for the new values."""
+        raise NotImplementedError
+
+    def prepare(self, dry_run):
+        """Runs once before the rows are counted, e.g. to create rows the new values point at."""
+
+    def apply(self, low, high):
+        """Fixes the matching rows with ``low < pk <= high``. Returns the number of rows updated."""
+        statement = self.table.update() \
+            .where(self.criteria(), *_range_filter(self.primary_key, low, high)) \
+            .values(self.values())
+        return db.session.execute(statement).rowcount
+
+    def preview(self, limit=5):
+        values = self.values()
+        columns = [self.table.c[name] for name in values]
+        query = select(self.primary_key, *columns, *[expr.label(f'new_{name}') for name, expr in values.items()]) \
+            .where(self.criteria()).order_by(self.primary_key).limit(limit)
+        for row in db.session.execute(query):
+            _print_change(row[0], values, row[1:1 + len(values)], row[1 + len(values):])
+
+
+class RowMaintenanceCommand(MaintenanceCommand):
+    """A command whose new values are computed in Python from ``columns`` of each row."""
+    columns = ()
+
+    def transform(self, row):
+        """{column name: new value} for ``row``, or None to leave it unchanged."""
+        raise NotImplementedError
+
+    def _changes(self, low=None, high=None, limit=None):
+        pk = self.primary_key
+        query = select(pk, *[self.table.c[name] for name in self.columns]) \
+            .where(self.criteria(), *_range_filter(pk, low, high)).order_by(pk).limit(limit)
+        for row in db.session.execute(query):
+            new_values = self.transform(row)
+            if new_values is not None:
+                yield row, new_values
+
+    def apply(self, low, high):
+        changes = [{'_pk': row[0], **new_values} for row, new_values in self._changes(low, high)]
+        if not changes:
+            return 0
+        names = [name for name in changes[0] if name != '_pk']
+        statement = self.table.update().where(self.primary_key == bindparam('_pk')) \
+            .values({name: bindparam(name) for name in names})
+        db.session.execute(statement, changes)
+        return len(changes)
+
+    def preview(self, limit=5):
+        for row, new_values in self._changes(limit=limit):
+            _print_change(row[0], new_values, [getattr(row, name, None) for name in new_values], new_values.values())
+
+
+def _print_change(pk, names, old_values, new_values):
+    print(f"  {pk}:")
+    for name, old, new in zip(names, old_values, new_values):
+        print(f"    - {name}: {old}")
+        print(f"    + {name}: {new}")
+
+def _range_filter(pk, low, high):
+    clauses = []
+    if low is not None:
+        clauses.append(pk > low)
+    if high is not None:
+        clauses.append(pk <= high)
+    return clauses
+
+def _next_boundary(pk, low, batch_size):
+    """The primary key ``batch_size`` rows past ``low`` (an index-only seek), or None near the end."""
+    query = select(pk).where(*_range_filter(pk, low, None)).order_by(pk).offset(batch_size - 1).limit(1)
+    return db.session.execute(query).scalar()
+
+def run(command, dry_run=False, batch_size=1000, pause=0.0):
+    """Applies ``command`` range by range, reporting progress. Returns the number of rows updated."""
+    pk = command.primary_key
+    command.prepare(dry_run)
+    total = db.session.execute(select(func.count()).select_from(command.table).where(command.criteria())).scalar()
+    print(f"{command.name}: {total} rows match.")
+    if dry_run or not total:
+        if total:
+            command.preview()
+        db.session.rollback()
+        return 0
+
+    updated = 0
+    low = None
+    start = time.perf_counter()
+    while True:
+        high = _next_boundary(pk, low, batch_size)
+        updated += command.apply(low, high)
+        db.session.commit()
+        elapsed = time.perf_counter() - start
+        print(f"  - through {high if high is not None else 'end'}: {updated}/{total} rows "
+              f"({updated / total:.0%}, {updated / elapsed if elapsed else 0:,.0f} rows/s)")
+        if high is None:
+            break
+        low = high
+        if pause:
+            time.sleep(pause)
+    print(f"{command.name}: updated {updated} rows in {time.perf_counter() - start:.2f}s.")
+    return updated
+
+
+# --- Commands ---
+
+@register
+class FixImdbEmbeds(MaintenanceCommand):
+    """
+    Repoints movie embed codes that still use an IMDb id (tt1234567) at the
+    player for the movie's numeric TMDB id: the row gets the provider and the
+    TMDB id, and its stored iframe HTML is dropped. Rows without a numeric
+    tmdb_id are left alone.
+    """
+    name = 'fix-imdb-embeds'
+    help = 'Point IMDb-id embed codes at the TMDB player URL.'
+    table = Movie.__table__
+    # This is the correct base URL for your iframe provider.
+    iframe_base_url = "https://player.videasy.net/movie/"
+    provider_name = 'videasy'
+    provider_id = None
+
+    def criteria(self):
+        c = self.table.c
+        # Matches an IMDb id, not any "tt" (which every "https" URL contains).
+        return c.tmdb_id.regexp_match('^[0-9]+$') & c.embed_code.regexp_match('tt[0-9]{7,}')
+
+    def prepare(self, dry_run):
+        # An existing provider keeps whatever templates it has been given since.
+        if dry_run:
+            self.provider_id = embed_provider_id(self.provider_name)
+        else:
+            self.provider_id = get_or_create_embed_provider(self.provider_name, self.iframe_base_url + '{id}')
+
+    def values(self):
+        return {
+            'embed_provider_id': literal(self.provider_id),
+            'embed_external_id': self.table.c.tmdb_id,
+            'embed_code': null(),
+        }
+
+
+class ConvertEmbeds(RowMaintenanceCommand):
+    """
+    Replaces stored iframe HTML that matches an embed provider's URL template
+    with a reference to the provider plus the id from the URL, so the row
+    follows later changes to the template. Custom embeds are left alone.
+    """
+    kind = None
+    columns = ('embed_code',)
+
+    def prepare(self, dry_run):
+        if not dry_run:
+            ensure_default_embed_provider()
+
+    def criteria(self):
+        c = self.table.c
+        return c.embed_provider_id.is_(None) & c.embed_code.isnot(None)
+
+    def transform(self, row):
+        matched = match_embed(row.embed_code, self.kind)
+        if matched is None:
+            return None
+        provider_id, external_id = matched
+        return {'embed_provider_id': provider_id, 'embed_external_id': external_id, 'embed_code': None}
+
+@register
+class ConvertMovieEmbeds(ConvertEmbeds):
+    name = 'convert-movie-embeds'
+    help = 'Store matching movie iframes as provider + external id.'
+    table = Movie.__table__
+    kind = 'movie'
+
+@register
+class ConvertEpisodeEmbeds(ConvertEmbeds):
+    name = 'convert-episode-embeds'
+    help = 'Store matching episode iframes as provider + external id.'
+    table = Episode.__table__
+    kind = 'episode'
+
+
+class FillListDates(MaintenanceCommand):
+    """
+    Sets missing timestamps on the rows the admin lists page by (date, id), so
+    the column can be made NOT NULL. The real time is unknown; the rows get the
+    time of the run, which puts them at the top of their list.
+    """
+    column = None
+
+    def criteria(self):
+        return self.table.c[self.column].is_(None)
+
+    def values(self):
+        return {self.column: literal(datetime.utcnow(), DateTime)}
+
+@register
+class FillRequestDates(FillListDates):
+    name = 'fill-request-dates'
+    help = 'Set missing movie request dates (needed before they become NOT NULL).'
+    table = MovieRequest.__table__
+    column = 'date'
+
+@register
+class FillMessageDates(FillListDates):
+    name = 'fill-message-dates'
+    help = 'Set missing contact message dates (needed before they become NOT NULL).'
+    table = ContactMessage.__table__
+    column = 'date'
+
+@register
+class FillPendingUserDates(FillListDates):
+    name = 'fill-pending-user-dates'
+    help = 'Set missing pending user created_at (needed before it becomes NOT NULL).'
+    table = PendingUser.__table__
+    column = 'created_at'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', nargs='?', choices=sorted(COMMANDS))
+    parser.add_argument('--list', action='store_true', help='list the available commands')
+    parser.add_argument('--dry-run', action='store_true', help='count and preview matching rows without changing them')
+    parser.add_argument('--batch-size', type=int, default=1000, help='primary-key range per UPDATE and commit')
+    parser.add_argument('--pause', type=float, default=0.0, help='seconds to sleep between batches')
+    args = parser.parse_args(argv)
+
+    if args.list or not args.command:
+        for name, command_class in sorted(COMMANDS.items()):
+            print(f"{name:24} {command_class.help}")
+        return 0
+    with app.app_context():
+        run(COMMANDS[args.command](), dry_run=args.dry_run, batch_size=max(1, args.batch_size), pause=args.pause)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
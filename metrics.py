@@ -0,0 +1,197 @@
+"""
+In-process metrics for the FlixHD Flask app, rendered in Prometheus text format.
+
+Recording is deliberately cheap: each request does one ``perf_counter()`` pair,
+one dict lookup and a ``bisect`` into a fixed bucket list under a lock, which
+keeps the overhead in the low microseconds. Values live per worker process,
+so under gunicorn each worker reports its own series.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import before_render_template, g, request, template_rendered
+
+# Latency buckets in seconds, roughly log-spaced from 5ms to 10s.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (+Inf last), running sum, count.
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = [(labels, list(s[0]), s[1], s[2]) for labels, s in self._series.items()]
+        for labels, counts, total, count in sorted(snapshot):
+            label_str = _format_labels(self.label_names, labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{_format_labels(self.label_names + ("le",), labels + (le,))} {cumulative}')
+            lines.append(f'{self.name}_sum{label_str} {total}')
+            lines.append(f'{self.name}_count{label_str} {count}')
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for labels, value in snapshot:
+            lines.append(f'{self.name}{_format_labels(self.label_names, labels)} {value}')
+        return lines
+
+
+class Metrics:
+    """
+    Flask extension collecting request latency, error counts, template render
+    time, cache hit/miss counts and arbitrary callback gauges (DB pool, queue
+    depth, ...). ``render()`` returns the Prometheus exposition text.
+    """
+
+    def __init__(self, app=None, prefix='flixhd'):
+        self.prefix = prefix
+        self.request_latency = Histogram(f'{prefix}_request_duration_seconds', 'Request latency by endpoint.', ('endpoint', 'method'))
+        self.requests_total = Counter(f'{prefix}_requests_total', 'Requests by endpoint and status.', ('endpoint', 'method', 'status'))
+        self.errors_total = Counter(f'{prefix}_request_errors_total', 'Responses with a 5xx status by endpoint.', ('endpoint',))
+        self.template_render = Histogram(f'{prefix}_template_render_seconds', 'Template render time.', ('template',))
+        self.cache_requests = Counter(f'{prefix}_cache_requests_total', 'Cache lookups by cache name and result.', ('cache', 'result'))
+        self._gauges = []
+        self._cache_names = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        before_render_template.connect(self._before_render, app, weak=False)
+        template_rendered.connect(self._after_render, app, weak=False)
+        app.extensions['metrics'] = self
+
+    # --- Recording API ---
+
+    def register_gauge(self, name, help_text, callback, label_name=None):
+        """
+        Registers a gauge whose value is read at scrape time. ``callback`` returns a
+        number, or a {label_value: number} dict when ``label_name`` is given.
+        """
+        self._gauges.append((f'{self.prefix}_{name}', help_text, callback, label_name))
+
+    def cache_hit(self, cache_name):
+        self._cache_names.add(cache_name)
+        self.cache_requests.inc((cache_name, 'hit'))
+
+    def cache_miss(self, cache_name):
+        self._cache_names.add(cache_name)
+        self.cache_requests.inc((cache_name, 'miss'))
+
+    # --- Flask hooks ---
+
+    def _start_request(self):
+        g._metrics_start = time.perf_counter()
+
+    def _finish_request(self, response):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        method = request.method
+        if hasattr(response, 'stream_error'):
+            # Streamed pages and lists (streaming.streamed_response) still have their body,
+            # and possibly their queries, ahead of them: record once it has been sent.
+            response.call_on_close(lambda: self._record(
+                endpoint, method, start, 500 if response.stream_error else response.status_code))
+        else:
+            self._record(endpoint, method, start, response.status_code)
+        return response
+
+    def _record(self, endpoint, method, start, status_code):
+        self.request_latency.observe((endpoint, method), time.perf_counter() - start)
+        self.requests_total.inc((endpoint, method, str(status_code)))
+        if status_code >= 500:
+            self.errors_total.inc((endpoint,))
+
+    def _before_render(self, sender, template, context, **extra):
+        g.setdefault('_metrics_render_start', []).append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        starts = g.get('_metrics_render_start')
+        if starts:
+            self.template_render.observe((template.name or 'string',), time.perf_counter() - starts.pop())
+
+    # --- Exposition ---
+
+    def render(self):
+        lines = []
+        for metric in (self.request_latency, self.requests_total, self.errors_total, self.template_render, self.cache_requests):
+            lines.extend(metric.render())
+
+        ratio_name = f'{self.prefix}_cache_hit_ratio'
+        lines.extend([f'# HELP {ratio_name} Cache hit ratio since process start.', f'# TYPE {ratio_name} gauge'])
+        for cache_name in sorted(self._cache_names):
+            hits = self.cache_requests.get((cache_name, 'hit'))
+            misses = self.cache_requests.get((cache_name, 'miss'))
+            total = hits + misses
+            lines.append(f'{ratio_name}{_format_labels(("cache",), (cache_name,))} {hits / total if total else 0.0}')
+
+        for name, help_text, callback, label_name in self._gauges:
+            lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} gauge'])
+            try:
+                value = callback()
+            except Exception:
+                continue
+            if label_name is None:
+                lines.append(f'{name} {value}')
+            else:
+                for label_value, v in sorted(value.items()):
+                    lines.append(f'{name}{_format_labels((label_name,), (label_value,))} {v}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -1,113 +1,304 @@
 # migrate_json_to_db.py
+"""
+Loads the old project's JSON exports (movies.json, users.json, requests.json)
+into the database. Safe to re-run: rows that already exist are skipped or
+refreshed instead of duplicated.
+
+Each file is parsed incrementally (ijson when installed, otherwise
+``json.JSONDecoder.raw_decode`` over a sliding buffer), so memory stays flat
+however large the export is. Rows are handled in batches: one query per batch
+loads the keys that already exist, and the new rows go in with a single
+multi-row INSERT that uses the dialect's native upsert (``ON DUPLICATE KEY
+UPDATE`` on MySQL, ``ON CONFLICT`` on PostgreSQL and SQLite).
+
+Usage:
+    python migrate_data.py
+    python migrate_data.py --batch-size 2000
+"""
+import argparse
 import json
 import os
-from app import app, db, Movie, User, MovieRequest # Import your app and models
-from werkzeug.security import generate_password_hash
+import time
 import uuid
 
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from app import app, db, Movie, User, MovieRequest, ensure_default_embed_provider, log_changes, match_embed, user_lookup_columns, user_search # Import your app and models
+
+try:
+    import ijson
+except ImportError:  # optional; the raw_decode reader below is the fallback
+    ijson = None
+
 # File paths from your old project
 MOVIES_FILE = 'movies.json'
 USERS_FILE = 'users.json'
 REQUESTS_FILE = 'requests.json'
 PENDING_USERS_FILE = 'pending_users.json' # Note: Pending users are not migrated as they are temporary.
 
-def migrate():
+DEFAULT_BATCH_SIZE = 500
+READ_CHUNK = 64 * 1024
+NUMBER_CHARS = frozenset('0123456789+-.eE')
+
+
+# --- Incremental JSON Reading ---
+def _raw_decode_items(f):
+    """Yields the elements of a top-level JSON array, decoding one element at a time."""
+    decoder = json.JSONDecoder()
+    buffer = f.read(READ_CHUNK)
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = f.read(READ_CHUNK)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    skip(' \t\r\n')
+    if buffer[pos:pos + 1] != '[':
+        raise json.JSONDecodeError('Expected a top-level JSON array', buffer, pos)
+    pos += 1
+    while True:
+        skip(' \t\r\n,')
+        if pos >= len(buffer):
+            raise json.JSONDecodeError('Unterminated JSON array', buffer, pos)
+        if buffer[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        if not eof and (end == len(buffer) or buffer[end] in NUMBER_CHARS):
+            # A number cut off by the chunk boundary ("-12." of "-12.5e3") decodes as a
+            # shorter one; read on until something other than a number character follows.
+            fill()
+            continue
+        pos = end
+        yield item
+
+def iter_json_array(path):
+    with open(path, 'rb' if ijson is not None else 'r') as f:
+        if ijson is not None:
+            yield from ijson.items(f, 'item', use_float=True)
+        else:
+            yield from _raw_decode_items(f)
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- Dialect-Native Upserts ---
+def upsert(table, rows, key_columns, update_columns=()):
     """
-    Reads data from JSON files and populates the SQLAlchemy database.
-    This should only be run ONCE.
+    Inserts ``rows`` in one statement. Rows whose key already exists have
+    ``update_columns`` refreshed from the new values, or are left alone when
+    there are none.
     """
-    with app.app_context():
-        print("Starting migration...")
-
-        # --- Migrate Users ---
-        if os.path.exists(USERS_FILE):
-            print(f"Migrating users from {USERS_FILE}...")
-            with open(USERS_FILE, 'r') as f:
-                try:
-                    users_data = json.load(f)
-                    for user_dict in users_data:
-                        # Check if user already exists
-                        if User.query.filter_by(email=user_dict['email']).first():
-                            print(f"  - Skipping user {user_dict['email']} (already exists).")
-                            continue
-                        
-                        new_user = User(
-                            username=user_dict['username'],
-                            email=user_dict['email'],
-                            password=user_dict['password'], # Assumes password is a HASH already
-                            security_question=user_dict.get('security_question', 'Legacy User - Question not set'),
-                            security_answer=user_dict.get('security_answer', 'Legacy User - Answer not set')
-                        )
-                        db.session.add(new_user)
-                        print(f"  - Adding user: {new_user.username}")
-                except json.JSONDecodeError:
-                    print(f"Could not parse {USERS_FILE}. Skipping.")
-            db.session.commit()
-            print("Users migration complete.")
-
-        # --- Migrate Movies ---
-        if os.path.exists(MOVIES_FILE):
-            print(f"Migrating movies from {MOVIES_FILE}...")
-            with open(MOVIES_FILE, 'r') as f:
-                try:
-                    movies_data = json.load(f)
-                    for movie_dict in movies_data:
-                        # Check if movie already exists by ID or title
-                        if Movie.query.get(movie_dict['id']) or Movie.query.filter_by(title=movie_dict['title']).first():
-                            print(f"  - Skipping movie '{movie_dict['title']}' (already exists).")
-                            continue
-
-                        # Convert genre list to comma-separated string
-                        genre_str = ', '.join(movie_dict.get('genre', [])) if isinstance(movie_dict.get('genre'), list) else movie_dict.get('genre', '')
-                        cast_str = ', '.join(movie_dict.get('cast', [])) if isinstance(movie_dict.get('cast'), list) else movie_dict.get('cast', '')
-
-                        new_movie = Movie(
-                            id=movie_dict.get('id', str(uuid.uuid4())),
-                            title=movie_dict['title'],
-                            description=movie_dict.get('description'),
-                            embed_code=movie_dict['embed_code'],
-                            poster_url=movie_dict.get('poster_url'),
-                            thumbnail=movie_dict.get('thumbnail'),
-                            release_date=movie_dict.get('release_date'),
-                            director=movie_dict.get('director'),
-                            genre=genre_str,
-                            cast=cast_str,
-                            tmdb_id=movie_dict.get('tmdb_id')
-                        )
-                        db.session.add(new_movie)
-                        print(f"  - Adding movie: {new_movie.title}")
-                except json.JSONDecodeError:
-                    print(f"Could not parse {MOVIES_FILE}. Skipping.")
-            db.session.commit()
-            print("Movies migration complete.")
-        
-        # --- Migrate Requests ---
-        if os.path.exists(REQUESTS_FILE):
-            print(f"Migrating requests from {REQUESTS_FILE}...")
-            with open(REQUESTS_FILE, 'r') as f:
-                try:
-                    requests_data = json.load(f)
-                    for req_dict in requests_data:
-                         # Very basic check to avoid duplicates
-                        if MovieRequest.query.filter_by(title=req_dict['title']).first():
-                            print(f"  - Skipping request '{req_dict['title']}' (already exists).")
-                            continue
-
-                        new_req = MovieRequest(
-                            title=req_dict['title'],
-                            link=req_dict.get('link'),
-                            notes=req_dict.get('notes'),
-                            status=req_dict.get('status', 'Pending')
-                            # Date will be set to now by default
-                        )
-                        db.session.add(new_req)
-                        print(f"  - Adding request: {new_req.title}")
-                except json.JSONDecodeError:
-                    print(f"Could not parse {REQUESTS_FILE}. Skipping.")
+    if not rows:
+        return
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        statement = mysql.insert(table).values(rows)
+        if update_columns:
+            statement = statement.on_duplicate_key_update({c: statement.inserted[c] for c in update_columns})
+        else:
+            # MySQL has no DO NOTHING; assigning a key to itself is the no-op form.
+            statement = statement.on_duplicate_key_update({key_columns[0]: table.c[key_columns[0]]})
+    elif dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = insert(table).values(rows)
+        if update_columns:
+            statement = statement.on_conflict_do_update(
+                index_elements=key_columns, set_={c: statement.excluded[c] for c in update_columns})
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=key_columns)
+    else:
+        statement = table.insert().values(rows)
+    db.session.execute(statement)
+
+
+# --- Per-File Loaders ---
+# Each loader turns one batch of JSON objects into rows, drops the ones that
+# already exist (checked with one query per batch) and writes the rest.
+# Returns (written, skipped).
+def load_users(batch):
+    emails = {u['email'].lower() for u in batch}
+    usernames = {u['username'].lower() for u in batch}
+    username_column, email_column = user_lookup_columns()
+    existing = db.session.execute(
+        select(email_column, username_column).where(
+            email_column.in_(emails) | username_column.in_(usernames))).all()
+    taken_emails = {email for email, _ in existing}
+    taken_usernames = {username for _, username in existing}
+
+    rows = []
+    for user_dict in batch:
+        email, username = user_dict['email'], user_dict['username']
+        if email.lower() in taken_emails or username.lower() in taken_usernames:
+            continue
+        taken_emails.add(email.lower())
+        taken_usernames.add(username.lower())
+        rows.append({
+            'username': username,
+            'email': email,
+            'password': user_dict['password'], # Assumes password is a HASH already
+            'security_question': user_dict.get('security_question', 'Legacy User - Question not set'),
+            'security_answer': user_dict.get('security_answer', 'Legacy User - Answer not set'),
+            'role': 'user',
+            'is_active': True,
+            'login_count': 0,
+            # Written by ORM events for app-created users; a Core insert has to fill them in.
+            'username_lower': username.lower(),
+            'email_lower': email.lower(),
+        })
+    upsert(User.__table__, rows, ['email'])
+
+    # Search postings need the new ids.
+    new_emails = [row['email_lower'] for row in rows]
+    created = db.session.execute(
+        select(User.id, User.username, User.email).where(User.email_lower.in_(new_emails))).all() if rows else []
+    postings = [posting for user in created for posting in user_search.rows_for(user.id, user.username, user.email)]
+    if postings:
+        db.session.execute(user_search.table.insert(), postings)
+    log_changes('users', [user.id for user in created])
+    return len(rows), len(batch) - len(rows)
+
+def _joined(value):
+    """Converts the old list-valued genre/cast fields to comma-separated strings."""
+    return ', '.join(value) if isinstance(value, list) else (value or '')
+
+def load_movies(batch, seen_titles):
+    ids = {m['id'] for m in batch if m.get('id')}
+    titles = {m['title'] for m in batch}
+    existing = db.session.execute(
+        select(Movie.id, Movie.title).where(Movie.id.in_(ids) | Movie.title.in_(titles))).all()
+    title_owner = {title: movie_id for movie_id, title in existing}
+
+    rows = []
+    for movie_dict in batch:
+        movie_id = movie_dict.get('id') or str(uuid.uuid4())
+        title = movie_dict['title']
+        # Same title under another id (in the database or earlier in the file): a duplicate entry.
+        if title_owner.get(title, movie_id) != movie_id or title in seen_titles:
+            continue
+        seen_titles.add(title)
+        # Player iframes are stored as provider + external id when they match a provider's template.
+        matched = match_embed(movie_dict['embed_code'], 'movie')
+        rows.append({
+            'id': movie_id,
+            'title': title,
+            'description': movie_dict.get('description'),
+            'embed_code': None if matched else movie_dict['embed_code'],
+            'embed_provider_id': matched[0] if matched else None,
+            'embed_external_id': matched[1] if matched else None,
+            'poster_url': movie_dict.get('poster_url'),
+            'thumbnail': movie_dict.get('thumbnail'),
+            'release_date': movie_dict.get('release_date'),
+            'director': movie_dict.get('director'),
+            'genre': _joined(movie_dict.get('genre')),
+            'cast': _joined(movie_dict.get('cast')),
+            'tmdb_id': movie_dict.get('tmdb_id'),
+        })
+    # Re-running the migration refreshes movies already imported under the same id.
+    upsert(Movie.__table__, rows, ['id'], update_columns=[c for c in rows[0] if c != 'id'] if rows else ())
+    log_changes('movies', [row['id'] for row in rows])
+    return len(rows), len(batch) - len(rows)
+
+def load_requests(batch, seen_titles):
+    titles = {r['title'] for r in batch}
+    seen_titles.update(db.session.execute(
+        select(MovieRequest.title).where(MovieRequest.title.in_(titles))).scalars())
+
+    rows = []
+    for req_dict in batch:
+        # Very basic check to avoid duplicates
+        if req_dict['title'] in seen_titles:
+            continue
+        seen_titles.add(req_dict['title'])
+        rows.append({
+            'title': req_dict['title'],
+            'link': req_dict.get('link'),
+            'notes': req_dict.get('notes'),
+            'status': req_dict.get('status', 'Pending'),
+            # Date will be set to now by default
+        })
+    if rows:
+        # No natural key to upsert on; the title check above keeps re-runs idempotent.
+        db.session.execute(MovieRequest.__table__.insert(), rows)
+        new_ids = db.session.execute(
+            select(MovieRequest.id).where(MovieRequest.title.in_([row['title'] for row in rows]))).scalars().all()
+        log_changes('requests', new_ids)
+    return len(rows), len(batch) - len(rows)
+
+
+def migrate_file(label, path, load, batch_size):
+    """Streams ``path`` through ``load`` one batch (and one transaction) at a time, reporting throughput."""
+    if not os.path.exists(path):
+        print(f"{path} not found; skipping {label}.")
+        return
+    print(f"Migrating {label} from {path}...")
+    written = skipped = 0
+    start = time.perf_counter()
+    try:
+        for batch in batched(iter_json_array(path), batch_size):
+            batch_written, batch_skipped = load(batch)
             db.session.commit()
-            print("Requests migration complete.")
+            written += batch_written
+            skipped += batch_skipped
+            elapsed = time.perf_counter() - start
+            print(f"  - {written + skipped} read, {written} written, {skipped} skipped "
+                  f"({(written + skipped) / elapsed if elapsed else 0:,.0f} rows/s)")
+    except json.JSONDecodeError as e:
+        db.session.rollback()
+        print(f"Could not parse {path}: {e}. Stopping {label} migration; earlier batches were kept.")
+        return
+    except Exception:
+        db.session.rollback()
+        raise
+    elapsed = time.perf_counter() - start
+    print(f"{label.capitalize()} migration complete: {written} written, {skipped} skipped in {elapsed:.2f}s "
+          f"({(written + skipped) / elapsed if elapsed else 0:,.0f} rows/s).")
 
+def migrate(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Reads data from JSON files and populates the SQLAlchemy database.
+    Idempotent: running it again skips (users, requests) or refreshes (movies) rows it already loaded.
+    """
+    with app.app_context():
+        print(f"Starting migration (JSON reader: {'ijson' if ijson is not None else 'raw_decode'}, "
+              f"batch size {batch_size}, dialect {db.engine.dialect.name})...")
+        migrate_file('users', USERS_FILE, load_users, batch_size)
+        ensure_default_embed_provider()
+        movie_titles = set()
+        migrate_file('movies', MOVIES_FILE, lambda batch: load_movies(batch, movie_titles), batch_size)
+        request_titles = set()
+        migrate_file('requests', REQUESTS_FILE, lambda batch: load_requests(batch, request_titles), batch_size)
         print("\nMigration finished successfully!")
 
 if __name__ == '__main__':
-    migrate()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='rows per INSERT and per transaction')
+    migrate(parser.parse_args().batch_size)
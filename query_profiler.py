@@ -0,0 +1,143 @@
+"""
+Per-request SQL profiling for the FlixHD Flask app.
+
+Hooks SQLAlchemy's ``before_cursor_execute`` / ``after_cursor_execute`` events
+and keeps a small tally on ``flask.g`` for the current request: number of
+queries, total time spent in the database and how often each statement was
+repeated. At the end of the request the totals are written to a
+``Server-Timing`` header and a single structured log line, and a warning is
+logged when one statement repeats often enough to look like an N+1 pattern.
+For streamed responses the header only covers queries run before the body
+started; the log line and N+1 check wait until the body has finished.
+"""
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RequestQueryStats:
+    """Query tally for a single request."""
+
+    __slots__ = ('count', 'total_time', 'statements')
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.statements = Counter()
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.total_time += elapsed
+        self.statements[statement] += 1
+
+    def duplicates(self):
+        """Returns {statement: times_run} for statements that ran more than once."""
+        return {stmt: n for stmt, n in self.statements.items() if n > 1}
+
+
+class QueryProfiler:
+    """
+    Flask extension that records query count and DB time per request.
+
+    Configuration keys:
+        QUERY_PROFILER_ENABLED      -- turn the hooks on/off (default True)
+        QUERY_N_PLUS_ONE_THRESHOLD  -- repeats of one statement that trigger
+                                       the N+1 warning (default 5)
+        QUERY_LOG_SAMPLE_RATE       -- fraction of request_queries log lines
+                                       kept (default 1.0)
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('QUERY_PROFILER_ENABLED', True)
+        app.config.setdefault('QUERY_N_PLUS_ONE_THRESHOLD', 5)
+        app.config.setdefault('QUERY_LOG_SAMPLE_RATE', 1.0)
+        self.app = app
+        if not app.config['QUERY_PROFILER_ENABLED']:
+            return
+
+        # Listening on the Engine class covers engines created lazily by Flask-SQLAlchemy.
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    @staticmethod
+    def current_stats():
+        """Returns the RequestQueryStats for the active request, or None outside a request."""
+        if not has_request_context():
+            return None
+        return g.get('_query_stats')
+
+    def _start_request(self):
+        g._query_stats = RequestQueryStats()
+
+    def _finish_request(self, response):
+        if response.is_streamed:
+            # Queries keep running while a streamed body renders (see streaming.py),
+            # so leave the stats in g for them and report once the body is done.
+            stats = g.get('_query_stats')
+            if stats is None:
+                return response
+            response.headers.add('Server-Timing', f'db;dur={stats.total_time * 1000:.2f};desc="{stats.count} queries before streaming"')
+            details = (request.endpoint, request.method, request.path, response.status_code)
+            response.call_on_close(lambda: self._report(stats, *details))
+            return response
+
+        stats = g.pop('_query_stats', None)
+        if stats is None:
+            return response
+        response.headers.add('Server-Timing', f'db;dur={stats.total_time * 1000:.2f};desc="{stats.count} queries"')
+        self._report(stats, request.endpoint, request.method, request.path, response.status_code)
+        return response
+
+    def _report(self, stats, endpoint, method, path, status):
+        db_ms = stats.total_time * 1000
+        duplicates = stats.duplicates()
+        self.app.logger.info(
+            'request_queries',
+            extra={
+                'event': 'request_queries',
+                'endpoint': endpoint,
+                'method': method,
+                'path': path,
+                'status': status,
+                'query_count': stats.count,
+                'db_time_ms': round(db_ms, 2),
+                'duplicate_statements': sum(n - 1 for n in duplicates.values()),
+                'sample_rate': self.app.config['QUERY_LOG_SAMPLE_RATE'],
+            },
+        )
+
+        threshold = self.app.config['QUERY_N_PLUS_ONE_THRESHOLD']
+        for statement, times in duplicates.items():
+            if times >= threshold:
+                self.app.logger.warning(
+                    'Possible N+1 query on %s: statement ran %d times: %s',
+                    endpoint, times, ' '.join(statement.split())[:300],
+                    extra={'event': 'n_plus_one', 'endpoint': endpoint, 'times': times},
+                )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and '_query_stats' in g:
+        conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context():
+        return
+    stats = g.get('_query_stats')
+    starts = conn.info.get('_query_start')
+    if stats is None or not starts:
+        return
+    stats.record(statement, time.perf_counter() - starts.pop())
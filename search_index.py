@@ -0,0 +1,123 @@
+"""
+N-gram index for substring search.
+
+``LIKE '%term%'`` cannot use a B-tree index, so on a large table every admin
+search is a full scan. An ``NgramIndex`` keeps a side table of
+(gram, owner_id) postings: one row for every distinct substring of
+``min_n`` to ``max_n`` characters of the owner's lower-cased text.
+
+A term of ``min_n`` to ``max_n`` characters is itself a gram, so its postings
+are the owners containing it. A longer term is looked up by the rarest of its
+``max_n``-character grams. Either way the search joins the owners to one
+gram's postings and walks them in owner_id order down that gram's slice of
+the primary key, so a page of ``LIMIT n`` reads about n postings when matches
+are common and at most the gram's postings when they are rare; nothing falls
+back to scanning the owners' table. The caller still applies the real
+``LIKE``, which drops the owners a long term's gram (or a hash collision)
+admits without matching.
+
+Grams are stored as 31-bit CRC32 hashes rather than strings. That keeps the
+table compact and sidesteps collations (MySQL's case- and accent-insensitive
+defaults would make distinct grams collide on the primary key); a rare hash
+collision only adds a candidate that the ``LIKE`` drops.
+"""
+import zlib
+
+from sqlalchemy import Column, Integer, Table, bindparam, delete, func, literal, select, union_all
+
+
+def ngrams(*texts, min_n=3, max_n=5):
+    """Distinct substrings of ``min_n`` to ``max_n`` characters of the lower-cased texts."""
+    grams = set()
+    for text in texts:
+        text = (text or '').lower()
+        for n in range(min_n, max_n + 1):
+            grams.update(text[i:i + n] for i in range(len(text) - n + 1))
+    return grams
+
+
+def gram_key(gram):
+    return zlib.crc32(gram.encode('utf-8')) & 0x7FFFFFFF
+
+
+class NgramIndex:
+    def __init__(self, metadata, name, min_n=3, max_n=5, probe_postings=256, max_grams=8):
+        self.min_n = min_n
+        self.max_n = max_n
+        self.probe_postings = probe_postings
+        self.max_grams = max_grams
+        self.table = Table(
+            name, metadata,
+            Column('gram', Integer, primary_key=True, autoincrement=False),
+            Column('owner_id', Integer, primary_key=True, autoincrement=False, index=True),
+        )
+        # Reused by every search, so building one costs little next to running it.
+        self._postings = self.table.alias('postings')
+        self._probes = {}
+
+    def rows_for(self, owner_id, *texts):
+        """Posting rows for one owner, for bulk inserts."""
+        keys = {gram_key(g) for g in ngrams(*texts, min_n=self.min_n, max_n=self.max_n)}
+        return [{'gram': key, 'owner_id': owner_id} for key in keys]
+
+    def replace(self, connection, owner_id, *texts):
+        """Rewrites ``owner_id``'s postings on ``connection`` (usable inside an ORM flush)."""
+        self.remove(connection, owner_id)
+        rows = self.rows_for(owner_id, *texts)
+        if rows:
+            connection.execute(self.table.insert(), rows)
+
+    def remove(self, connection, *owner_ids):
+        connection.execute(delete(self.table).where(self.table.c.owner_id.in_(owner_ids)))
+
+    def search_key(self, connection, term):
+        """
+        The gram key whose postings the search for ``term`` walks, or None when
+        the term is too short to index.
+
+        A term of at most ``max_n`` characters is its own key. For a longer one
+        the postings of its ``max_n``-grams (at most ``max_grams`` of them) are
+        counted up to ``probe_postings`` each in one UNION ALL, and the rarest
+        wins; ties go to the gram nearest the start of the term.
+        """
+        term = term.lower()
+        if len(term) < self.min_n:
+            return None
+        if len(term) <= self.max_n:
+            return gram_key(term)
+        keys = list(dict.fromkeys(gram_key(term[i:i + self.max_n]) for i in range(len(term) - self.max_n + 1)))
+        if len(keys) > self.max_grams:
+            # Evenly spaced grams, so the probe still sees the whole term.
+            step = len(keys) / self.max_grams
+            keys = [keys[int(i * step)] for i in range(self.max_grams)]
+        if len(keys) == 1:
+            return keys[0]
+        counts = self._posting_counts(connection, keys)
+        return min(keys, key=counts.__getitem__)
+
+    def join(self, query, owner_column, key):
+        """
+        Joins ``query`` (a Select or ORM Query) to the postings of ``key``.
+        Returns the query and the postings' owner_id column: order and page by
+        it so the database walks the postings in index order and stops at the
+        LIMIT.
+        """
+        postings = self._postings
+        query = query.join(postings, postings.c.owner_id == owner_column).filter(postings.c.gram == key)
+        return query, postings.c.owner_id
+
+    def _posting_counts(self, connection, keys):
+        statement = self._probes.get(len(keys))
+        if statement is None:
+            t = self.table
+            branches = []
+            for position in range(len(keys)):
+                limited = select(t.c.owner_id).where(t.c.gram == bindparam(f'gram_{position}')) \
+                    .limit(self.probe_postings).subquery()
+                branches.append(select(literal(position), func.count()).select_from(limited))
+            statement = self._probes[len(keys)] = union_all(*branches)
+        counts = dict.fromkeys(keys, 0)
+        params = {f'gram_{position}': key for position, key in enumerate(keys)}
+        for position, count in connection.execute(statement, params):
+            counts[keys[position]] = count
+        return counts
@@ -0,0 +1,487 @@
+"""
+Server-side sessions for the FlixHD Flask app.
+
+The session cookie carries only a signed, random session id; the session data
+lives in a backend chosen with SESSION_BACKEND:
+
+    database -- the ``server_session`` table (default; shared by all workers)
+    redis    -- a Redis-compatible server at SESSION_REDIS_URL (needs ``redis``)
+    memory   -- a dict in this process; for local development and tests only
+    cookie   -- Flask's stock signed-cookie sessions (the extension stays out of the way)
+
+Expiry slides: every request that uses a session pushes its expiry out to
+PERMANENT_SESSION_LIFETIME from now. To keep that from turning every page
+view into a write, extensions are queued in memory and written in one batch
+at most every SESSION_TOUCH_INTERVAL seconds; a session is only re-queued
+once its stored expiry is that old.
+
+Loaded sessions are cached per worker for SESSION_CACHE_TTL seconds, so most
+requests do not touch the backend at all. A logout or revoke_user() drops
+the sessions from the cache of the worker that handled it at once; other
+workers may keep serving them for up to SESSION_CACHE_TTL. That window is
+read-only: saving an existing session only updates its stored row, so a
+worker holding a cached copy of a deleted session cannot write it back (its
+cookie is cleared instead).
+
+Sessions that hold nothing but SESSION_CLIENT_KEYS (the CSRF token,
+flashes) are kept in the signed cookie itself, so visitors who only look at
+a form do not create a server-side row. The session moves to the backend as
+soon as anything else (a login) is stored in it, and back to the cookie when
+it is cut down to those keys again (a logout).
+"""
+import calendar
+import hashlib
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+from itsdangerous import BadSignature, Signer, URLSafeTimedSerializer
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String, Table, bindparam, delete, select, update
+
+from cache import TTLCache
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+
+class ServerSession(SecureCookieSession):
+    """Session dict that remembers its id and the expiry currently stored for it."""
+
+    def __init__(self, initial=None, sid=None, expires_at=None, client_side=False):
+        super().__init__(initial)
+        self.sid = sid
+        self.new = sid is None
+        self.expires_at = expires_at
+        self.rotate = False
+        # True when the request carried the data in its cookie rather than a session id.
+        self.client_side = client_side
+
+    def regenerate(self):
+        """Moves the data to a fresh id on save; call on login to prevent session fixation."""
+        self.rotate = True
+        self.modified = True
+
+
+# --- Backends ---
+# Each backend stores (serialized data, user_id, expires_at) per session id.
+# ``user_id`` is what revoke_user() finds a user's sessions by. save() with
+# create=False only updates a session that still exists and returns whether
+# it did.
+
+class MemoryBackend:
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def load(self, sid, now):
+        with self._lock:
+            entry = self._data.get(sid)
+            if entry is None or entry[2] <= now:
+                return None
+            return entry[0], entry[2]
+
+    def save(self, sid, blob, user_id, expires_at, create=True):
+        with self._lock:
+            if not create and sid not in self._data:
+                return False
+            self._data[sid] = (blob, user_id, expires_at)
+            return True
+
+    def touch(self, expiries):
+        with self._lock:
+            for sid, expires_at in expiries.items():
+                entry = self._data.get(sid)
+                if entry is not None:
+                    self._data[sid] = (entry[0], entry[1], expires_at)
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            sids = [sid for sid, entry in self._data.items() if entry[1] == user_id]
+            for sid in sids:
+                del self._data[sid]
+        return sids
+
+    def purge_expired(self, now):
+        with self._lock:
+            expired = [sid for sid, entry in self._data.items() if entry[2] <= now]
+            for sid in expired:
+                del self._data[sid]
+        return len(expired)
+
+
+def session_table(metadata):
+    """The ``server_session`` table, defined once on ``metadata`` so Flask-Migrate picks it up."""
+    if 'server_session' in metadata.tables:
+        return metadata.tables['server_session']
+    return Table(
+        'server_session', metadata,
+        Column('id', String(64), primary_key=True),
+        Column('data', LargeBinary, nullable=False),
+        Column('user_id', Integer, nullable=True, index=True),
+        Column('expires_at', DateTime, nullable=False, index=True),
+    )
+
+
+class DatabaseBackend:
+    """Stores sessions in the ``server_session`` table on its own connections, outside the request's ORM session."""
+
+    def __init__(self, db):
+        self.db = db
+        self.table = session_table(db.metadata)
+
+    def load(self, sid, now):
+        t = self.table
+        with self.db.engine.connect() as conn:
+            row = conn.execute(select(t.c.data, t.c.expires_at).where(t.c.id == sid, t.c.expires_at > now)).first()
+        return (row.data, row.expires_at) if row else None
+
+    def save(self, sid, blob, user_id, expires_at, create=True):
+        t = self.table
+        values = {'data': blob, 'user_id': user_id, 'expires_at': expires_at}
+        with self.db.engine.begin() as conn:
+            if conn.execute(update(t).where(t.c.id == sid).values(**values)).rowcount:
+                return True
+            if not create:
+                return False
+            conn.execute(t.insert().values(id=sid, **values))
+            return True
+
+    def touch(self, expiries):
+        t = self.table
+        statement = update(t).where(t.c.id == bindparam('b_sid')).values(expires_at=bindparam('b_expires_at'))
+        with self.db.engine.begin() as conn:
+            conn.execute(statement, [{'b_sid': sid, 'b_expires_at': expires_at}
+                                     for sid, expires_at in expiries.items()])
+
+    def delete(self, sid):
+        with self.db.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.id == sid))
+
+    def delete_user(self, user_id):
+        t = self.table
+        with self.db.engine.begin() as conn:
+            sids = list(conn.execute(select(t.c.id).where(t.c.user_id == user_id)).scalars())
+            if sids:
+                conn.execute(delete(t).where(t.c.id.in_(sids)))
+        return sids
+
+    def purge_expired(self, now):
+        with self.db.engine.begin() as conn:
+            return conn.execute(delete(self.table).where(self.table.c.expires_at <= now)).rowcount
+
+
+class RedisBackend:
+    """Keys expire natively; a per-user set of session ids (stale ids are harmless) backs revoke_user()."""
+
+    def __init__(self, url, prefix='flixhd:session:'):
+        if redis is None:
+            raise RuntimeError('SESSION_BACKEND=redis requires the redis package')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, sid):
+        return f'{self.prefix}{sid}'
+
+    def _user_key(self, user_id):
+        return f'{self.prefix}user:{user_id}'
+
+    def load(self, sid, now):
+        pipe = self.client.pipeline()
+        pipe.get(self._key(sid))
+        pipe.ttl(self._key(sid))
+        blob, ttl = pipe.execute()
+        if blob is None or ttl is None or ttl <= 0:
+            return None
+        return blob, now + timedelta(seconds=ttl)
+
+    def save(self, sid, blob, user_id, expires_at, create=True):
+        at = _epoch(expires_at)
+        # xx: only overwrite a key that still exists.
+        if not self.client.set(self._key(sid), blob, exat=at, xx=not create):
+            return False
+        if user_id is not None:
+            # No TTL on the set: touches extend sessions without knowing their user.
+            self.client.sadd(self._user_key(user_id), sid)
+        return True
+
+    def touch(self, expiries):
+        pipe = self.client.pipeline()
+        for sid, expires_at in expiries.items():
+            pipe.expireat(self._key(sid), _epoch(expires_at))
+        pipe.execute()
+
+    def delete(self, sid):
+        self.client.delete(self._key(sid))
+
+    def delete_user(self, user_id):
+        sids = [sid.decode() for sid in self.client.smembers(self._user_key(user_id))]
+        self.client.delete(self._user_key(user_id), *[self._key(sid) for sid in sids])
+        return sids
+
+    def purge_expired(self, now):
+        return 0
+
+
+def _epoch(naive_utc):
+    return calendar.timegm(naive_utc.utctimetuple())
+
+
+# --- Session interface ---
+
+class ServerSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+    salt = 'flixhd-server-session'
+
+    # Prefixes the cookie value when it holds the session data instead of an id.
+    client_marker = 'c.'
+
+    def __init__(self, backend, cache_ttl=5, touch_interval=60, purge_interval=600, client_keys=(), metrics=None):
+        self.backend = backend
+        self.cache = TTLCache(ttl=cache_ttl, name='server_session', metrics=metrics, max_entries=10000)
+        self.client_keys = frozenset(client_keys)
+        self.touch_interval = touch_interval
+        self.purge_interval = purge_interval
+        self._touches = {}
+        self._lock = threading.Lock()
+        self._last_flush = self._last_purge = time.monotonic()
+
+    @property
+    def pending_touches(self):
+        return len(self._touches)
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt, key_derivation='hmac', digest_method=hashlib.sha256)
+
+    def _load(self, sid, now):
+        record = self.cache.get(sid)
+        if record is None:
+            record = self.backend.load(sid, now)
+            if record is None:
+                return None
+            self.cache.set(sid, record)
+        elif record[1] <= now:
+            return None
+        return record
+
+    def _client_serializer(self, app):
+        return URLSafeTimedSerializer(app.secret_key, salt=self.salt + '-client', serializer=self.serializer,
+                                      signer_kwargs={'key_derivation': 'hmac', 'digest_method': hashlib.sha256})
+
+    def _is_client_side(self, session):
+        """
+        Whether ``session`` holds only client keys and so lives in its cookie: a new
+        session, or a stored one that was just cut down to them (a logout's flash).
+        """
+        return set(session) <= self.client_keys and (session.sid is None or session.modified)
+
+    def open_session(self, app, request):
+        if not app.secret_key:
+            return None
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie and cookie.startswith(self.client_marker):
+            max_age = int(app.permanent_session_lifetime.total_seconds())
+            try:
+                data = self._client_serializer(app).loads(cookie[len(self.client_marker):], max_age=max_age)
+            except BadSignature:
+                data = None
+            if isinstance(data, dict):
+                return ServerSession(data, client_side=True)
+        elif cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                try:
+                    record = self._load(sid, datetime.utcnow())
+                except Exception:
+                    app.logger.exception('Could not load session')
+                    record = None
+                if record is not None:
+                    blob, expires_at = record
+                    return ServerSession(self.serializer.loads(blob.decode('utf-8')), sid=sid, expires_at=expires_at)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            if not session.new:
+                self._delete(session.sid)
+            if not session.new or session.client_side:
+                self._delete_cookie(app, response)
+            self._flush_if_due(app)
+            return
+
+        now = datetime.utcnow()
+        lifetime = app.permanent_session_lifetime
+        expires_at = now + lifetime
+        if self._is_client_side(session):
+            if session.sid is not None:
+                self._delete(session.sid)
+            if session.modified or (session.client_side and session.permanent):
+                value = self._client_serializer(app).dumps(dict(session))
+                self._set_cookie(app, session, response, None, value=self.client_marker + value)
+        elif session.modified or session.new:
+            sid = session.sid
+            create = sid is None or session.rotate
+            if create:
+                sid = secrets.token_urlsafe(24)
+            blob = self.serializer.dumps(dict(session)).encode('utf-8')
+            if self.backend.save(sid, blob, session.get('user_id'), expires_at, create=create):
+                self.cache.set(sid, (blob, expires_at))
+                if session.sid and session.sid != sid:
+                    self._delete(session.sid)
+                self._set_cookie(app, session, response, sid)
+            else:
+                # Deleted (logged out, revoked, expired) after this request loaded it: leave it deleted.
+                self.cache.invalidate(sid)
+                self._delete_cookie(app, response)
+        elif session.expires_at <= expires_at - timedelta(seconds=self.touch_interval):
+            with self._lock:
+                self._touches[session.sid] = expires_at
+            record = self.cache.get(session.sid)
+            if record is not None:
+                self.cache.set(session.sid, (record[0], expires_at))
+            if session.permanent:
+                self._set_cookie(app, session, response, session.sid)
+        self._flush_if_due(app)
+
+    def _set_cookie(self, app, session, response, sid, value=None):
+        response.set_cookie(
+            self.get_cookie_name(app),
+            value if value is not None else self._signer(app).sign(sid).decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=self.get_cookie_domain(app),
+            path=self.get_cookie_path(app),
+            secure=self.get_cookie_secure(app),
+            partitioned=self.get_cookie_partitioned(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+    def _delete_cookie(self, app, response):
+        response.delete_cookie(self.get_cookie_name(app), domain=self.get_cookie_domain(app),
+                               path=self.get_cookie_path(app), secure=self.get_cookie_secure(app),
+                               partitioned=self.get_cookie_partitioned(app),
+                               samesite=self.get_cookie_samesite(app), httponly=self.get_cookie_httponly(app))
+
+    def _delete(self, sid):
+        self.backend.delete(sid)
+        self.cache.invalidate(sid)
+        with self._lock:
+            self._touches.pop(sid, None)
+
+    def _flush_if_due(self, app):
+        now = time.monotonic()
+        if now - self._last_flush < self.touch_interval:
+            return
+        with self._lock:
+            touches, self._touches = self._touches, {}
+            self._last_flush = now
+            purge = now - self._last_purge >= self.purge_interval
+            if purge:
+                self._last_purge = now
+        try:
+            if touches:
+                self.backend.touch(touches)
+            if purge:
+                self.backend.purge_expired(datetime.utcnow())
+        except Exception:
+            app.logger.exception('Could not write %d session expiry updates', len(touches))
+
+    def flush(self, app):
+        """Writes queued expiry updates immediately."""
+        self._last_flush = float('-inf')
+        self._flush_if_due(app)
+
+    def revoke_user(self, user_id):
+        """Deletes every session belonging to ``user_id``; returns how many there were."""
+        sids = self.backend.delete_user(user_id)
+        for sid in sids:
+            self.cache.invalidate(sid)
+        with self._lock:
+            for sid in sids:
+                self._touches.pop(sid, None)
+        return len(sids)
+
+
+class ServerSessions:
+    """
+    Flask extension installing ``ServerSessionInterface`` as the app's session
+    interface.
+
+    Configuration keys:
+        SESSION_BACKEND          -- database, redis, memory or cookie (default database)
+        SESSION_REDIS_URL        -- Redis URL for the redis backend
+        SESSION_CACHE_TTL        -- seconds a loaded session is cached per worker (default 5)
+        SESSION_CLIENT_KEYS      -- keys an anonymous session may hold and still live in the
+                                    signed cookie (default: csrf_token, _flashes, _permanent)
+        SESSION_TOUCH_INTERVAL   -- seconds between batched expiry writes (default 60)
+        SESSION_PURGE_INTERVAL   -- seconds between expired-session sweeps (default 600)
+    """
+
+    def __init__(self, app=None, db=None, metrics=None):
+        self.db = db
+        self.metrics = metrics
+        self.interface = None
+        if db is not None:
+            # Declared up front so `flask db migrate` sees the table whichever backend is configured.
+            session_table(db.metadata)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SESSION_BACKEND', 'database')
+        app.config.setdefault('SESSION_REDIS_URL', None)
+        app.config.setdefault('SESSION_CACHE_TTL', 5)
+        app.config.setdefault('SESSION_CLIENT_KEYS', ('csrf_token', '_flashes', '_permanent'))
+        app.config.setdefault('SESSION_TOUCH_INTERVAL', 60)
+        app.config.setdefault('SESSION_PURGE_INTERVAL', 600)
+        app.extensions['server_sessions'] = self
+
+        backend_name = app.config['SESSION_BACKEND']
+        if backend_name == 'cookie':
+            return
+        if backend_name == 'database':
+            backend = DatabaseBackend(self.db)
+        elif backend_name == 'redis':
+            backend = RedisBackend(app.config['SESSION_REDIS_URL'])
+        elif backend_name == 'memory':
+            backend = MemoryBackend()
+        else:
+            raise ValueError(f'Unknown SESSION_BACKEND {backend_name!r}')
+
+        self.interface = ServerSessionInterface(
+            backend,
+            cache_ttl=app.config['SESSION_CACHE_TTL'],
+            touch_interval=app.config['SESSION_TOUCH_INTERVAL'],
+            purge_interval=app.config['SESSION_PURGE_INTERVAL'],
+            client_keys=app.config['SESSION_CLIENT_KEYS'],
+            metrics=self.metrics,
+        )
+        app.session_interface = self.interface
+        if self.metrics is not None:
+            self.metrics.register_gauge('session_touches_pending', 'Session expiry updates waiting to be written.',
+                                        lambda: self.interface.pending_touches)
+
+    def regenerate(self, session):
+        """Gives the current session a new id on save; a no-op with cookie sessions."""
+        if isinstance(session, ServerSession):
+            session.regenerate()
+
+    def revoke_user(self, user_id):
+        """Logs ``user_id`` out everywhere. Returns the number of sessions removed."""
+        if self.interface is None:
+            return 0
+        return self.interface.revoke_user(user_id)
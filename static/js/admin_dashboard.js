@@ -0,0 +1,724 @@
+// Admin dashboard (Alpine.js component). URLs and the CSRF token come from the
+// #dashboard-config JSON block rendered by admin_dashboard.html, so this file is
+// static and can be fingerprinted/cached by `flask build-assets`.
+const DASHBOARD = JSON.parse(document.getElementById('dashboard-config').textContent);
+
+function adminDashboard() {
+    return {
+        // --- Alpine.js State Management ---
+        isSidebarOpen: window.innerWidth >= 1024,
+        currentTab: 'dashboard',
+        contentType: 'movie',
+        seasons: [],
+
+        isEditModalOpen: false,
+        editMovieData: {},
+        isUserEditModalOpen: false,
+        editUserData: {},
+        isMessageDetailsModalOpen: false,
+        selectedMessage: {},
+
+        // Custom Confirmation Modal state
+        isCustomConfirmModalOpen: false,
+        customConfirmTitle: '',
+        customConfirmBody: '',
+        customConfirmCallback: null,
+
+        toasts: [],
+        uploadXhr: null,
+
+        // Stats from backend
+        stats: {
+            totalMovies: null, totalSeries: null, pendingRequests: null,
+            totalUsers: null, pendingUsers: null, totalNewMessages: null
+        },
+
+        managedContent: [],
+        contentPage: 1, hasNextPage: false, contentLoading: false,
+        movieRequests: [],
+        requestsCursor: null,
+        requestStatusFilter: '',
+        users: [],
+        usersCursor: null, usersTotal: null, usersTotalExact: false, usersLoading: false,
+        userSearchQuery: '',
+        contactMessages: [],
+        messagesCursor: null,
+        messageStatusFilter: '',
+        messagesLoading: false,
+        pendingUsers: [],
+        pendingUsersCursor: null,
+        pendingUsersLoading: false,
+        requestsLoading: false,
+        selectedIds: [],
+        changesVersion: null,
+
+        // Charts
+        trafficChart: null,
+        distributionChart: null,
+
+        // TMDB Data State
+        tmdbFetchedSeriesData: {
+            tmdb_id: null, poster_url: null, backdrop_url: null, genres: [],
+            actors: [], director: null, release_date: null, overview: null, title: null
+        },
+
+        // --- Initialization Logic ---
+        init() {
+            // Watch for changes in the currentTab
+            this.$watch('currentTab', (tab) => {
+                if(window.innerWidth < 1024) this.isSidebarOpen = false;
+                this.selectedIds = [];
+
+                // Load specific data for tabs if empty
+                if(tab === 'manage' && this.managedContent.length === 0) this.loadMoreContent();
+                if(tab === 'requests' && this.movieRequests.length === 0) this.loadRequests();
+                if(tab === 'users') {
+                    if (this.users.length === 0 || this.userSearchQuery !== '') {
+                        this.performUserSearch();
+                    }
+                }
+                if(tab === 'messages' && this.contactMessages.length === 0) this.loadContactMessages();
+                if(tab === 'pending_users' && this.pendingUsers.length === 0) this.loadPendingUsers();
+                
+                // Initialize charts if dashboard
+                if(tab === 'dashboard') {
+                    setTimeout(() => this.initCharts(), 100);
+                }
+
+                // --- FIX: FORCE ICON RELOAD ON TAB SWITCH ---
+                // This ensures icons reappear when Alpine re-renders the table rows
+                this.$nextTick(() => {
+                    lucide.createIcons();
+                });
+            });
+
+            this.addSeason(); 
+
+            this.$nextTick(() => {
+                this.loadStats();
+                lucide.createIcons();
+                this.initCharts();
+                this.startChangeFeed();
+            });
+        },
+
+        // --- Chart.js Initialization ---
+        initCharts() {
+            if(this.trafficChart) this.trafficChart.destroy();
+            if(this.distributionChart) this.distributionChart.destroy();
+
+            const ctxTraffic = document.getElementById('trafficChart');
+            const ctxDist = document.getElementById('distributionChart');
+
+            if(ctxTraffic) {
+                this.trafficChart = new Chart(ctxTraffic, {
+                    type: 'line',
+                    data: {
+                        labels: ['1', '5', '10', '15', '20', '25', '30'],
+                        datasets: [{
+                            label: 'Page Views',
+                            data: [120, 190, 300, 500, 200, 300, 450],
+                            borderColor: '#e50914',
+                            backgroundColor: 'rgba(229, 9, 20, 0.1)',
+                            tension: 0.4,
+                            fill: true,
+                            pointRadius: 3
+                        }]
+                    },
+                    options: {
+                        responsive: true,
+                        maintainAspectRatio: false,
+                        plugins: { legend: { display: false } },
+                        scales: {
+                            y: { grid: { color: 'rgba(255,255,255,0.05)' }, ticks: { color: '#a3a3a3' } },
+                            x: { grid: { display: false }, ticks: { color: '#a3a3a3' } }
+                        }
+                    }
+                });
+            }
+
+            if(ctxDist) {
+                this.distributionChart = new Chart(ctxDist, {
+                    type: 'doughnut',
+                    data: {
+                        labels: ['Movies', 'Series'],
+                        datasets: [{
+                            data: [74, 26],
+                            backgroundColor: ['#e50914', '#7c3aed'],
+                            borderWidth: 0,
+                            hoverOffset: 4
+                        }]
+                    },
+                    options: {
+                        responsive: true,
+                        maintainAspectRatio: false,
+                        cutout: '75%',
+                        plugins: { legend: { display: false } }
+                    }
+                });
+            }
+        },
+
+        isActive(tab) { return this.currentTab === tab; },
+
+        // --- Dashboard Stats Logic ---
+        async loadStats() {
+            try {
+                const response = await fetch(DASHBOARD.urls.get_stats);
+                if (!response.ok) throw new Error('Network response was not ok');
+                this.stats = await response.json(); 
+                this.$nextTick(() => lucide.createIcons());
+            } catch (error) {
+                console.error("Error loading stats:", error);
+            }
+        },
+
+        // --- Change Feed ---
+        // Keeps stats and the loaded lists current by applying only the rows that
+        // changed since the last seen version, over SSE when enabled or by polling.
+        async startChangeFeed() {
+            try {
+                const response = await fetch(DASHBOARD.urls.admin_changes);
+                if (!response.ok) throw new Error('Change feed unavailable');
+                this.changesVersion = (await response.json()).version;
+            } catch (error) {
+                console.error("Error starting change feed:", error);
+                return;
+            }
+            if (DASHBOARD.changeFeed.stream && window.EventSource) {
+                const source = new EventSource(`${DASHBOARD.urls.admin_changes_stream}?since=${this.changesVersion}`);
+                source.addEventListener('changes', (event) => this.applyChanges(JSON.parse(event.data)));
+            } else {
+                setInterval(() => this.pollChanges(), DASHBOARD.changeFeed.interval * 1000);
+            }
+        },
+        async pollChanges() {
+            if (document.hidden || this.changesVersion === null) return;
+            try {
+                const response = await fetch(`${DASHBOARD.urls.admin_changes}?since=${this.changesVersion}`);
+                if (!response.ok) throw new Error('Network response was not ok');
+                this.applyChanges(await response.json());
+            } catch (error) {
+                console.error("Error polling changes:", error);
+            }
+        },
+        applyChanges(feed) {
+            this.changesVersion = feed.version;
+            if (feed.stats) this.stats = feed.stats;
+            if (feed.reset) {
+                if (this.users.length) this.loadUsers();
+                if (this.pendingUsers.length) this.loadPendingUsers();
+                if (this.movieRequests.length) this.loadRequests();
+                if (this.contactMessages.length) this.loadContactMessages();
+                return;
+            }
+            const lists = {
+                users: ['users', this.userSearchQuery ? () => false : () => true],
+                pending_users: ['pendingUsers', () => true],
+                requests: ['movieRequests', row => !this.requestStatusFilter || row.status === this.requestStatusFilter],
+                messages: ['contactMessages', row => !this.messageStatusFilter || row.status === this.messageStatusFilter],
+            };
+            for (const [kind, change] of Object.entries(feed.changes || {})) {
+                const [key, matches] = lists[kind] || [];
+                // Lists not loaded yet are fetched in full when their tab opens.
+                if (!key || this[key].length === 0) continue;
+                const deleted = new Set(change.deletes);
+                let rows = this[key].filter(row => !deleted.has(row.id));
+                for (const row of change.upserts) {
+                    const index = rows.findIndex(r => r.id === row.id);
+                    if (index !== -1) rows[index] = { ...rows[index], ...row };
+                    else if (matches(row)) rows.unshift(row);
+                }
+                if (kind === 'requests' || kind === 'messages') rows = rows.filter(row => matches(row));
+                this[key] = rows;
+            }
+            this.$nextTick(() => lucide.createIcons());
+        },
+
+        // --- Content Management Logic ---
+        async loadMoreContent() {
+            if (this.contentLoading) return;
+            this.contentLoading = true;
+            try {
+                const response = await fetch(`${DASHBOARD.urls.get_content}?page=${this.contentPage}`);
+                if (!response.ok) throw new Error('Error loading content.');
+                const data = await response.json();
+                this.managedContent.push(...data.items);
+                this.hasNextPage = data.has_next;
+                if(data.has_next) this.contentPage = data.next_page_number;
+            } catch (error) {
+                this.addToast(`Error: ${error.message}`, 'error');
+            } finally {
+                this.contentLoading = false;
+                this.$nextTick(() => lucide.createIcons());
+            }
+        },
+
+        handleFormSubmit(event) {
+            const form = event.target;
+            const uploadBtn = document.getElementById('uploadBtn');
+            uploadBtn.disabled = true;
+            document.getElementById('uploadStatus').style.display = 'block';
+            const csrfToken = document.querySelector('[name="csrf_token"]').value;
+
+            if (this.contentType === 'series') {
+                const seriesData = {
+                    title: document.getElementById('title').value,
+                    description: document.getElementById('description').value,
+                    genres: document.getElementById('genres').value,
+                    release_date: document.getElementById('release_date').value,
+                    director: document.getElementById('director').value,
+                    tmdb_id: this.tmdbFetchedSeriesData.tmdb_id,
+                    poster_url: this.tmdbFetchedSeriesData.poster_url,
+                    backdrop_url: this.tmdbFetchedSeriesData.backdrop_url,
+                    content_type: 'series',
+                    seasons: this.seasons.map((season, index) => ({ title: `Season ${index + 1}`, episodes: season.episodes })),
+                    actors: this.tmdbFetchedSeriesData.actors, 
+                    download_url: document.getElementById('download_url').value
+                };
+                document.getElementById('progressBar').style.width = '50%';
+                document.getElementById('uploadPercent').textContent = `Processing...`;
+
+                fetch(form.action, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrfToken },
+                    body: JSON.stringify(seriesData)
+                })
+                .then(res => res.json().then(data => ({ ok: res.ok, data })))
+                .then(({ ok, data }) => {
+                    if (!ok) throw new Error(data.message || 'Server error');
+                    document.getElementById('progressBar').style.width = '100%';
+                    this.addToast(data.message || 'Series added!', 'success');
+                    this.managedContent.unshift(data.item);
+                    form.reset();
+                    this.seasons = []; this.addSeason();
+                    this.tmdbFetchedSeriesData = { tmdb_id: null, poster_url: null, backdrop_url: null, genres: [], actors: [], director: null, release_date: null, overview: null, title: null };
+                    document.getElementById('fetched_poster_preview').style.display = 'none';
+                    document.getElementById('tmdb_fetch_status').innerHTML = '';
+                    this.currentTab = 'manage';
+                    this.loadStats();
+                })
+                .catch(error => this.addToast(`Error: ${error.message}`, 'error'))
+                .finally(() => { uploadBtn.disabled = false; document.getElementById('uploadStatus').style.display = 'none'; });
+            } else { 
+                // Movie Upload Logic
+                const formData = new FormData(form);
+                formData.set('tmdb_id', document.getElementById('tmdb_id_hidden') ? document.getElementById('tmdb_id_hidden').value : '');
+                formData.set('poster_url', document.getElementById('poster_url_hidden') ? document.getElementById('poster_url_hidden').value : '');
+                formData.set('backdrop_url', document.getElementById('backdrop_url_hidden') ? document.getElementById('backdrop_url_hidden').value : '');
+                formData.set('actors_json', document.getElementById('actors_json') ? document.getElementById('actors_json').value : '[]');
+
+                this.uploadXhr = new XMLHttpRequest();
+                this.uploadXhr.open('POST', form.action, true);
+                this.uploadXhr.setRequestHeader('X-CSRFToken', csrfToken);
+
+                this.uploadXhr.upload.onprogress = (e) => {
+                    if (e.lengthComputable) {
+                        const percent = Math.round((e.loaded / e.total) * 100);
+                        document.getElementById('progressBar').style.width = percent + '%';
+                        document.getElementById('uploadPercent').textContent = `Uploading ${percent}%`;
+                    }
+                };
+
+                this.uploadXhr.onload = () => {
+                    if (this.uploadXhr.status >= 200 && this.uploadXhr.status < 300) {
+                        const result = JSON.parse(this.uploadXhr.responseText);
+                        this.addToast(result.message || 'Movie added!', 'success');
+                        this.managedContent.unshift(result.item);
+                        form.reset();
+                        document.getElementById('fetched_poster_preview').style.display = 'none';
+                        document.getElementById('tmdb_fetch_status').innerHTML = '';
+                        this.currentTab = 'manage';
+                        this.loadStats();
+                    } else {
+                        this.addToast('Upload failed.', 'error');
+                    }
+                    uploadBtn.disabled = false;
+                    document.getElementById('uploadStatus').style.display = 'none';
+                };
+                this.uploadXhr.send(formData);
+            }
+        },
+
+        async handleEditSubmit(form) {
+            const formData = new FormData(form);
+            const movieId = formData.get('movieId');
+            formData.set('actors_json', document.getElementById('actors_json_edit').value);
+
+            try {
+                const response = await fetch(`${DASHBOARD.urls.api_edit_movie}`.replace('0', movieId), {
+                    method: 'POST',
+                    body: formData,
+                    headers: { 'X-CSRFToken': DASHBOARD.csrfToken }
+                });
+                if (!response.ok) throw new Error('Failed to update.');
+                const result = await response.json();
+                
+                const index = this.managedContent.findIndex(m => m.id == movieId);
+                if (index !== -1) this.managedContent[index] = { ...this.managedContent[index], ...result.item };
+                
+                this.closeEditModal();
+                this.addToast('Updated successfully!', 'success');
+            } catch (error) {
+                this.addToast(`Error: ${error.message}`, 'error');
+            }
+        },
+
+        openCustomConfirm(title, callback, body = '') {
+            this.customConfirmTitle = title;
+            this.customConfirmBody = body;
+            this.customConfirmCallback = callback;
+            this.isCustomConfirmModalOpen = true;
+        },
+        confirmCustomAction() {
+            if (typeof this.customConfirmCallback === 'function') this.customConfirmCallback();
+            this.closeCustomConfirmModal();
+        },
+        closeCustomConfirmModal() {
+            this.isCustomConfirmModalOpen = false; this.customConfirmCallback = null;
+        },
+
+        confirmDelete(item, type) {
+            const callback = () => this.executeDelete(item.id, type, item.content_type);
+            this.openCustomConfirm('Confirm Deletion', callback, `Permanently delete this item?`);
+        },
+
+        async executeDelete(id, type, contentType) {
+            let url;
+            if (type === 'content') url = contentType === 'movie' ? `${DASHBOARD.urls.delete_movie}`.replace('0', id) : `${DASHBOARD.urls.delete_series}`.replace('0', id);
+            else if (type === 'user') url = `${DASHBOARD.urls.admin_manage_user}`.replace('0', id);
+            else if (type === 'request') url = `${DASHBOARD.urls.delete_request}`.replace('0', id);
+            else if (type === 'message') url = `${DASHBOARD.urls.admin_delete_message}`.replace('0', id);
+            else if (type === 'pending_user') url = `${DASHBOARD.urls.admin_delete_pending_user}`.replace('0', id);
+
+            try {
+                const response = await fetch(url, { method: 'DELETE', headers: { 'X-CSRFToken': DASHBOARD.csrfToken }});
+                if (!response.ok) throw new Error('Deletion failed.');
+                
+                if (type === 'content') this.managedContent = this.managedContent.filter(i => i.id !== id);
+                else if (type === 'user') this.users = this.users.filter(i => i.id !== id);
+                else if (type === 'request') this.movieRequests = this.movieRequests.filter(i => i.id !== id);
+                else if (type === 'message') this.contactMessages = this.contactMessages.filter(i => i.id !== id);
+                else if (type === 'pending_user') this.pendingUsers = this.pendingUsers.filter(i => i.id !== id);
+                
+                this.addToast('Item deleted.', 'success');
+                this.loadStats();
+            } catch (error) {
+                this.addToast(error.message, 'error');
+            }
+        },
+
+        // --- Bulk Actions (users, pending users, requests, messages) ---
+        currentRows() {
+            return { users: this.users, pending_users: this.pendingUsers, requests: this.movieRequests, messages: this.contactMessages }[this.currentTab] || [];
+        },
+        isSelected(id) { return this.selectedIds.includes(id); },
+        toggleSelected(id) {
+            this.selectedIds = this.isSelected(id) ? this.selectedIds.filter(i => i !== id) : this.selectedIds.concat(id);
+        },
+        allSelected() {
+            const rows = this.currentRows();
+            return rows.length > 0 && rows.every(row => this.isSelected(row.id));
+        },
+        toggleSelectAll() {
+            this.selectedIds = this.allSelected() ? [] : this.currentRows().map(row => row.id);
+        },
+        bulkAction(action, label) {
+            const kind = this.currentTab, ids = [...this.selectedIds];
+            const callback = () => this._bulkAction(kind, action, ids);
+            this.openCustomConfirm(`${label} ${ids.length} items?`, callback, 'This applies to every selected row.');
+        },
+        async _bulkAction(kind, action, ids) {
+            try {
+                const response = await fetch(`${DASHBOARD.urls.admin_bulk_action}`.replace('__kind__', kind), {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json', 'X-CSRFToken': DASHBOARD.csrfToken },
+                    body: JSON.stringify({ action, ids })
+                });
+                const result = await response.json();
+                if (!response.ok || !result.success) throw new Error(result.message || 'Bulk action failed.');
+                this.selectedIds = [];
+                this.addToast(result.message, 'success');
+                if (kind === 'users') this.loadUsers();
+                else if (kind === 'pending_users') { this.loadPendingUsers(); this.loadUsers(); }
+                else if (kind === 'requests') this.loadRequests();
+                else if (kind === 'messages') this.loadContactMessages();
+                this.loadStats();
+            } catch (e) { this.addToast(e.message, 'error'); }
+        },
+
+        // Builds the query string for the cursor-paginated admin list endpoints.
+        listQuery(cursor, status) {
+            const params = new URLSearchParams();
+            if (cursor) params.set('cursor', cursor);
+            if (status) params.set('status', status);
+            const qs = params.toString();
+            return qs ? `?${qs}` : '';
+        },
+
+        async loadRequests(append = false) {
+            if (this.requestsLoading) return;
+            this.requestsLoading = true;
+            try {
+                const cursor = append ? this.requestsCursor : null;
+                const response = await fetch(DASHBOARD.urls.get_requests + this.listQuery(cursor, this.requestStatusFilter));
+                if (!response.ok) throw new Error('Fetch failed');
+                const page = await response.json();
+                this.movieRequests = append ? this.movieRequests.concat(page.items) : page.items;
+                this.requestsCursor = page.next_cursor;
+            } catch(e) { this.addToast(e.message, 'error'); } 
+            finally { this.requestsLoading = false; this.$nextTick(() => lucide.createIcons()); }
+        },
+
+        async completeRequest(requestId) {
+            const callback = () => this._completeRequestAction(requestId);
+            this.openCustomConfirm('Confirm Completion', callback, 'Mark as completed?');
+        },
+        async _completeRequestAction(requestId) {
+            try {
+                this.closeCustomConfirmModal();
+                const response = await fetch(`${DASHBOARD.urls.complete_request}`.replace('0', requestId), { method: 'POST', headers: { 'X-CSRFToken': DASHBOARD.csrfToken }});
+                if (!response.ok) throw new Error('Failed.');
+                const result = await response.json();
+                const index = this.movieRequests.findIndex(r => r.id === requestId);
+                if (index !== -1) this.movieRequests[index] = result.updated_request;
+                this.addToast('Completed!', 'success');
+                this.loadStats();
+            } catch(e) { this.addToast(e.message, 'error'); }
+        },
+
+        async fetchTmdbData(btn) {
+            const statusDiv = document.getElementById('tmdb_fetch_status');
+            statusDiv.innerHTML = `<span class="text-white animate-pulse">Searching...</span>`;
+            btn.disabled = true;
+            try {
+                const response = await fetch(`${DASHBOARD.urls.fetch_tmdb_data_route}?type=${this.contentType}&title=${encodeURIComponent(document.getElementById('tmdb_search_title').value)}&tmdb_id=${encodeURIComponent(document.getElementById('tmdb_movie_id').value)}`);
+                if (!response.ok) throw new Error('Not found or error.');
+                const data = await response.json();
+                if (data.not_found) throw new Error('Content not found.');
+
+                document.getElementById('title').value = data.title || '';
+                document.getElementById('description').value = data.overview || '';
+                document.getElementById('genres').value = data.genres ? data.genres.join(', ') : '';
+                document.getElementById('release_date').value = data.release_date || '';
+                document.getElementById('actors').value = (data.actors || []).map(a => a.name).join(', ');
+                document.getElementById('director').value = data.director || '';
+
+                if (this.contentType === 'series') {
+                    this.tmdbFetchedSeriesData = { ...data, actors: data.actors || [] };
+                } else {
+                    if (document.getElementById('tmdb_id_hidden')) document.getElementById('tmdb_id_hidden').value = data.tmdb_id || '';
+                    if (document.getElementById('poster_url_hidden')) document.getElementById('poster_url_hidden').value = data.poster_url || '';
+                    if (document.getElementById('backdrop_url_hidden')) document.getElementById('backdrop_url_hidden').value = data.backdrop_url || '';
+                    if (document.getElementById('actors_json')) document.getElementById('actors_json').value = JSON.stringify(data.actors || []);
+                }
+
+                const preview = document.getElementById('fetched_poster_preview');
+                if (data.poster_url) { preview.src = data.poster_url; preview.style.display = 'block'; }
+                statusDiv.innerHTML = `<span class="text-green-500 font-bold">Success!</span>`;
+            } catch (error) {
+                statusDiv.innerHTML = `<span class="text-red-500">${error.message}</span>`;
+            } finally {
+                btn.disabled = false;
+            }
+        },
+        showPosterPreview(event) {
+            const reader = new FileReader();
+            if (event.target.files[0]) {
+                reader.onload = (e) => {
+                    const p = document.getElementById('fetched_poster_preview');
+                    p.src = e.target.result;
+                    p.style.display = 'block';
+                };
+                reader.readAsDataURL(event.target.files[0]);
+            }
+        },
+        async openEditModal(item) {
+            if (item.content_type === 'series') {
+                window.location.href = `${DASHBOARD.urls.edit_series}`.replace('0', item.id);
+                return;
+            }
+            // The grid only carries card fields; load the full record for the form.
+            let movie;
+            try {
+                const response = await fetch(`${DASHBOARD.urls.api_get_movie}`.replace('0', item.id));
+                if (!response.ok) throw new Error('Error loading movie.');
+                movie = await response.json();
+            } catch (error) {
+                this.addToast(`Error: ${error.message}`, 'error');
+                return;
+            }
+            this.editMovieData = { ...movie };
+            if (movie.cast) document.getElementById('actors_json_edit').value = JSON.stringify(movie.cast);
+            else document.getElementById('actors_json_edit').value = '[]';
+            this.isEditModalOpen = true;
+            this.$nextTick(() => lucide.createIcons());
+        },
+        closeEditModal() { this.isEditModalOpen = false; this.editMovieData = {}; },
+        addSeason() { this.seasons.push({ episodes: [{ number: 1, title: '', embed_code: '' }] }); this.$nextTick(() => lucide.createIcons()); },
+        addEpisode(seasonIndex) { this.seasons[seasonIndex].episodes.push({ number: this.seasons[seasonIndex].episodes.length + 1, title: '', embed_code: '' }); this.$nextTick(() => lucide.createIcons()); },
+        removeSeason(seasonIndex) { this.seasons.splice(seasonIndex, 1); },
+        removeEpisode(seasonIndex, episodeIndex) { this.seasons[seasonIndex].episodes.splice(episodeIndex, 1); },
+
+        addToast(msg, type = 'success', duration = 5000) {
+            const id = Date.now();
+            const toast = { id, message: msg, type, visible: true, duration, percent: 100, timeoutId: null, intervalId: null };
+            this.toasts.push(toast);
+            this.$nextTick(() => lucide.createIcons());
+            toast.intervalId = setInterval(() => {
+                const t = this.toasts.find(t => t.id === id);
+                if (t) { t.percent -= (100 / (duration / 100)); if (t.percent < 0) t.percent = 0; }
+            }, 100);
+            toast.timeoutId = setTimeout(() => this.removeToast(id), duration);
+        },
+        removeToast(id) {
+            const index = this.toasts.findIndex(t => t.id === id);
+            if (index > -1) {
+                clearInterval(this.toasts[index].intervalId);
+                clearTimeout(this.toasts[index].timeoutId);
+                this.toasts[index].visible = false;
+                setTimeout(() => this.toasts.splice(index, 1), 300);
+            }
+        },
+
+        async loadUsers(append = false) {
+            if (this.usersLoading) return;
+            this.usersLoading = true;
+            try {
+                const params = new URLSearchParams();
+                if (append && this.usersCursor) params.set('cursor', this.usersCursor);
+                if (this.userSearchQuery) params.set('search', this.userSearchQuery);
+                const qs = params.toString();
+                const response = await fetch(DASHBOARD.urls.admin_get_users + (qs ? `?${qs}` : ''));
+                if (!response.ok) throw new Error('Error loading users.');
+                const page = await response.json();
+                this.users = append ? this.users.concat(page.items) : page.items;
+                this.usersCursor = page.next_cursor;
+                if (!append) { this.usersTotal = page.total_estimate; this.usersTotalExact = page.total_is_exact; }
+            } catch (e) { this.addToast(e.message, 'error'); } 
+            finally { this.usersLoading = false; this.$nextTick(() => lucide.createIcons()); }
+        },
+        performUserSearch() { this.loadUsers(); },
+        openUserEditModal(user) {
+            this.editUserData = { ...user, new_password: '' };
+            this.editUserData.is_active = String(user.is_active);
+            this.isUserEditModalOpen = true;
+        },
+        closeUserEditModal() { this.isUserEditModalOpen = false; this.editUserData = {}; },
+        async handleUserEditSubmit() {
+            const userId = this.editUserData.id;
+            const dataToSend = {
+                username: this.editUserData.username, email: this.editUserData.email, role: this.editUserData.role,
+                is_active: this.editUserData.is_active === 'true', security_question: this.editUserData.security_question, security_answer: this.editUserData.security_answer,
+            };
+            if (this.editUserData.new_password) dataToSend.password = this.editUserData.new_password;
+
+            try {
+                const response = await fetch(`${DASHBOARD.urls.admin_manage_user}`.replace('0', userId), {
+                    method: 'PUT', headers: { 'Content-Type': 'application/json', 'X-CSRFToken': DASHBOARD.csrfToken },
+                    body: JSON.stringify(dataToSend)
+                });
+                if (!response.ok) throw new Error('Failed.');
+                const result = await response.json();
+                const index = this.users.findIndex(u => u.id === userId);
+                if (index !== -1) { this.users[index] = { ...this.users[index], ...result.user }; this.users[index].is_active = String(result.user.is_active); }
+                this.addToast('User updated!', 'success');
+                this.closeUserEditModal();
+            } catch (e) { this.addToast(e.message, 'error'); }
+        },
+        async toggleUserActiveStatus(user) {
+            const callback = () => this._toggleUserActiveStatusAction(user);
+            this.openCustomConfirm(`Confirm Action`, callback, `Change status for ${user.username}?`);
+        },
+        async _toggleUserActiveStatusAction(user) {
+            try {
+                this.closeCustomConfirmModal();
+                const newStatus = !user.is_active;
+                const response = await fetch(`${DASHBOARD.urls.admin_manage_user}`.replace('0', user.id), {
+                    method: 'PUT', headers: { 'Content-Type': 'application/json', 'X-CSRFToken': DASHBOARD.csrfToken },
+                    body: JSON.stringify({ is_active: newStatus })
+                });
+                if (!response.ok) throw new Error('Failed.');
+                const result = await response.json();
+                user.is_active = newStatus;
+                this.addToast(`User ${newStatus ? 'activated' : 'suspended'}.`, 'success');
+                this.loadStats();
+            } catch(e) { this.addToast(e.message, 'error'); }
+        },
+
+        async loadContactMessages(append = false) {
+            if (this.messagesLoading) return;
+            this.messagesLoading = true;
+            try {
+                const cursor = append ? this.messagesCursor : null;
+                const response = await fetch(DASHBOARD.urls.admin_get_messages + this.listQuery(cursor, this.messageStatusFilter));
+                if (!response.ok) throw new Error('Fetch failed.');
+                const page = await response.json();
+                this.contactMessages = append ? this.contactMessages.concat(page.items) : page.items;
+                this.messagesCursor = page.next_cursor;
+            } catch(e) { this.addToast(e.message, 'error'); }
+            finally { this.messagesLoading = false; this.$nextTick(() => lucide.createIcons()); }
+        },
+        openMessageDetailsModal(msg) {
+            this.selectedMessage = { ...msg };
+            this.isMessageDetailsModalOpen = true;
+            if (msg.status === 'New') this._markMessageReadAction(msg.id, false);
+        },
+        closeMessageDetailsModal() { this.isMessageDetailsModalOpen = false; this.selectedMessage = {}; },
+        async markMessageRead(messageId) {
+            const msg = this.contactMessages.find(m => m.id === messageId);
+            if (msg.status === 'Read') return;
+            const callback = () => this._markMessageReadAction(messageId, true);
+            this.openCustomConfirm('Mark Read', callback, 'Mark as read?');
+        },
+        async _markMessageReadAction(messageId, closeConfirmModal = true) {
+            try {
+                if (closeConfirmModal) this.closeCustomConfirmModal();
+                const response = await fetch(`${DASHBOARD.urls.admin_mark_message_read}`.replace('0', messageId), { method: 'POST', headers: { 'X-CSRFToken': DASHBOARD.csrfToken }});
+                if (!response.ok) throw new Error('Failed.');
+                const result = await response.json();
+                const index = this.contactMessages.findIndex(m => m.id === messageId);
+                if (index !== -1) this.contactMessages[index] = result.updated_message;
+                if(closeConfirmModal) this.addToast('Marked read.', 'success');
+                this.loadStats();
+            } catch(e) { this.addToast(e.message, 'error'); }
+        },
+        async loadPendingUsers(append = false) {
+            if (this.pendingUsersLoading) return;
+            this.pendingUsersLoading = true;
+            try {
+                const cursor = append ? this.pendingUsersCursor : null;
+                const response = await fetch(DASHBOARD.urls.admin_get_pending_users + this.listQuery(cursor));
+                if (!response.ok) throw new Error('Fetch failed.');
+                const page = await response.json();
+                this.pendingUsers = append ? this.pendingUsers.concat(page.items) : page.items;
+                this.pendingUsersCursor = page.next_cursor;
+            } catch(e) { this.addToast(e.message, 'error'); }
+            finally { this.pendingUsersLoading = false; this.$nextTick(() => lucide.createIcons()); }
+        },
+        async approvePendingUser(userId) {
+            const callback = () => this._approvePendingUserAction(userId);
+            this.openCustomConfirm('Approve User', callback, 'Create active account for this user?');
+        },
+        async _approvePendingUserAction(userId) {
+            try {
+                this.closeCustomConfirmModal();
+                const response = await fetch(`${DASHBOARD.urls.admin_approve_pending_user}`.replace('0', userId), { method: 'POST', headers: { 'X-CSRFToken': DASHBOARD.csrfToken }});
+                if (!response.ok) throw new Error('Failed.');
+                this.pendingUsers = this.pendingUsers.filter(u => u.id !== userId);
+                this.addToast('User approved!', 'success');
+                this.loadStats(); this.loadUsers();
+            } catch(e) { this.addToast(e.message, 'error'); }
+        },
+    }
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    lucide.createIcons();
+});
+
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', () => {
+        navigator.serviceWorker.register('/service-worker.js').catch(error => console.error('SW failed:', error));
+    });
+}
@@ -0,0 +1,30 @@
+tailwind.config = {
+    darkMode: 'class',
+    theme: {
+        extend: {
+            fontFamily: {
+                sans: ['Outfit', 'sans-serif'],
+            },
+            colors: {
+                brand: {
+                    bg: '#141414',       /* Main Background */
+                    surface: '#1F1F1F',  /* Card Background */
+                    red: '#e50914',      /* Netflix Red */
+                    redDark: '#b20710',
+                    gray: '#B3B3B3',     /* Muted Text */
+                    dark: '#000000',
+                }
+            },
+            animation: {
+                'fade-in-up': 'fadeInUp 0.5s ease-out forwards',
+                'pulse-slow': 'pulse 3s cubic-bezier(0.4, 0, 0.6, 1) infinite',
+            },
+            keyframes: {
+                fadeInUp: {
+                    '0%': { opacity: '0', transform: 'translateY(15px)' },
+                    '100%': { opacity: '1', transform: 'translateY(0)' },
+                }
+            }
+        }
+    }
+}
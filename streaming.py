@@ -0,0 +1,114 @@
+"""
+Streaming page rendering.
+
+``render_page()`` is a drop-in for ``render_template`` that, when
+STREAM_TEMPLATES is on, sends the page with ``stream_template`` so the head
+and navigation leave the server before the page's queries have run. Views
+hand the template ``Lazy`` values instead of query results: each loader runs
+the first time the template touches the value (``{% if %}``, ``{% for %}`` or
+an attribute lookup), i.e. after the bytes above it have been rendered.
+
+Jinja yields many tiny strings, so output is coalesced into chunks of
+STREAM_TEMPLATE_CHUNK bytes. Templates place ``{{ stream_flush() }}`` just
+before a section that loads a Lazy value, which sends the pending chunk
+immediately so a slow shelf query never holds back the HTML above it.
+
+The status line has gone out by the time a Lazy loader runs, so a loader
+that raises cannot turn the page into a 500. ``streamed_response()`` logs
+the error, flags the response for the metrics (which for these responses
+are recorded when the body is finished, not when the headers are) and
+re-raises so the server aborts the connection: the client sees a failed
+transfer rather than a truncated page that ended cleanly.
+"""
+from flask import Response, current_app, render_template, request, stream_template, stream_with_context
+from markupsafe import Markup
+
+FLUSH_MARKER = Markup('<!--flush-->')
+_MISSING = object()
+
+
+class Lazy:
+    """
+    Proxy that calls ``loader()`` once, on first use, and then behaves like its
+    result for truthiness, iteration, ``len()`` and attribute access.
+    """
+
+    __slots__ = ('_loader', '_value')
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._value = _MISSING
+
+    @property
+    def value(self):
+        if self._value is _MISSING:
+            self._value = self._loader()
+        return self._value
+
+    def __bool__(self):
+        return bool(self.value)
+
+    def __iter__(self):
+        return iter(self.value)
+
+    def __len__(self):
+        return len(self.value)
+
+    def __getattr__(self, name):
+        return getattr(self.value, name)
+
+    def __str__(self):
+        return str(self.value)
+
+
+def stream_flush():
+    """Template global: a flush point when streaming, nothing otherwise."""
+    return FLUSH_MARKER if current_app.config.get('STREAM_TEMPLATES') else ''
+
+
+def coalesce(chunks, size):
+    """Joins small string chunks into ones of at least ``size`` characters, breaking early at flush markers."""
+    buffer, buffered = [], 0
+    for chunk in chunks:
+        if chunk == FLUSH_MARKER:
+            if buffer:
+                yield ''.join(buffer)
+                buffer, buffered = [], 0
+            continue
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def streamed_response(chunks, mimetype):
+    """Response streaming ``chunks`` whose ``stream_error`` attribute is set if they raise part way through."""
+    def guarded():
+        try:
+            yield from chunks
+        except Exception:
+            response.stream_error = True
+            current_app.logger.exception('Error while streaming the response to %s %s', request.method, request.path)
+            raise
+
+    response = Response(stream_with_context(guarded()), mimetype=mimetype)
+    response.stream_error = False
+    return response
+
+
+def render_page(template_name, **context):
+    """``render_template`` or, with STREAM_TEMPLATES, a streamed Response of the same page."""
+    if not current_app.config.get('STREAM_TEMPLATES'):
+        return render_template(template_name, **context)
+    chunks = stream_template(template_name, **context)
+    size = current_app.config.get('STREAM_TEMPLATE_CHUNK', 8 * 1024)
+    return streamed_response(coalesce(chunks, size), 'text/html')
+
+
+def init_app(app):
+    app.config.setdefault('STREAM_TEMPLATES', False)
+    app.config.setdefault('STREAM_TEMPLATE_CHUNK', 8 * 1024)
+    app.add_template_global(stream_flush, 'stream_flush')
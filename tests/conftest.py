@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The modules under test live at the repository root; importing app.py (through
+# migrate_data) needs these settings, and an in-memory SQLite database is enough.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('SECRET_KEY', 'test')
+os.environ.setdefault('ADMIN_USERNAME', 'admin')
+os.environ.setdefault('ADMIN_PASSWORD', 'admin')
@@ -0,0 +1,60 @@
+import io
+import json
+
+import pytest
+
+import migrate_data
+
+DOCUMENT = [
+    {'id': 'a', 'title': 'Brackets ] and, commas', 'genre': ['Drama', 'War'], 'nested': {'list': [1, 2, [3]]}},
+    1234567890,
+    -12.5e3,
+    'a "quoted" string with \\ and é',
+    None,
+    True,
+    [],
+    {},
+    9876543210987654321,
+]
+
+
+def decode(text, chunk, monkeypatch):
+    monkeypatch.setattr(migrate_data, 'READ_CHUNK', chunk)
+    return list(migrate_data._raw_decode_items(io.StringIO(text)))
+
+
+@pytest.mark.parametrize('chunk', [1, 2, 3, 5, 7, 16, 64 * 1024])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_items_match_json_loads_for_every_chunk_size(chunk, indent, monkeypatch):
+    text = json.dumps(DOCUMENT, indent=indent)
+    assert decode(text, chunk, monkeypatch) == DOCUMENT
+
+
+def test_number_split_across_a_chunk_boundary(monkeypatch):
+    # The first read ends in the middle of 1234567; decoding "123" there would be wrong.
+    assert decode('[1234567, 89]', 4, monkeypatch) == [1234567, 89]
+    assert decode('[12]', 3, monkeypatch) == [12]
+
+
+def test_number_ending_exactly_at_eof(monkeypatch):
+    assert decode(' [ 42 ]', 5, monkeypatch) == [42]
+
+
+def test_empty_array_and_surrounding_whitespace(monkeypatch):
+    assert decode('\n  [ \n ]  \n', 2, monkeypatch) == []
+
+
+def test_top_level_must_be_an_array(monkeypatch):
+    with pytest.raises(json.JSONDecodeError):
+        decode('{"a": 1}', 4, monkeypatch)
+
+
+@pytest.mark.parametrize('text', ['[1, 2', '[{"a": 1}, {"b":', '['])
+def test_unterminated_array_raises(text, monkeypatch):
+    with pytest.raises(json.JSONDecodeError):
+        decode(text, 3, monkeypatch)
+
+
+def test_batched_keeps_the_remainder():
+    assert list(migrate_data.batched(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(migrate_data.batched([], 3)) == []
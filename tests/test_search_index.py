@@ -0,0 +1,96 @@
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, select
+
+from search_index import NgramIndex, ngrams
+
+
+def make_index(owners, **limits):
+    """An in-memory SQLite NgramIndex holding ``owners`` ({owner_id: text}), with an owners table to join."""
+    metadata = MetaData()
+    index = NgramIndex(metadata, 'grams', **limits)
+    owner_table = Table('owners', metadata, Column('id', Integer, primary_key=True), Column('text', String))
+    engine = create_engine('sqlite://')
+    metadata.create_all(engine)
+    connection = engine.connect()
+    if owners:
+        connection.execute(owner_table.insert(), [{'id': owner_id, 'text': text} for owner_id, text in owners.items()])
+    rows = [row for owner_id, text in owners.items() for row in index.rows_for(owner_id, text)]
+    if rows:
+        connection.execute(index.table.insert(), rows)
+    return index, connection, owner_table
+
+
+def search(index, connection, owner_table, term, limit=None):
+    """Owner ids the index admits for ``term``, newest first, the way app.search_users() pages them."""
+    key = index.search_key(connection, term)
+    if key is None:
+        return None
+    query, id_column = index.join(select(owner_table.c.id), owner_table.c.id, key)
+    return list(connection.execute(query.order_by(id_column.desc()).limit(limit)).scalars())
+
+
+def test_ngrams_are_lower_cased_and_distinct():
+    assert ngrams('AbAb', None) == {'aba', 'bab', 'abab'}
+    assert ngrams('abcdef', max_n=4) == {'abc', 'bcd', 'cde', 'def', 'abcd', 'bcde', 'cdef'}
+    assert ngrams('ab') == set()
+
+
+def test_short_term_is_not_indexed():
+    index, connection, owners = make_index({1: 'alice'})
+    assert search(index, connection, owners, 'al') is None
+
+
+def test_terms_up_to_max_n_are_one_exact_key():
+    index, connection, owners = make_index({1: 'alice@example.com', 2: 'bob@example.com', 3: 'alicia@example.org'})
+    assert search(index, connection, owners, 'ALIC') == [3, 1]
+    assert search(index, connection, owners, 'alice') == [1]
+    assert search(index, connection, owners, 'zzz') == []
+
+
+def test_long_terms_admit_every_match():
+    index, connection, owners = make_index({1: 'alice@example.com', 2: 'alice@example.org', 3: 'bob@example.com'})
+    assert 1 in search(index, connection, owners, 'e@example.c')
+    assert search(index, connection, owners, 'example.') == [3, 2, 1]
+
+
+def test_rarest_gram_drives_a_long_term():
+    # "user1" is on owners 1 and 10-19; "ser12" only on owner 12.
+    index, connection, owners = make_index({i: f'user{i}' for i in range(1, 20)}, probe_postings=3)
+    assert search(index, connection, owners, 'user12') == [12]
+
+
+def test_tied_grams_pick_the_first():
+    # "abcde" and "bcdef" are on two owners each; the helper returns the driving gram's postings.
+    index, connection, owners = make_index({1: 'abcdef', 2: 'abcde', 3: 'bcdef'})
+    assert search(index, connection, owners, 'abcdef') == [2, 1]
+
+
+def test_probe_counts_stop_at_probe_postings():
+    # Both grams are over the cap, so they tie and the first drives.
+    texts = {i: 'abcde' for i in range(1, 6)}
+    texts.update({i: 'bcdef' for i in range(6, 9)})
+    index, connection, owners = make_index(texts, probe_postings=2)
+    assert search(index, connection, owners, 'abcdef') == [5, 4, 3, 2, 1]
+
+
+def test_common_terms_page_in_owner_order():
+    index, connection, owners = make_index({i: f'user{i}@example.com' for i in range(1, 51)})
+    assert search(index, connection, owners, 'example', limit=5) == [50, 49, 48, 47, 46]
+
+
+@pytest.mark.parametrize('max_grams', [1, 2, 3])
+def test_gram_subsampling_still_admits_every_match(max_grams):
+    texts = {1: 'jonathan.livingston@example.com', 2: 'jonas@example.com', 3: 'nathan@example.com'}
+    index, connection, owners = make_index(texts, max_grams=max_grams)
+    term = 'jonathan.liv'
+    assert len(term) - 4 > max_grams
+    assert 1 in search(index, connection, owners, term)
+
+
+def test_replace_and_remove_update_postings():
+    index, connection, owners = make_index({1: 'alice', 2: 'bob'})
+    index.replace(connection, 1, 'carol')
+    assert search(index, connection, owners, 'alice') == []
+    assert search(index, connection, owners, 'carol') == [1]
+    index.remove(connection, 1, 2)
+    assert search(index, connection, owners, 'bob') == []
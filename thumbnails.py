@@ -0,0 +1,303 @@
+"""
+Upload pipeline for poster thumbnails.
+
+Uploaded images are stored under a content-hashed filename (so identical
+uploads share one file and the name can be cached forever), then decoded once
+on a background thread and re-encoded into a few widths in modern formats
+(WebP, plus AVIF when the installed Pillow supports it). Templates use
+``sources()`` to build ``srcset`` attributes so a 300px grid cell downloads a
+300px image instead of the full-size original. Those formats are only ever
+offered through ``<source type=...>``; the plain ``src`` is a JPEG variant
+(``default_variant()``) that every browser can decode.
+
+Pillow is optional: without it, originals are still stored and served, just
+without variants.
+
+``send_upload()`` serves the folder: content-hashed names never change, so
+they are sent with a year-long ``immutable`` Cache-Control and the hash as a
+strong ETag. Older uuid-named uploads fall back to a short max-age with
+revalidation.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Response, abort, request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    from PIL import Image, ImageOps, features as pil_features
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+from cache import TTLCache
+
+FORMAT_MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+# "<20 hex chars>.<ext>" originals and "<20 hex chars>-<width>w.<fmt>" variants.
+_HASHED_NAME = re.compile(r'^([0-9a-f]{20})(-\d+w)?\.[A-Za-z0-9]+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def content_hashed_name(data, extension):
+    """``<first 20 hex chars of sha256>.<ext>``. Long enough to avoid collisions and short enough for the column."""
+    return hashlib.sha256(data).hexdigest()[:20] + extension.lower()
+
+
+def variant_filename(filename, width, fmt):
+    stem = os.path.splitext(filename)[0]
+    return f'{stem}-{width}w.{fmt}'
+
+
+class ThumbnailPipeline:
+    """
+    Flask extension owning the upload folder's poster files.
+
+    Configuration keys:
+        THUMBNAIL_WIDTHS          -- widths generated for each upload (default 160, 320, 480)
+        THUMBNAIL_DEFAULT_WIDTH   -- width used for the plain ``src`` (default 320)
+        THUMBNAIL_FORMATS         -- preferred formats for ``<source>``, best first (default avif, webp)
+        THUMBNAIL_FALLBACK_FORMAT -- format of the plain ``src`` variant, which must decode in
+                                     every browser (default jpeg; None serves the original)
+        THUMBNAIL_QUALITY         -- encoder quality, 1-100 (default 75)
+        THUMBNAIL_WORKERS         -- background encoder threads (default 2)
+        UPLOADS_MAX_AGE           -- max-age for uploads without a content hash (default 3600)
+        UPLOADS_ACCEL_REDIRECT    -- internal nginx location (e.g. "/_uploads/") to hand
+                                     transfers to via X-Accel-Redirect; unset serves directly
+
+    Flask's own USE_X_SENDFILE is honoured as well when serving directly.
+    """
+
+    def __init__(self, app=None, metrics=None):
+        self.app = None
+        self.metrics = metrics
+        self._known = {}
+        self._missing = TTLCache(ttl=30, name='thumbnail_variants_missing')
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('THUMBNAIL_WIDTHS', (160, 320, 480))
+        app.config.setdefault('THUMBNAIL_DEFAULT_WIDTH', 320)
+        app.config.setdefault('THUMBNAIL_FORMATS', ('avif', 'webp'))
+        app.config.setdefault('THUMBNAIL_FALLBACK_FORMAT', 'jpeg')
+        app.config.setdefault('THUMBNAIL_QUALITY', 75)
+        app.config.setdefault('THUMBNAIL_WORKERS', 2)
+        app.config.setdefault('UPLOADS_MAX_AGE', 3600)
+        app.config.setdefault('UPLOADS_ACCEL_REDIRECT', None)
+        self.app = app
+        self._executor = ThreadPoolExecutor(max_workers=app.config['THUMBNAIL_WORKERS'], thread_name_prefix='thumbnails')
+        app.extensions['thumbnails'] = self
+        if self.metrics is not None:
+            self.metrics.register_gauge('thumbnail_queue_depth', 'Uploads waiting for variant generation.', lambda: self._pending)
+
+    @property
+    def folder(self):
+        return self.app.config['UPLOAD_FOLDER']
+
+    @property
+    def formats(self):
+        """Configured formats the installed Pillow can actually encode."""
+        if Image is None:
+            return ()
+        return tuple(fmt for fmt in self.app.config['THUMBNAIL_FORMATS'] if pil_features.check(fmt))
+
+    @property
+    def fallback_format(self):
+        return self.app.config['THUMBNAIL_FALLBACK_FORMAT']
+
+    @property
+    def enabled(self):
+        """Whether variants can be generated at all."""
+        return Image is not None and bool(self.formats or self.fallback_format)
+
+    @property
+    def source_formats(self):
+        """Formats offered in ``<source>`` elements: the configured ones, or any but the fallback without Pillow."""
+        return self.formats or tuple(fmt for fmt in FORMAT_MIME_TYPES if fmt != self.fallback_format)
+
+    # --- Writing ---
+
+    def save_upload(self, file_storage):
+        """
+        Stores an uploaded image under its content hash and queues variant
+        generation. Returns the stored filename.
+        """
+        data = file_storage.read()
+        extension = os.path.splitext(file_storage.filename or '')[1] or '.jpg'
+        filename = content_hashed_name(data, extension)
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, filename)
+        if not os.path.exists(path):
+            _atomic_write(path, data)
+        self.schedule_variants(filename)
+        return filename
+
+    def schedule_variants(self, filename):
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._pending += 1
+        return self._executor.submit(self._generate_safely, filename)
+
+    def _generate_safely(self, filename):
+        try:
+            self.generate_variants(filename)
+        except Exception:
+            self.app.logger.exception('Thumbnail generation failed for %s', filename)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def generate_variants(self, filename):
+        """Decodes ``filename`` once and writes every configured width/format variant."""
+        source_path = os.path.join(self.folder, filename)
+        quality = self.app.config['THUMBNAIL_QUALITY']
+        widths = sorted(self.app.config['THUMBNAIL_WIDTHS'], reverse=True)
+        formats = self.formats + ((self.fallback_format,) if self.fallback_format else ())
+
+        with Image.open(source_path) as img:
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+            # Resize largest first and step down from the previous result: each
+            # step is a small ratio, which is both faster and sharp enough.
+            current = img
+            for width in widths:
+                if current.width > width:
+                    height = max(1, round(current.height * width / current.width))
+                    current = current.resize((width, height), Image.LANCZOS)
+                for fmt in formats:
+                    target = os.path.join(self.folder, variant_filename(filename, width, fmt))
+                    if not os.path.exists(target):
+                        _atomic_save(current, target, fmt, quality)
+
+        self._known[filename] = self._scan(filename)
+        self._missing.invalidate(filename)
+
+    def delete(self, filename):
+        """Removes an upload and all of its variants."""
+        paths = [os.path.join(self.folder, filename)]
+        for fmt in FORMAT_MIME_TYPES:
+            for width in self.app.config['THUMBNAIL_WIDTHS']:
+                paths.append(os.path.join(self.folder, variant_filename(filename, width, fmt)))
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._known.pop(filename, None)
+
+    # --- Reading ---
+
+    def variants(self, filename):
+        """Returns {format: [(width, variant_filename), ...]} for variants on disk."""
+        known = self._known.get(filename)
+        if known is not None:
+            return known
+        if self._missing.get(filename):
+            return {}
+        found = self._scan(filename)
+        if found:
+            self._known[filename] = found
+        else:
+            # Variants may still be generating; look again after the TTL.
+            self._missing.set(filename, True)
+        return found
+
+    def default_variant(self, filename):
+        """Fallback-format variant to use as the plain ``src``, or None (serve the original) if there is none."""
+        entries = self.variants(filename).get(self.fallback_format)
+        if not entries:
+            return None
+        target = self.app.config['THUMBNAIL_DEFAULT_WIDTH']
+        return min(entries, key=lambda entry: abs(entry[0] - target))[1]
+
+    def sources(self, filename, url_for_file):
+        """[(mime_type, srcset), ...] best format first, for ``<source>`` elements."""
+        found = self.variants(filename)
+        result = []
+        for fmt in self.source_formats:
+            entries = found.get(fmt)
+            if entries:
+                srcset = ', '.join(f'{url_for_file(name)} {width}w' for width, name in sorted(entries))
+                result.append((FORMAT_MIME_TYPES[fmt], srcset))
+        return result
+
+    # --- Serving ---
+
+    def send_upload(self, filename):
+        """
+        Response for ``/uploads/<filename>``. Conditional requests get a 304 and
+        ranges a 206 (via ``send_from_directory(conditional=True)``). When
+        serving directly, werkzeug hands the open file to the server's
+        ``wsgi.file_wrapper``, which gunicorn turns into a zero-copy sendfile().
+        """
+        match = _HASHED_NAME.match(filename)
+        hashed = match is not None
+        etag = match.group(1) + (match.group(2) or '') if hashed else None
+
+        # The name *is* the content hash: answer revalidations without touching disk.
+        if hashed and etag in request.if_none_match:
+            response = Response(status=304)
+            response.set_etag(etag)
+            return self._cache_headers(response, hashed)
+
+        accel_prefix = self.app.config['UPLOADS_ACCEL_REDIRECT']
+        if accel_prefix:
+            path = safe_join(os.path.join(self.app.root_path, self.folder), filename)
+            if path is None or not os.path.isfile(path):
+                abort(404)
+            if etag is None:
+                stat = os.stat(path)
+                etag = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+            response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+            response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + filename
+            response.set_etag(etag)
+            # nginx takes care of Range; 304s still come from here.
+            response = response.make_conditional(request)
+            return self._cache_headers(response, hashed)
+
+        response = send_from_directory(self.folder, filename, conditional=True,
+                                       etag=etag if hashed else True, max_age=self._max_age(hashed))
+        return self._cache_headers(response, hashed)
+
+    def _max_age(self, hashed):
+        return IMMUTABLE_MAX_AGE if hashed else self.app.config['UPLOADS_MAX_AGE']
+
+    def _cache_headers(self, response, hashed):
+        response.cache_control.public = True
+        response.cache_control.max_age = self._max_age(hashed)
+        if hashed:
+            response.cache_control.immutable = True
+        return response
+
+    def _scan(self, filename):
+        found = {}
+        for fmt in FORMAT_MIME_TYPES:
+            for width in sorted(self.app.config['THUMBNAIL_WIDTHS']):
+                name = variant_filename(filename, width, fmt)
+                if os.path.exists(os.path.join(self.folder, name)):
+                    found.setdefault(fmt, []).append((width, name))
+        return found
+
+
+def _atomic_write(path, data):
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _atomic_save(image, path, fmt, quality):
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.save(tmp_path, format=fmt.upper(), quality=quality)
+    os.replace(tmp_path, path)